@@ -0,0 +1,78 @@
+"""Benchmark of the per-test overhead of acquiring and releasing fixtures.
+
+Generates a folder of yastr tests requesting the same small fixture graph and measures setting up and
+tearing down the fixtures of every collected test. The cold case resolves the fixture closure per test
+like before, the memoized case reuses the plan resolved for the first test of the folder.
+"""
+
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+from time import perf_counter
+
+import pytest
+
+from yastr.fixtures import FixtureRequest, fixture_plans_key
+
+CONFTEST = '''
+import pytest
+
+@pytest.fixture
+def a():
+    pass
+
+@pytest.fixture
+def b(a):
+    pass
+
+@pytest.fixture
+def c(request, a):
+    pass
+
+@pytest.fixture
+def d(b, c):
+    yield
+'''
+
+
+class Measurement:
+    """Pytest plugin measuring fixture overhead after collection."""
+
+    def __init__(self, repetitions: int) -> None:
+        self.repetitions = repetitions
+        self.durations = {'cold': [], 'memoized': []}
+
+    def pytest_collection_finish(self, session) -> None:
+        plans = session.stash.setdefault(fixture_plans_key, {})
+
+        for _ in range(self.repetitions):
+            for name, durations in self.durations.items():
+                start = perf_counter()
+                for item in session.items:
+                    if name == 'cold':
+                        plans.clear()
+                    request = FixtureRequest(item)
+                    request._execute()
+                    request._teardown()
+                durations.append((perf_counter() - start) / len(session.items) * 1e6)
+
+        session.items.clear()
+
+
+def main(tests: int = 1000, repetitions: int = 10) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        (root / 'conftest.py').write_text(CONFTEST)
+        for i in range(tests):
+            (root / f'test{i}.yastr.json').write_text('{"executable": "true", "fixtures": ["d"]}')
+
+        measurement = Measurement(repetitions)
+        pytest.main([str(root), '-q', '-p', 'yastr.plugin', '-p', 'no:cacheprovider'], plugins=[measurement])
+
+    for name, durations in measurement.durations.items():
+        print(f'{name:>9}: mean {statistics.mean(durations):6.1f} us, median {statistics.median(durations):6.1f} us')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
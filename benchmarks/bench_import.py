@@ -0,0 +1,84 @@
+"""Benchmark of import and startup time of yastr.
+
+Measures the time of importing the yastr plugin compared to importing pytest alone and the wall time
+of starting the yastr command line interface without tests to run. The command can be the installed
+entry point or a frozen binary built by PyInstaller:
+
+    python benchmarks/bench_import.py
+    python benchmarks/bench_import.py --executable dist/yastr --budget 3.0
+
+If a budget in seconds is given, the script fails if the median startup time exceeds it.
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from time import perf_counter
+
+#: Modules that must not be imported before a config file or fixture needs them
+DEFERRED_MODULES = ('anyconfig', 'marshmallow', 'marshmallow_dataclass', 'wrapt', 'jinja2', 'yaml')
+
+#: Exit code of pytest if no tests were collected
+NO_TESTS_COLLECTED = 5
+
+
+def _wall_time(cmd, cwd=None) -> float:
+    start = perf_counter()
+    result = subprocess.run(cmd, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    duration = perf_counter() - start
+    if result.returncode not in (0, NO_TESTS_COLLECTED):
+        raise RuntimeError(f'{cmd} returned code {result.returncode}')
+    return duration
+
+
+def measure_import(repetitions: int) -> dict:
+    """Measure median import times in seconds of pytest alone and of the yastr plugin."""
+    results = {}
+    for name, module in (('pytest', 'pytest'), ('plugin', 'yastr.plugin')):
+        durations = [_wall_time([sys.executable, '-c', f'import {module}']) for _ in range(repetitions)]
+        results[f'import_{name}_seconds'] = statistics.median(durations)
+    results['import_overhead_seconds'] = results['import_plugin_seconds'] - results['import_pytest_seconds']
+
+    code = f'import json, sys, yastr.plugin; print(json.dumps([m for m in {DEFERRED_MODULES!r} if m in sys.modules]))'
+    imported = subprocess.run([sys.executable, '-c', code], check=True, capture_output=True, text=True).stdout
+    results['deferred_imported'] = json.loads(imported)
+    return results
+
+
+def measure_startup(executable: str, repetitions: int) -> dict:
+    """Measure median wall time in seconds of running the command line interface without tests."""
+    with tempfile.TemporaryDirectory() as tmp:
+        durations = [_wall_time([executable, '-q', '-p', 'no:cacheprovider'], cwd=tmp) for _ in range(repetitions)]
+    return {'startup_seconds': statistics.median(durations), 'startup_max_seconds': max(durations)}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--executable', default=shutil.which('yastr'), help='yastr command (default: from PATH)')
+    parser.add_argument('--repetitions', type=int, default=10, help='number of measured runs')
+    parser.add_argument('--budget', type=float, help='maximum median startup time in seconds')
+    args = parser.parse_args()
+
+    if not args.executable:
+        parser.error('yastr command not found, pass --executable')
+
+    results = {'executable': args.executable}
+    results.update(measure_import(args.repetitions))
+    results.update(measure_startup(args.executable, args.repetitions))
+    print(json.dumps(results, indent=2))
+
+    if results['deferred_imported']:
+        print(f'Deferred modules imported at startup: {", ".join(results["deferred_imported"])}', file=sys.stderr)
+        return 1
+    if args.budget is not None and results['startup_seconds'] > args.budget:
+        print(f'Startup time {results["startup_seconds"]:.3f}s exceeds budget of {args.budget:.3f}s', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,58 @@
+"""Benchmark of the per-spawn overhead of trivial executables.
+
+Compares the previous spawn path (copying the environment, splitting the driver command, looking up
+the executable and capturing the output with subprocess.run per call) with the one used by yastr.
+Both are measured interleaved to reduce the influence of system noise.
+"""
+
+import os
+import shlex
+import statistics
+import sys
+from subprocess import run
+from time import perf_counter
+
+from yastr.runner import execute, resolve_executable
+
+
+def _previous(executable, test_driver, overlay):
+    env = os.environ.copy()
+    env.update(overlay)
+    cmd = shlex.split(test_driver) + [executable]
+    run(cmd, env=env, capture_output=True, check=True)
+
+
+def _current(cmd, resolved, env):
+    execute(cmd, env, executable=resolved)
+
+
+def measure(executable: str, overlay: dict, repetitions: int) -> dict:
+    """Measure spawn latencies in microseconds of the previous and the current spawn path."""
+    cmd = [executable]
+    resolved = resolve_executable(executable, os.environ.get('PATH'))
+    env = {**os.environ, **overlay} if overlay else None
+
+    funcs = {
+        'previous': lambda: _previous(executable, '', overlay),
+        'current': lambda: _current(cmd, resolved, env),
+    }
+    durations = {name: [] for name in funcs}
+
+    for i in range(repetitions + repetitions // 10):
+        for name, func in funcs.items():
+            start = perf_counter()
+            func()
+            if i >= repetitions // 10:  # Skip warm up
+                durations[name].append((perf_counter() - start) * 1e6)
+
+    return {name: (statistics.mean(values), statistics.median(values)) for name, values in durations.items()}
+
+
+def main(repetitions: int = 1000) -> None:
+    for case, overlay in (('inherited env', {}), ('env overlay', {'FOO': 'bar'})):
+        for name, (mean, median) in measure('true', overlay, repetitions).items():
+            print(f'{case:>14} {name:>9}: mean {mean:6.0f} us, median {median:6.0f} us')
+
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:]))
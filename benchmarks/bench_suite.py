@@ -0,0 +1,157 @@
+"""Scaling benchmark suite of yastr.
+
+Generates synthetic trees of test configs in different sizes and variants and measures:
+
+- collection time and peak memory of a pytest process, with cold and warm config cache
+- throughput of loading test configs in a single process
+- per-test overhead of acquiring and releasing fixtures (see bench_fixtures.py)
+- per-spawn overhead of trivial executables (see bench_spawn.py)
+
+The results are written as JSON, so they can be compared between releases:
+
+    python benchmarks/bench_suite.py --sizes 1000,10000 --output results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+from time import perf_counter
+
+import pytest
+
+from bench_fixtures import CONFTEST, Measurement
+from bench_spawn import measure as measure_spawn
+from yastr.config import load_tests
+from yastr.runner import OutputSpool, execute
+
+#: Config file contents by variant name
+VARIANTS = {
+    'json': ('json', '{{"executable": "true", "args": ["--case", "{i}"]}}'),
+    'yaml': ('yaml', 'executable: "true"\nargs: [--case, "{i}"]\n'),
+    'yaml-template': ('yaml', 'executable: "true"\nargs: [--case, "{i}", "{{{{ platform.system() }}}}"]\n'),
+    'json-markers-fixtures': (
+        'json',
+        '{{"executable": "true", "args": ["--case", "{i}"], "markers": ["slow", ["timeout", [10]]], '
+        '"fixtures": ["d"]}}',
+    ),
+}
+
+#: Number of files per folder of generated trees
+FOLDER_SIZE = 100
+
+#: Maximum number of configs loaded for measuring the load throughput
+LOAD_SAMPLE = 2000
+
+
+def generate(root: Path, size: int, variant: str) -> None:
+    """Generate tree of test configs."""
+    suffix, template = VARIANTS[variant]
+    (root / 'conftest.py').write_text(CONFTEST)
+    (root / 'pytest.ini').write_text('[pytest]\nmarkers =\n    slow\n    timeout\n')
+
+    for i in range(size):
+        folder = root / f'group{i // FOLDER_SIZE:04}'
+        if i % FOLDER_SIZE == 0:
+            folder.mkdir()
+        (folder / f'test{i:06}.yastr.{suffix}').write_text(template.format(i=i))
+
+
+def bench_collect(root: Path) -> dict:
+    """Measure collection in a separate pytest process with cold and warm config cache."""
+    cmd = [sys.executable, '-m', 'pytest', '--collect-only', '-q', '-p', 'yastr.plugin', str(root)]
+    results = {}
+
+    for cache in ('cold', 'warm'):
+        if cache == 'cold':
+            shutil.rmtree(root / '.pytest_cache', ignore_errors=True)
+
+        result = execute(cmd, stdout=OutputSpool(), stderr=OutputSpool())
+        if result.returncode != 0:
+            raise RuntimeError(f'Collection failed:\n{result.stdout.text("utf-8")}{result.stderr.text("utf-8")}')
+
+        results[f'collect_{cache}_seconds'] = result.duration
+        if result.usage:
+            results[f'collect_{cache}_max_rss'] = result.usage.max_rss
+    return results
+
+
+def bench_load(root: Path) -> dict:
+    """Measure throughput of loading test configs in the current process."""
+    paths = sorted(root.glob('*/*.yastr.*'))[:LOAD_SAMPLE]
+
+    start = perf_counter()
+    for path in paths:
+        load_tests(path)
+    duration = perf_counter() - start
+
+    return {'load_configs_per_second': len(paths) / duration}
+
+
+def bench_fixtures(root: Path, repetitions: int) -> dict:
+    """Measure per-test fixture overhead of all tests in the tree."""
+    measurement = Measurement(repetitions)
+    with redirect_stdout(sys.stderr):
+        pytest.main([str(root), '-q', '-p', 'yastr.plugin', '-p', 'no:cacheprovider'], plugins=[measurement])
+    return {f'fixtures_{name}_us': statistics.median(durations) for name, durations in measurement.durations.items()}
+
+
+def run(sizes, variants, repetitions: int) -> dict:
+    results = []
+
+    for size in sizes:
+        for variant in variants:
+            with tempfile.TemporaryDirectory() as tmp:
+                root = Path(tmp)
+                generate(root, size, variant)
+
+                result = {'size': size, 'variant': variant}
+                result.update(bench_collect(root))
+                result.update(bench_load(root))
+                if 'fixtures' in variant:
+                    result.update(bench_fixtures(root, repetitions))
+                results.append(result)
+                print(json.dumps(result), file=sys.stderr)
+
+    spawn = {}
+    for case, overlay in (('inherited_env', {}), ('env_overlay', {'FOO': 'bar'})):
+        _, median = measure_spawn('true', overlay, repetitions * 100)['current']
+        spawn[f'spawn_{case}_us'] = median
+
+    return {
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'pytest': pytest.__version__,
+        'trees': results,
+        'spawn': spawn,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000', help='comma separated numbers of configs per tree')
+    parser.add_argument('--variants', default=','.join(VARIANTS), help='comma separated config variants')
+    parser.add_argument('--repetitions', type=int, default=5, help='repetitions of micro benchmarks')
+    parser.add_argument('--output', type=Path, help='file to write results to (default: stdout)')
+    args = parser.parse_args()
+
+    results = run([int(size) for size in args.sizes.split(',')], args.variants.split(','), args.repetitions)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
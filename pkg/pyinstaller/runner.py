@@ -1,3 +1,7 @@
+import multiprocessing
+
 from yastr import main
 
+# Spawned worker processes loading configs run this executable again
+multiprocessing.freeze_support()
 main()
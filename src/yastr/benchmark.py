@@ -0,0 +1,103 @@
+"""Repeated execution of test executables for benchmarking them."""
+
+from __future__ import annotations
+
+import json
+import math
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    from typing import Callable, Dict, List, Optional, Sequence
+
+    from .runner import ExecutionResult
+
+#: Measured metrics of benchmark runs
+METRICS = ('wall', 'cpu')
+
+#: Statistics calculated per metric
+STATISTICS = ('min', 'median', 'mean', 'p95', 'p99', 'stddev')
+
+
+def percentile(values: Sequence[float], p: float) -> float:
+    """Calculate percentile of values using linear interpolation between closest ranks."""
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    lower, upper = math.floor(rank), math.ceil(rank)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def summarize(values: Sequence[float]) -> Dict[str, float]:
+    """Calculate all statistics of measured values."""
+    return {
+        'min': min(values),
+        'median': statistics.median(values),
+        'mean': statistics.mean(values),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'stddev': statistics.stdev(values) if len(values) > 1 else 0.0,
+    }
+
+
+def run(func: Callable[[int], ExecutionResult], warmup: int, repetitions: int,
+        concurrency: int) -> List[ExecutionResult]:
+    """Call func with the index of every warmup and measured run, keeping up to `concurrency` runs in flight.
+
+    Returns the results of the measured runs, stopping at the first failing run.
+    """
+
+    def _batch(start: int, count: int) -> List[ExecutionResult]:
+        if concurrency <= 1:
+            results = []
+            for index in range(start, start + count):
+                results.append(func(index))
+                if not results[-1].succeeded:
+                    break
+            return results
+
+        with ThreadPoolExecutor(concurrency, thread_name_prefix='yastr_benchmark') as executor:
+            return list(executor.map(func, range(start, start + count)))
+
+    warmup_results = _batch(0, warmup)
+    failed = [result for result in warmup_results if not result.succeeded]
+    if failed:
+        return failed[:1]
+    return _batch(warmup, repetitions)
+
+
+def statistics_of(results: Sequence[ExecutionResult]) -> Dict[str, float]:
+    """Calculate statistics of wall and CPU time of benchmark runs in seconds."""
+    stats = {f'wall_{name}': value for name, value in summarize([result.duration for result in results]).items()}
+    if all(result.usage for result in results):
+        cpu_times = [result.usage.user_time + result.usage.system_time for result in results]
+        stats.update({f'cpu_{name}': value for name, value in summarize(cpu_times).items()})
+    return stats
+
+
+def regressions(stats: Dict[str, float], baseline: Optional[Dict[str, float]],
+                thresholds: Dict[str, float]) -> List[str]:
+    """Compare statistics with baseline and describe all exceeding their relative threshold."""
+    messages = []
+    for name, threshold in thresholds.items():
+        if not baseline or name not in baseline or name not in stats:
+            continue
+
+        limit = baseline[name] * (1 + threshold)
+        if stats[name] > limit:
+            messages.append(f'{name} of {stats[name]:.6f}s exceeds baseline of {baseline[name]:.6f}s '
+                            f'by more than {threshold:.0%}')
+    return messages
+
+
+def load_results(path: Path) -> Dict[str, Dict[str, float]]:
+    """Load statistics by test id from results file."""
+    return json.loads(path.read_text())['benchmarks']
+
+
+def write_results(path: Path, results: Dict[str, Dict[str, float]]) -> None:
+    """Write statistics by test id to results file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({'timestamp': time.time(), 'benchmarks': results}, indent=2, sort_keys=True))
@@ -0,0 +1,533 @@
+"""Persistent caches stored in the pytest cache directory."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import pickle
+import platform
+import shutil
+import sqlite3
+import statistics
+import time
+import warnings
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from . import template
+
+if TYPE_CHECKING:
+    from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+    from .config import TestConfig, TestKey
+    from .template import Dependencies
+
+#: Versions of the cached tables, the version of a table must be increased if the structure of its entries changes,
+#: e.g. the version of configs if the TestConfig structure changes
+SCHEMA_VERSIONS = {'configs': 4, 'results': 1, 'files': 1, 'durations': 1, 'dirs': 1, 'settings': 1}
+
+#: Size of chunks read for hashing files
+HASH_CHUNK_SIZE = 1024 * 1024
+
+#: Weight of the latest duration in the recorded duration of a test
+HISTORY_WEIGHT = 0.5
+
+#: Nanoseconds a directory must have been unmodified before scanning it for its index entry to be trusted
+RACY_WINDOW_NS = 2 * 10**9
+
+
+def _schema_versions(db: sqlite3.Connection) -> Dict[str, int]:
+    """Get versions of the tables of a cache database.
+
+    Tables of databases created before the versions were recorded per table have version 1.
+    """
+    if not db.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'versions'").fetchone():
+        return {}
+    return dict(db.execute('SELECT name, version FROM versions'))
+
+
+def _connect(path: Path, tables: Sequence[str]) -> sqlite3.Connection:
+    """Open cache database, dropping given tables if they were created with another schema version."""
+    db = sqlite3.connect(str(path), timeout=30, check_same_thread=False)
+    with db:
+        versions = _schema_versions(db)
+        for table in tables:
+            if versions.get(table) == SCHEMA_VERSIONS[table]:
+                continue
+            if versions.get(table, 1) != SCHEMA_VERSIONS[table]:
+                db.execute(f'DROP TABLE IF EXISTS {table}')
+            db.execute('CREATE TABLE IF NOT EXISTS versions (name TEXT PRIMARY KEY, version INTEGER)')
+            db.execute('INSERT OR REPLACE INTO versions VALUES (?, ?)', (table, SCHEMA_VERSIONS[table]))
+    return db
+
+
+def template_context_digest() -> str:
+    """Digest of everything a config template could depend on except files and environment variables."""
+    parts = [
+        SCHEMA_VERSIONS['configs'], os.name,
+        platform.system(), platform.machine(), platform.node(), platform.python_version(),
+    ]
+    parts.append(template.context_digest())
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def environment_digest(variables: Optional[Sequence[str]]) -> str:
+    """Digest of the values of given environment variables or of the whole environment if None.
+
+    Only the digest is stored, so values of secrets read by templates do not end up in the cache.
+    """
+    if variables is None:
+        items = sorted(os.environ.items())
+    else:
+        items = [(name, os.environ.get(name)) for name in variables]
+    return hashlib.sha1(repr(items).encode()).hexdigest()
+
+
+def _file_stats(paths: Iterable[str]) -> List[Tuple[str, int, int]]:
+    """Get modification time and size of files."""
+    stats = []
+    for path in paths:
+        stat = os.stat(path)
+        stats.append((path, stat.st_mtime_ns, stat.st_size))
+    return stats
+
+
+class ConfigCache:
+    """Cache of validated test configs backed by a sqlite database.
+
+    Entries are keyed by the config file path and are invalidated if the file size, modification
+    time or the template context changes, or if any template included or environment variable read
+    by the config changes. If the cache grows beyond `max_entries`, the least recently used entries
+    are evicted.
+    """
+
+    def __init__(self, path: Path, max_entries: int) -> None:
+        self.path = path
+        self.max_entries = max_entries
+
+        self._db = _connect(path, ('configs', ))
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS configs ('
+                             'path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, context TEXT, '
+                             'defaults TEXT, dependencies TEXT, variables TEXT, environment TEXT, data BLOB, '
+                             'used REAL)')
+        self._context = template_context_digest()
+        self._hits: Dict[str, float] = {}
+        self._misses: Dict[str, Tuple] = {}
+
+    def get(self, path: Path, defaults: str) -> Optional[Dict[TestKey, TestConfig]]:
+        """Get cached test configs of file or None if they are not cached or outdated.
+
+        The given defaults digest identifies the default values the configs were loaded with.
+        """
+        key = str(path)
+        stat = path.stat()
+
+        row = self._db.execute(
+            'SELECT mtime, size, context, defaults, dependencies, variables, environment, data '
+            'FROM configs WHERE path = ?', (key, )).fetchone()
+        if not row:
+            return None
+
+        mtime, size, context, cached_defaults, dependencies, variables, environment, data = row
+        if (mtime, size, context, cached_defaults) != (stat.st_mtime_ns, stat.st_size, self._context, defaults):
+            return None
+        if environment_digest(json.loads(variables)) != environment:
+            return None
+
+        dependencies = [tuple(dependency) for dependency in json.loads(dependencies)]
+        try:
+            if dependencies and _file_stats(name for name, _, _ in dependencies) != dependencies:
+                return None
+        except OSError:
+            return None
+
+        self._hits[key] = time.time()
+        return pickle.loads(data)
+
+    def put(self,
+            path: Path,
+            defaults: str,
+            configs: Dict[TestKey, TestConfig],
+            dependencies: Optional[Dependencies] = None) -> None:
+        """Store test configs loaded from given file, rendered using the dependency templates and variables."""
+        key = str(path)
+        stat = path.stat()
+        paths: Sequence[str] = ()
+        variables: Optional[List[str]] = []
+        if dependencies:
+            paths = sorted(dependencies.paths)
+            variables = None if dependencies.environment else sorted(dependencies.variables)
+        try:
+            stats = json.dumps(_file_stats(paths))
+        except OSError:
+            return
+        data = pickle.dumps(configs, protocol=pickle.HIGHEST_PROTOCOL)
+        self._misses[key] = (key, stat.st_mtime_ns, stat.st_size, self._context, defaults, stats,
+                             json.dumps(variables), environment_digest(variables), data, time.time())
+
+    def close(self) -> None:
+        """Store new entries, evict old ones and close the database."""
+        with self._db:
+            self._db.executemany('INSERT OR REPLACE INTO configs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                 self._misses.values())
+            self._db.executemany('UPDATE configs SET used = ? WHERE path = ?',
+                                 ((used, key) for key, used in self._hits.items()))
+            self._db.execute(
+                'DELETE FROM configs WHERE path NOT IN (SELECT path FROM configs ORDER BY used DESC LIMIT ?)',
+                (self.max_entries, ))
+
+        self._db.close()
+        self._hits.clear()
+        self._misses.clear()
+
+
+@dataclass
+class CachedResult:
+    """Result of a passed test stored in the result cache.
+
+    Attributes:
+        nodeid: Id of the test that passed
+        duration: Wall time in seconds of the executable
+        stdout_log: Path to the log file of the standard output if it was stored, copied into the cache when stored
+        stderr_log: Path to the log file of the standard error if it was stored, copied into the cache when stored
+        created: Time when the test passed
+    """
+
+    nodeid: str
+    duration: float
+    stdout_log: Optional[str] = None
+    stderr_log: Optional[str] = None
+    created: float = 0.0
+
+
+class ResultCache:
+    """Cache of passed test results backed by a sqlite database.
+
+    Results are keyed by a digest of all inputs of a test. Files are hashed once per version, their
+    digests are kept by path, size and modification time. Log files of results are copied into a folder
+    next to the database, as the originals are removed with the temporary folders of later runs. If the
+    cache grows beyond `max_entries`, the least recently used results are evicted along with their logs.
+    """
+
+    def __init__(self, path: Path, max_entries: int) -> None:
+        self.path = path
+        self.max_entries = max_entries
+        self.log_dir = path.parent / f'{path.stem}-logs'
+
+        self._db = _connect(path, ('results', 'files'))
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS results ('
+                             'key TEXT PRIMARY KEY, nodeid TEXT, duration REAL, stdout_log TEXT, stderr_log TEXT, '
+                             'created REAL, used REAL)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS files ('
+                             'path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, digest TEXT)')
+        self._files: Dict[str, Tuple[int, int, str]] = {}
+        self._new_files: Dict[str, Tuple] = {}
+        self._hits: Dict[str, float] = {}
+        self._results: Dict[str, Tuple] = {}
+
+    def file_digest(self, path: Path) -> str:
+        """Get digest of file content."""
+        key = str(path)
+        stat = path.stat()
+
+        cached = self._files.get(key)
+        if cached is None:
+            cached = self._db.execute('SELECT mtime, size, digest FROM files WHERE path = ?', (key, )).fetchone()
+        if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            self._files[key] = cached
+            return cached[2]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+
+        self._files[key] = (stat.st_mtime_ns, stat.st_size, digest.hexdigest())
+        self._new_files[key] = (key, ) + self._files[key]
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        """Get result of passed test with given input digest or None if there is none."""
+        row = self._db.execute('SELECT nodeid, duration, stdout_log, stderr_log, created FROM results WHERE key = ?',
+                               (key, )).fetchone()
+        if not row:
+            return None
+
+        self._hits[key] = time.time()
+        result = CachedResult(*row)
+        for name in ('stdout_log', 'stderr_log'):
+            log = getattr(result, name)
+            if log and not os.path.exists(log):
+                setattr(result, name, None)
+        return result
+
+    def put(self, key: str, result: CachedResult) -> None:
+        """Store result of passed test with given input digest, copying its log files into the cache."""
+        logs = []
+        for name, log in (('stdout', result.stdout_log), ('stderr', result.stderr_log)):
+            if log:
+                copy = self.log_dir / f'{key}.{name}.log'
+                try:
+                    self.log_dir.mkdir(parents=True, exist_ok=True)
+                    shutil.copyfile(log, copy)
+                except OSError:
+                    log = None
+                else:
+                    log = str(copy)
+            logs.append(log)
+
+        self._results[key] = (key, result.nodeid, result.duration, *logs, result.created, time.time())
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        with self._db:
+            self._db.execute('DELETE FROM results')
+            self._db.execute('DELETE FROM files')
+        shutil.rmtree(self.log_dir, ignore_errors=True)
+        self._files.clear()
+        self._new_files.clear()
+        self._hits.clear()
+        self._results.clear()
+
+    def close(self) -> None:
+        """Store new entries, evict old ones and close the database."""
+        with self._db:
+            self._db.executemany('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)', self._new_files.values())
+            self._db.executemany('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                 self._results.values())
+            self._db.executemany('UPDATE results SET used = ? WHERE key = ?',
+                                 ((used, key) for key, used in self._hits.items()))
+            evicted = self._db.execute(
+                'SELECT stdout_log, stderr_log FROM results WHERE key NOT IN '
+                '(SELECT key FROM results ORDER BY used DESC LIMIT ?)', (self.max_entries, )).fetchall()
+            self._db.execute(
+                'DELETE FROM results WHERE key NOT IN (SELECT key FROM results ORDER BY used DESC LIMIT ?)',
+                (self.max_entries, ))
+            self._db.execute(
+                'DELETE FROM files WHERE path NOT IN (SELECT path FROM files ORDER BY rowid DESC LIMIT ?)',
+                (self.max_entries, ))
+
+        for log in (Path(log) for logs in evicted for log in logs if log):
+            if log.parent != self.log_dir:
+                continue
+            try:
+                log.unlink()
+            except OSError:
+                pass
+
+        self._db.close()
+        self._files.clear()
+        self._new_files.clear()
+        self._hits.clear()
+        self._results.clear()
+
+
+class DurationHistory:
+    """Wall durations of previous test runs backed by a sqlite database.
+
+    For every test, an exponential moving average of its durations is kept. If the history grows beyond
+    `max_entries`, the tests that were not run for the longest time are removed.
+    """
+
+    def __init__(self, path: Path, max_entries: int) -> None:
+        self.path = path
+        self.max_entries = max_entries
+
+        self._db = _connect(path, ('durations', ))
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS durations ('
+                             'nodeid TEXT PRIMARY KEY, duration REAL, runs INTEGER, updated REAL)')
+        self._durations: Optional[Dict[str, Tuple[float, int]]] = None
+        self._updates: Dict[str, Tuple] = {}
+
+    @property
+    def durations(self) -> Dict[str, Tuple[float, int]]:
+        """Recorded duration and number of runs by test id."""
+        if self._durations is None:
+            self._durations = {
+                nodeid: (duration, runs)
+                for nodeid, duration, runs in self._db.execute('SELECT nodeid, duration, runs FROM durations')
+            }
+        return self._durations
+
+    def get(self, nodeid: str) -> Optional[float]:
+        """Get recorded duration of test or None if it was not run before."""
+        recorded = self.durations.get(nodeid)
+        return recorded[0] if recorded else None
+
+    def estimate(self, nodeids: Iterable[str]) -> Dict[str, float]:
+        """Estimate durations of tests.
+
+        Tests that were not run before are expected to take the median duration of all recorded tests.
+        """
+        durations = self.durations
+        fallback = statistics.median(duration for duration, _ in durations.values()) if durations else 0.0
+        return {nodeid: durations[nodeid][0] if nodeid in durations else fallback for nodeid in nodeids}
+
+    def record(self, nodeid: str, duration: float) -> None:
+        """Record duration of a test run."""
+        recorded = self.durations.get(nodeid)
+        if recorded:
+            duration = HISTORY_WEIGHT * duration + (1 - HISTORY_WEIGHT) * recorded[0]
+            runs = recorded[1] + 1
+        else:
+            runs = 1
+
+        self.durations[nodeid] = (duration, runs)
+        self._updates[nodeid] = (nodeid, duration, runs, time.time())
+
+    def merge(self, path: Path) -> None:
+        """Merge durations of another history, keeping the most recently updated ones.
+
+        Histories created with another schema version are ignored with a warning.
+        """
+        other = sqlite3.connect(str(path))
+        try:
+            if _schema_versions(other).get('durations', 1) != SCHEMA_VERSIONS['durations']:
+                warnings.warn(f'Ignoring duration history {path} created by another yastr version', RuntimeWarning)
+                return
+            rows = other.execute('SELECT nodeid, duration, runs, updated FROM durations').fetchall()
+        finally:
+            other.close()
+
+        with self._db:
+            self._db.executemany(
+                'INSERT INTO durations VALUES (?, ?, ?, ?) ON CONFLICT (nodeid) DO UPDATE SET '
+                'duration = excluded.duration, runs = excluded.runs, updated = excluded.updated '
+                'WHERE excluded.updated > durations.updated', rows)
+        self._durations = None
+
+    def close(self) -> None:
+        """Store recorded durations, evict old ones and close the database."""
+        with self._db:
+            self._db.executemany('INSERT OR REPLACE INTO durations VALUES (?, ?, ?, ?)', self._updates.values())
+            self._db.execute(
+                'DELETE FROM durations WHERE nodeid NOT IN '
+                '(SELECT nodeid FROM durations ORDER BY updated DESC LIMIT ?)', (self.max_entries, ))
+
+        self._db.close()
+        self._durations = None
+        self._updates.clear()
+
+
+@dataclass
+class DirectoryEntry:
+    """Directory stored in the directory index.
+
+    Attributes:
+        mtime: Modification time in nanoseconds when the directory was scanned
+        scanned: Time in nanoseconds when the directory was scanned
+        relevant: Whether the directory directly contains relevant files
+        children: Names of subdirectories that are collected
+    """
+
+    mtime: int
+    scanned: int
+    relevant: bool
+    children: FrozenSet[str]
+
+    def is_fresh(self, mtime: int) -> bool:
+        """Check if directory did not change since it was scanned given its current modification time.
+
+        Directories modified right before they were scanned are not trusted, since later modifications may
+        not change their modification time on file systems with coarse timestamps.
+        """
+        return mtime == self.mtime and self.mtime < self.scanned - RACY_WINDOW_NS
+
+
+class DirectoryIndex:
+    """Index of directories containing relevant files backed by a sqlite database.
+
+    Adding, removing or renaming an entry of a directory changes its modification time. So if no
+    directory of a subtree was modified since it was scanned, the subtree still contains the same
+    files and it is known without scanning it whether it contains relevant files.
+
+    The index is cleared if the given settings digest changes, e.g. the patterns of relevant files.
+    """
+
+    def __init__(self, path: Path, settings: str, is_relevant: Callable[[Path], bool],
+                 is_collected: Callable[[Path], bool]) -> None:
+        self.path = path
+        self.is_relevant = is_relevant
+        self.is_collected = is_collected
+
+        self._db = _connect(path, ('dirs', 'settings'))
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS dirs ('
+                             'path TEXT PRIMARY KEY, mtime INTEGER, scanned INTEGER, relevant INTEGER, children TEXT)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS settings (digest TEXT)')
+            if self._db.execute('SELECT digest FROM settings').fetchone() != (settings, ):
+                self._db.execute('DELETE FROM dirs')
+                self._db.execute('DELETE FROM settings')
+                self._db.execute('INSERT INTO settings VALUES (?)', (settings, ))
+
+        self._entries: Optional[Dict[str, DirectoryEntry]] = None
+        self._scanned: Dict[str, DirectoryEntry] = {}
+        self._empty: Dict[str, bool] = {}
+        self._updates: Dict[str, Tuple] = {}
+
+    @property
+    def entries(self) -> Dict[str, DirectoryEntry]:
+        """Stored directory entries by path."""
+        if self._entries is None:
+            self._entries = {
+                path: DirectoryEntry(mtime, scanned, bool(relevant), frozenset(json.loads(children)))
+                for path, mtime, scanned, relevant, children in self._db.execute('SELECT * FROM dirs')
+            }
+        return self._entries
+
+    def scan(self, path: Path) -> DirectoryEntry:
+        """Get entry of directory, scanning it only if it changed since it was scanned before."""
+        key = str(path)
+        entry = self._scanned.get(key)
+        if entry:
+            return entry
+
+        mtime = path.stat().st_mtime_ns
+        entry = self.entries.get(key)
+        if not entry or not entry.is_fresh(mtime):
+            scanned = time.time_ns()
+            relevant = False
+            children = set()
+            with os.scandir(path) as it:
+                for dir_entry in it:
+                    entry_path = Path(dir_entry.path)
+                    if dir_entry.is_dir():
+                        if self.is_collected(entry_path):
+                            children.add(dir_entry.name)
+                    elif not relevant and self.is_relevant(entry_path):
+                        relevant = True
+
+            entry = DirectoryEntry(mtime, scanned, relevant, frozenset(children))
+            self._updates[key] = (key, mtime, scanned, relevant, json.dumps(sorted(children)))
+
+        self._scanned[key] = entry
+        return entry
+
+    def is_empty(self, path: Path) -> bool:
+        """Check if the index proves that a directory and its subdirectories contain no relevant files."""
+        key = str(path)
+        if key not in self._empty:
+            entry = self._scanned.get(key) or self.entries.get(key)
+            try:
+                fresh = entry is not None and entry.is_fresh(path.stat().st_mtime_ns)
+            except OSError:
+                fresh = False
+            self._empty[key] = fresh and not entry.relevant and all(
+                self.is_empty(path / child) for child in sorted(entry.children))
+        return self._empty[key]
+
+    def close(self) -> None:
+        """Store scanned directories and close the database."""
+        with self._db:
+            self._db.executemany('INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?)', self._updates.values())
+
+        self._db.close()
+        self._entries = None
+        self._scanned.clear()
+        self._empty.clear()
+        self._updates.clear()
@@ -1,29 +1,47 @@
 # from __future__ import annotations  # Does not work with marshmallow dataclass
 
-import os
-import platform
-from dataclasses import dataclass, field
-from functools import singledispatchmethod
+import itertools
+import math
+import re
+from dataclasses import dataclass, field, replace
+from functools import lru_cache, singledispatchmethod
 from json import JSONDecodeError
 from pathlib import Path
 from pprint import pformat
 from textwrap import indent
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
-import anyconfig
 import pytest
-from marshmallow import ValidationError
-from marshmallow_dataclass import class_schema
 
-from .utils import mark_text
+from .benchmark import METRICS, STATISTICS
+from .expect import STREAM_CHOICES
+from .template import render
+from .trace import span
+from .utils import mark_text, parse_size
 
 MarkerType = str
 MarkerArgsType = Tuple[str, List[Any]]
 MarkerKwargsType = Tuple[str, Dict[str, Any]]
+#: Name of a test in a suite or None for unnamed tests, and id of its parameters or None if it is not parametrized
+TestKey = Tuple[Optional[str], Optional[str]]
+
+LOCK_MODES = ('exclusive', 'shared')
+PARAMETRIZE_MODES = ('product', 'zip')
+PARAMETER_TYPES = (str, int, float, bool)
+PARAMETER_PATTERN = re.compile(r'\{(\w+)\}')
+SUITE_KEY = 'tests'
+MERGED_KEYS = ('environment', 'resources', 'limits', 'expect', 'benchmark')
+EXTENDED_KEYS = ('markers', 'fixtures', 'inputs')
+
+
+# Modules of anyconfig and marshmallow are imported on first use, since importing them takes longer than
+# starting pytest. Configs loaded from the config cache need neither of them.
 
 
 def validate_markers(obj: Any) -> None:
     """Validate config marker spec."""
+    from marshmallow import ValidationError
+
     if not isinstance(obj, (tuple, list)):
         raise ValidationError('Invalid marker collection type', field_name='markers')
 
@@ -37,6 +55,116 @@ def validate_markers(obj: Any) -> None:
             raise ValidationError(f'Invalid marker type for element {i}', field_name='markers')
 
 
+def validate_min(minimum: int) -> Callable[[Any], None]:
+    """Create validator of numbers that must not be less than minimum."""
+
+    def _validate(obj: Any) -> None:
+        from marshmallow import ValidationError
+
+        if obj < minimum:
+            raise ValidationError(f'Must be greater than or equal to {minimum}.')
+
+    return _validate
+
+
+def validate_size(obj: Any) -> None:
+    """Validate size with optional unit."""
+    from marshmallow import ValidationError
+
+    try:
+        parse_size(obj)
+    except ValueError as ex:
+        raise ValidationError(str(ex))
+
+
+def validate_locks(obj: Any) -> None:
+    """Validate lock modes."""
+    from marshmallow import ValidationError
+
+    for name, mode in obj.items():
+        if mode not in LOCK_MODES:
+            raise ValidationError(f'Invalid mode of lock {name}, must be one of: {", ".join(LOCK_MODES)}')
+
+
+def validate_patterns(obj: Any) -> None:
+    """Validate regular expressions."""
+    from marshmallow import ValidationError
+
+    for pattern in obj:
+        try:
+            re.compile(pattern)
+        except re.error as ex:
+            raise ValidationError(f'Invalid pattern {pattern!r}: {ex}')
+
+
+def validate_stream(obj: Any) -> None:
+    """Validate output stream."""
+    from marshmallow import ValidationError
+
+    if obj not in STREAM_CHOICES:
+        raise ValidationError(f'Invalid stream {obj}, must be one of: {", ".join(STREAM_CHOICES)}')
+
+
+def _is_marker(spec: Any) -> bool:
+    """Check if marker spec is a name or a name with positional or keyword arguments."""
+    if type(spec) is str:
+        return True
+    return type(spec) in (list, tuple) and len(spec) == 2 and type(spec[0]) is str and type(spec[1]) in (list, dict)
+
+
+def _parameters_error(obj: Any) -> Optional[str]:
+    """Describe why parameter values are invalid or return None if they are valid."""
+    if not obj:
+        return 'No parameters given'
+
+    for name, values in obj.items():
+        if type(name) is not str or not re.fullmatch(r'\w+', name):
+            return f'Invalid parameter name {name!r}, must only contain letters, digits and underscores'
+        if not values:
+            return f'No values given for parameter {name}'
+
+        for value in values:
+            markers = []
+            if type(value) is dict:
+                if 'value' not in value or set(value) - {'value', 'markers'}:
+                    return f'Invalid value of parameter {name}, mappings must have a value and optional markers'
+                value, markers = value['value'], value.get('markers', [])
+            if type(value) not in PARAMETER_TYPES:
+                return f'Invalid value of parameter {name}, must be a string, number or boolean'
+            if type(markers) is not list or not all(_is_marker(marker) for marker in markers):
+                return f'Invalid markers of parameter {name}'
+    return None
+
+
+def validate_parameters(obj: Any) -> None:
+    """Validate parameter values."""
+    from marshmallow import ValidationError
+
+    error = _parameters_error(obj)
+    if error:
+        raise ValidationError(error)
+
+
+def validate_parametrize_mode(obj: Any) -> None:
+    """Validate mode of combining parameter values."""
+    from marshmallow import ValidationError
+
+    if obj not in PARAMETRIZE_MODES:
+        raise ValidationError(f'Invalid mode {obj}, must be one of: {", ".join(PARAMETRIZE_MODES)}')
+
+
+def validate_thresholds(obj: Any) -> None:
+    """Validate benchmark thresholds."""
+    from marshmallow import ValidationError
+
+    names = [f'{metric}_{name}' for metric in METRICS for name in STATISTICS]
+    for name, threshold in obj.items():
+        if name not in names:
+            raise ValidationError(f'Invalid statistic {name}, must be one of: {", ".join(names)}')
+        if threshold < 0:
+            raise ValidationError(f'Invalid threshold of {name}, must not be negative')
+
+
 class ConfigError(RuntimeError):
     """Error typically raised if test config is invalid."""
 
@@ -54,6 +182,9 @@ class ConfigError(RuntimeError):
 
         return text
 
+    def __reduce__(self) -> Tuple:
+        return ConfigError, (self.msg, self.details, self.path)
+
     @singledispatchmethod
     @staticmethod  # Use staticmethod (see: https://bugs.python.org/issue39679)
     def of(ex, **kwargs):
@@ -68,8 +199,8 @@ class ConfigError(RuntimeError):
             **kwargs,
         )
 
-    @of.register
-    def _(ex: ValidationError, **kwargs: Dict[str, Any]):
+    @staticmethod
+    def _of_validation_error(ex, **kwargs: Dict[str, Any]):
         return ConfigError(
             'Invalid configuration values',
             pformat(ex.messages),
@@ -77,6 +208,105 @@ class ConfigError(RuntimeError):
         )
 
 
+@dataclass
+class TestResources:
+    """Resources used by a test executable while it is running.
+
+    Attributes:
+        cpus: Number of CPU slots occupied
+        memory: Estimated peak memory in bytes with optional unit like 512M or 8G
+        locks: Named locks held by the executable, either `exclusive` or `shared`
+    """
+
+    cpus: int = field(default=1, metadata={'validate': validate_min(1)})
+    memory: Optional[str] = field(default=None, metadata={'validate': validate_size})
+    locks: Dict[str, str] = field(default_factory=dict, metadata={'validate': validate_locks})
+
+    @property
+    def memory_bytes(self) -> int:
+        """Estimated peak memory in bytes."""
+        return parse_size(self.memory or '') or 0
+
+
+@dataclass
+class TestLimits:
+    """Limits of resources the test executable may use, enforced by the operating system.
+
+    Attributes:
+        cpu_time: CPU time in seconds after which the executable is killed
+        address_space: Maximum virtual memory with optional unit like 512M or 8G
+        open_files: Maximum number of open file descriptors
+        file_size: Maximum size of files written with optional unit like 1G
+    """
+
+    cpu_time: Optional[int] = field(default=None, metadata={'validate': validate_min(1)})
+    address_space: Optional[str] = field(default=None, metadata={'validate': validate_size})
+    open_files: Optional[int] = field(default=None, metadata={'validate': validate_min(1)})
+    file_size: Optional[str] = field(default=None, metadata={'validate': validate_size})
+
+    @property
+    def rlimits(self) -> Dict[str, int]:
+        """Values of all set limits in seconds, bytes or number of files."""
+        limits = {
+            'cpu_time': self.cpu_time,
+            'address_space': parse_size(self.address_space or ''),
+            'open_files': self.open_files,
+            'file_size': parse_size(self.file_size or ''),
+        }
+        return {name: value for name, value in limits.items() if value is not None}
+
+
+@dataclass
+class TestExpect:
+    """Patterns expected in the output of the test executable, searched in every line while it is running.
+
+    Attributes:
+        required: Regular expressions that must match at least one line
+        forbidden: Regular expressions that must not match any line
+        ordered: Regular expressions that must match lines in the given order
+        fail_fast: Kill executable as soon as a forbidden pattern matched
+        stream: Output to match, either `stdout`, `stderr` or `both`
+    """
+
+    required: List[str] = field(default_factory=list, metadata={'validate': validate_patterns})
+    forbidden: List[str] = field(default_factory=list, metadata={'validate': validate_patterns})
+    ordered: List[str] = field(default_factory=list, metadata={'validate': validate_patterns})
+    fail_fast: bool = True
+    stream: str = field(default='both', metadata={'validate': validate_stream})
+
+
+@dataclass
+class TestParametrize:
+    """Matrix of parameter values expanding a test config into a test per combination.
+
+    Attributes:
+        values: Values by parameter name, either strings, numbers or booleans or mappings of such a `value`
+            and `markers` added to the tests using it. Parameters are substituted for `{<name>}` in the
+            arguments and environment variables.
+        mode: Combine all values of all parameters as `product` or the n-th values of all parameters as `zip`
+    """
+
+    values: Dict[str, List[Any]] = field(metadata={'validate': validate_parameters})
+    mode: str = field(default='product', metadata={'validate': validate_parametrize_mode})
+
+
+@dataclass
+class TestBenchmark:
+    """Settings for benchmarking a test executable by running it repeatedly.
+
+    Attributes:
+        warmup: Number of runs before measuring
+        repetitions: Number of measured runs
+        concurrency: Number of runs executed at the same time
+        thresholds: Maximum relative increase of statistics like `wall_median` compared to the baseline
+    """
+
+    warmup: int = field(default=0, metadata={'validate': validate_min(0)})
+    repetitions: int = field(default=10, metadata={'validate': validate_min(1)})
+    concurrency: int = field(default=1, metadata={'validate': validate_min(1)})
+    thresholds: Dict[str, float] = field(default_factory=dict, metadata={'validate': validate_thresholds})
+
+
 @dataclass
 class TestConfig:
     """User-provided yastr test configuration.
@@ -93,6 +323,12 @@ class TestConfig:
             [<marker>, [<arg>, ...]]: Set marker with positional arguments
             [<marker>, {<arg key>: <arg value>, ...}]: Set marker with keyword arguments
         fixtures: Fixtures that shall be requested by test
+        inputs: Glob patterns of files relative to the config file the result of the test depends on
+        resources: Resources used by the executable for scheduling concurrent tests
+        limits: Limits of resources the executable may use
+        expect: Patterns expected in the output of the executable
+        parametrize: Parameter values the test is expanded into multiple tests by
+        benchmark: Settings for running the executable repeatedly as benchmark
     """
 
     executable: str
@@ -106,6 +342,12 @@ class TestConfig:
         metadata={'validate': validate_markers},
     )
     fixtures: List[str] = field(default_factory=list)
+    inputs: List[str] = field(default_factory=list)
+    resources: TestResources = field(default_factory=TestResources)
+    limits: TestLimits = field(default_factory=TestLimits)
+    expect: Optional[TestExpect] = None
+    parametrize: Optional[TestParametrize] = None
+    benchmark: Optional[TestBenchmark] = None
 
     @property
     def resolved_markers(self) -> List[pytest.Mark]:
@@ -127,13 +369,363 @@ class TestConfig:
         return [_resolve(spec) for spec in marker_specs]
 
 
-TestConfigSchema = class_schema(TestConfig)
+@lru_cache(maxsize=None)
+def _schema_class() -> type:
+    """Create marshmallow schema of test configs once and register conversion of its validation errors."""
+    from marshmallow import ValidationError
+    from marshmallow_dataclass import class_schema
+
+    ConfigError.of.register(ValidationError, ConfigError._of_validation_error)
+    return class_schema(TestConfig)
+
+
+def __getattr__(name: str) -> Any:
+    if name == 'TestConfigSchema':
+        return _schema_class()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+
+
+def _validation_error() -> type:
+    """Get class of validation errors raised by the schema, registering their conversion to ConfigError."""
+    from marshmallow import ValidationError
+
+    _schema_class()
+    return ValidationError
+
+
+def _invalid(*args: Any, **kwargs: Any) -> Exception:
+    """Create validation error that is converted like the errors raised by the schema."""
+    return _validation_error()(*args, **kwargs)
+
+
+class _Fallback(Exception):
+    """Raised by the fast path for values that must be deserialized by the schema."""
+
+
+def _check(condition: bool) -> None:
+    if not condition:
+        raise _Fallback()
+
+
+def _string(value: Any) -> str:
+    _check(type(value) is str)
+    return value
+
+
+def _strings(value: Any) -> List[str]:
+    _check(type(value) is list and all(type(item) is str for item in value))
+    return list(value)
+
+
+def _string_dict(value: Any) -> Dict[str, str]:
+    _check(type(value) is dict and all(type(key) is str and type(item) is str for key, item in value.items()))
+    return dict(value)
+
+
+def _number(value: Any) -> float:
+    _check(type(value) in (int, float) and math.isfinite(value))
+    return float(value)
+
+
+def _boolean(value: Any) -> bool:
+    _check(type(value) is bool)
+    return value
+
+
+def _integer(minimum: int) -> Callable[[Any], int]:
+
+    def _convert(value: Any) -> int:
+        _check(type(value) is int and value >= minimum)
+        return value
+
+    return _convert
+
+
+def _optional(convert: Callable[[Any], Any]) -> Callable[[Any], Any]:
+    return lambda value: None if value is None else convert(value)
+
+
+def _markers(value: Any) -> List[Union[MarkerType, MarkerArgsType, MarkerKwargsType]]:
+    _check(type(value) is list)
+    markers = []
+    for spec in value:
+        if type(spec) is str:
+            markers.append(spec)
+            continue
+
+        _check(type(spec) in (list, tuple) and len(spec) == 2 and type(spec[0]) is str)
+        name, args = spec
+        if type(args) is list:
+            markers.append((name, list(args)))
+        else:
+            _check(type(args) is dict and all(type(key) is str for key in args))
+            markers.append((name, dict(args)))
+    return markers
+
+
+def _size(value: Any) -> str:
+    parse_size(_string(value))
+    return value
+
+
+def _locks(value: Any) -> Dict[str, str]:
+    locks = _string_dict(value)
+    _check(all(mode in LOCK_MODES for mode in locks.values()))
+    return locks
+
+
+def _stream(value: Any) -> str:
+    _check(_string(value) in STREAM_CHOICES)
+    return value
+
+
+def _patterns(value: Any) -> List[str]:
+    patterns = _strings(value)
+    for pattern in patterns:
+        try:
+            re.compile(pattern)
+        except re.error:
+            raise _Fallback() from None
+    return patterns
+
+
+def _parameters(value: Any) -> Dict[str, List[Any]]:
+    _check(type(value) is dict and all(type(values) is list for values in value.values()))
+    _check(_parameters_error(value) is None)
+    return {name: list(values) for name, values in value.items()}
+
+
+def _parametrize_mode(value: Any) -> str:
+    _check(_string(value) in PARAMETRIZE_MODES)
+    return value
+
+
+def _thresholds(value: Any) -> Dict[str, float]:
+    _check(type(value) is dict)
+    names = [f'{metric}_{name}' for metric in METRICS for name in STATISTICS]
+    thresholds = {name: _number(threshold) for name, threshold in value.items()}
+    _check(all(name in names and threshold >= 0 for name, threshold in thresholds.items()))
+    return thresholds
+
+
+def _nested(cls: type, converters: Dict[str, Callable[[Any], Any]]) -> Callable[[Any], Any]:
+
+    def _convert(value: Any) -> Any:
+        _check(type(value) is dict and all(key in converters for key in value))
+        return cls(**{key: converters[key](item) for key, item in value.items()})
+
+    return _convert
+
+
+#: Converters of raw values of test config fields by the fast path
+_CONVERTERS: Dict[str, Callable[[Any], Any]] = {
+    'executable': _string,
+    'args': _strings,
+    'environment': _string_dict,
+    'timeout': _optional(_number),
+    'encoding': _string,
+    'skip': _boolean,
+    'markers': _markers,
+    'fixtures': _strings,
+    'inputs': _strings,
+    'resources': _nested(TestResources, {
+        'cpus': _integer(1),
+        'memory': _optional(_size),
+        'locks': _locks,
+    }),
+    'limits': _nested(TestLimits, {
+        'cpu_time': _optional(_integer(1)),
+        'address_space': _optional(_size),
+        'open_files': _optional(_integer(1)),
+        'file_size': _optional(_size),
+    }),
+    'expect': _optional(
+        _nested(TestExpect, {
+            'required': _patterns,
+            'forbidden': _patterns,
+            'ordered': _patterns,
+            'fail_fast': _boolean,
+            'stream': _stream,
+        })),
+    'parametrize': _optional(_nested(TestParametrize, {
+        'values': _parameters,
+        'mode': _parametrize_mode,
+    })),
+    'benchmark': _optional(
+        _nested(TestBenchmark, {
+            'warmup': _integer(0),
+            'repetitions': _integer(1),
+            'concurrency': _integer(1),
+            'thresholds': _thresholds,
+        })),
+}
+
+
+def _fast_values(data: Any, partial: bool = False) -> Optional[Dict[str, Any]]:
+    """Convert raw config values without the schema.
+
+    Only values of the types parsed from YAML or JSON are accepted. For everything else, including
+    all invalid values, None is returned so the schema decides and builds detailed error messages.
+    """
+    if type(data) is not dict or not partial and 'executable' not in data:
+        return None
+
+    try:
+        return {key: _CONVERTERS[key](value) for key, value in data.items()}
+    except (_Fallback, KeyError, ValueError, TypeError, OverflowError):
+        return None
+
+
+def validate_config(data: Any) -> TestConfig:
+    """Validate raw config values and create test config, using the schema only if the fast path fails."""
+    values = _fast_values(data)
+    if values is not None:
+        return TestConfig(**values)
+    return _schema_class()().load(data)
+
+
+def _parameter(value: Any) -> Tuple[str, List[Union[MarkerType, MarkerArgsType, MarkerKwargsType]]]:
+    """Get text of parameter value and the markers it adds."""
+    if type(value) is not dict:
+        return str(value), []
+    markers = [marker if type(marker) is str else tuple(marker) for marker in value.get('markers', [])]
+    return str(value['value']), markers
+
+
+def expand_config(config: TestConfig) -> Dict[str, TestConfig]:
+    """Expand parametrized test config into a config per combination of parameter values by their id.
+
+    The id of a combination lists the parameters like `threads=8-size=large`.
+    """
+    spec = config.parametrize
+    names = list(spec.values)
+    columns = [[_parameter(value) for value in values] for values in spec.values.values()]
+    if spec.mode == 'zip':
+        if len({len(column) for column in columns}) > 1:
+            raise _invalid({'parametrize': ['Zipped parameters need the same number of values.']})
+        combinations = zip(*columns)
+    else:
+        combinations = itertools.product(*columns)
+
+    def _substitute(text: str, values: Dict[str, str]) -> str:
+        return PARAMETER_PATTERN.sub(lambda match: values.get(match.group(1), match.group(0)), text)
+
+    configs = {}
+    for combination in combinations:
+        values = {name: text for name, (text, _) in zip(names, combination)}
+        param_id = '-'.join(f'{name}={text}' for name, text in values.items())
+        if param_id in configs:
+            param_id = f'{param_id}-{len(configs)}'
+        configs[param_id] = replace(
+            config,
+            args=[_substitute(arg, values) for arg in config.args],
+            environment={key: _substitute(value, values) for key, value in config.environment.items()},
+            markers=config.markers + [marker for _, markers in combination for marker in markers],
+            parametrize=None,
+        )
+    return configs
+
+
+def _expanded(name: Optional[str], config: TestConfig) -> Dict[TestKey, TestConfig]:
+    """Get configs of test by name and parameter id, expanded if it is parametrized."""
+    if config.parametrize is None:
+        return {(name, None): config}
+    return {(name, param_id): expanded for param_id, expanded in expand_config(config).items()}
+
+
+def merge_config(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge raw config values with inherited ones.
+
+    Environment variables, resources, limits, expectations and benchmark settings are merged, markers,
+    fixtures and inputs are extended and all other values are replaced.
+    """
+    merged = dict(base)
+    for key, value in override.items():
+        inherited = base.get(key)
+        if key in MERGED_KEYS and isinstance(inherited, dict) and isinstance(value, dict):
+            merged[key] = {**inherited, **value}
+        elif key in EXTENDED_KEYS and isinstance(inherited, list) and isinstance(value, list):
+            merged[key] = inherited + value
+        else:
+            merged[key] = value
+    return merged
+
+
+def _load_raw(path: Path) -> Any:
+    import anyconfig
+
+    parser = anyconfig.find(path)
+
+    with span('render', 'config', path=str(path)):
+        content = render(path, path.read_text())
+
+    with span('parse', 'config', path=str(path)):
+        return parser.loads(content)
 
 
 def load_config(path: Path) -> TestConfig:
     """Load test configuration from yaml or json file path."""
     try:
-        config = anyconfig.load(path, ac_template=True, ac_context={'os': os, 'platform': platform})
-        return TestConfigSchema().load(config)
+        return validate_config(_load_raw(path))
+    except Exception as ex:
+        raise ConfigError.of(ex, path=path)
+
+
+def load_defaults(path: Path) -> Dict[str, Any]:
+    """Load default test configuration values from yaml or json file path."""
+    try:
+        defaults = _load_raw(path)
+        if not isinstance(defaults, dict):
+            raise _invalid('Invalid defaults type')
+
+        with span('validate', 'config', path=str(path)):
+            if _fast_values(defaults, partial=True) is not None:
+                return defaults
+            errors = _schema_class()().validate(defaults, partial=True)
+        if errors:
+            raise _invalid(errors)
+        return defaults
+    except Exception as ex:
+        raise ConfigError.of(ex, path=path)
+
+
+def load_tests(path: Path, defaults: Optional[Dict[str, Any]] = None) -> Dict[TestKey, TestConfig]:
+    """Load test configurations from yaml or json file path.
+
+    Files with a `tests` key are suite manifests declaring multiple tests by name, all other
+    values of them are defaults for these tests. Names that are no strings, like numbers in yaml,
+    are converted to strings. Other files declare a single unnamed test.
+
+    Parametrized tests are expanded after validating them once. The tests are keyed by their name, or
+    None if unnamed, and the id of their parameters, or None if they are not parametrized, e.g.
+    `('first', 'threads=8')` or `(None, None)`.
+    """
+    defaults = defaults or {}
+
+    try:
+        config = _load_raw(path)
+        if not isinstance(config, dict):
+            return {(None, None): validate_config(config)}
+        if SUITE_KEY not in config:
+            with span('validate', 'config', path=str(path)):
+                return _expanded(None, validate_config(merge_config(defaults, config)))
+
+        suite = dict(config)
+        tests = suite.pop(SUITE_KEY)
+        if not isinstance(tests, dict):
+            raise _invalid('Invalid test collection type', field_name=SUITE_KEY)
+
+        defaults = merge_config(defaults, suite)
+        configs = {}
+        with span('validate', 'config', path=str(path)):
+            for name, test in tests.items():
+                name = str(name)
+                try:
+                    if test is not None and not isinstance(test, dict):
+                        raise _invalid('Invalid test config type')
+                    configs.update(_expanded(name, validate_config(merge_config(defaults, test or {}))))
+                except _validation_error() as ex:
+                    raise _invalid({SUITE_KEY: {name: ex.messages}})
+        return configs
     except Exception as ex:
         raise ConfigError.of(ex, path=path)
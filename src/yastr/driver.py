@@ -0,0 +1,119 @@
+"""Reference implementation of a yastr test driver.
+
+Called with a command, the driver runs it once and exits with its exit code. Called without arguments,
+it serves tests sent by yastr as line-delimited JSON on stdin until stdin is closed:
+
+    request:  {"id": 1, "command": ["exe", "arg"], "env": {"KEY": "value"} | null, "timeout": 1.0 | null,
+               "limits": {"cpu_time": 10, ...} | null, "grace": 5.0, "expect": {"required": ["^ok$"], ...} | null,
+               "output": {"stdout": {"path": "out.log" | null, "memory": 1048576, "limit": 1024 | null}, "stderr": ...}}
+    response: {"id": 1, "returncode": 0 | null, "timed_out": false, "usage": {"user_time": 0.1, ...} | null,
+               "stdout": {"head": "<base64>", "tail": "<base64>", "size": 10, "written": 0}, "stderr": ...,
+               "unmet": ["Required pattern '^ok$' not found", ...]}
+
+Outputs are streamed into the spool files given by the request, only their head and tail kept in memory are
+transferred. If the executable cannot be run, the response contains an `error` message instead of the results.
+If the driver is terminated while running an executable, the process group of the executable is killed.
+"""
+
+import base64
+import dataclasses
+import json
+import os
+import re
+import signal
+import subprocess
+import sys
+from pathlib import Path
+from typing import IO, Any, Dict, List, Optional
+
+from .expect import Expectations
+from .runner import KILL_GRACE, OutputSpool, execute
+
+
+def _spool(spec: Optional[Dict[str, Any]]) -> OutputSpool:
+    if not spec:
+        return OutputSpool(memory=sys.maxsize)
+    return OutputSpool(Path(spec['path']) if spec.get('path') else None, spec['memory'], spec.get('limit'))
+
+
+def _encode(output: OutputSpool) -> Dict[str, Any]:
+    return {
+        'head': base64.b64encode(output.head).decode('ascii'),
+        'tail': base64.b64encode(output.tail).decode('ascii'),
+        'size': output.size,
+        'written': output.written,
+    }
+
+
+def handle(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Run test of request and create response."""
+    try:
+        expect = request.get('expect')
+        output = request.get('output') or {}
+        result = execute(
+            request['command'],
+            request.get('env'),
+            request.get('timeout'),
+            _spool(output.get('stdout')),
+            _spool(output.get('stderr')),
+            limits=request.get('limits'),
+            grace=request.get('grace', KILL_GRACE),
+            expect=Expectations(**expect) if expect else None,
+        )
+    except FileNotFoundError as ex:
+        return {'id': request.get('id'), 'error': f'Executable {ex.filename} not found'}
+    except (LookupError, TypeError, ValueError, re.error, OSError) as ex:
+        return {'id': request.get('id'), 'error': f'Invalid request: {ex!r}'}
+
+    return {
+        'id': request.get('id'),
+        'returncode': result.returncode,
+        'stdout': _encode(result.stdout),
+        'stderr': _encode(result.stderr),
+        'timed_out': result.timed_out,
+        'usage': dataclasses.asdict(result.usage) if result.usage else None,
+        'unmet': result.unmet,
+    }
+
+
+def serve(requests: IO[bytes], responses: IO[bytes]) -> None:
+    """Answer requests until the input is closed."""
+    for line in requests:
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('Request is not an object')
+        except ValueError as ex:
+            response = {'id': None, 'error': f'Invalid request: {ex}'}
+        else:
+            response = handle(request)
+
+        responses.write(json.dumps(response).encode() + b'\n')
+        responses.flush()
+
+
+def _terminate(signum: int, frame: Any) -> None:
+    # Exit by raising SystemExit, so the process group of a running executable is killed before exiting
+    sys.exit(128 + signum)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        return subprocess.call(argv)
+
+    # Keep the protocol channel away from executables and stray prints
+    requests = os.fdopen(os.dup(sys.stdin.fileno()), 'rb')
+    responses = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+    with open(os.devnull, 'rb') as devnull:
+        os.dup2(devnull.fileno(), sys.stdin.fileno())
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    signal.signal(signal.SIGTERM, _terminate)
+
+    with requests, responses:
+        serve(requests, responses)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
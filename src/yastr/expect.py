@@ -0,0 +1,147 @@
+"""Matching of expected patterns in the output of executables while they are running."""
+
+from __future__ import annotations
+
+import codecs
+import re
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, List, Sequence
+
+#: Output streams patterns can be matched against
+STREAM_CHOICES = ('stdout', 'stderr', 'both')
+
+#: Characters after which an unterminated line is matched, so a single line cannot fill the memory
+MAX_LINE_LENGTH = 64 * 1024
+
+#: Characters of a matched line quoted in messages
+QUOTED_LENGTH = 200
+
+
+def _quote(line: str) -> str:
+    return repr(line if len(line) <= QUOTED_LENGTH else line[:QUOTED_LENGTH] + '...')
+
+
+class Expectations:
+    """Compiled patterns expected in the output of an executable.
+
+    Patterns are regular expressions searched in every line of the output. Required patterns must match
+    any line, ordered patterns must match lines in the given order and forbidden patterns must not match
+    any line. If `fail_fast` is set, the executable shall be stopped as soon as a forbidden pattern matched.
+    """
+
+    def __init__(self,
+                 required: Sequence[str] = (),
+                 forbidden: Sequence[str] = (),
+                 ordered: Sequence[str] = (),
+                 fail_fast: bool = True,
+                 stream: str = 'both',
+                 encoding: str = 'utf-8') -> None:
+        if stream not in STREAM_CHOICES:
+            raise ValueError(f'Invalid stream {stream}, must be one of: {", ".join(STREAM_CHOICES)}')
+        codecs.lookup(encoding)
+
+        self.required = [re.compile(pattern) for pattern in required]
+        self.forbidden = [re.compile(pattern) for pattern in forbidden]
+        self.ordered = [re.compile(pattern) for pattern in ordered]
+        self.fail_fast = fail_fast
+        self.streams = ('stdout', 'stderr') if stream == 'both' else (stream, )
+        self.encoding = encoding
+        # Lines not matching any forbidden pattern are rejected by a single search
+        self._any_forbidden = re.compile('|'.join(f'(?:{pattern})' for pattern in forbidden)) if forbidden else None
+
+    def spec(self) -> Dict[str, object]:
+        """Arguments for creating the same expectations in another process."""
+        return {
+            'required': [pattern.pattern for pattern in self.required],
+            'forbidden': [pattern.pattern for pattern in self.forbidden],
+            'ordered': [pattern.pattern for pattern in self.ordered],
+            'fail_fast': self.fail_fast,
+            'stream': 'both' if len(self.streams) == 2 else self.streams[0],
+            'encoding': self.encoding,
+        }
+
+    def matcher(self) -> OutputMatcher:
+        """Create matcher for a single run of the executable."""
+        return OutputMatcher(self)
+
+
+class OutputMatcher:
+    """State of matching expectations against the output of a single run.
+
+    Output is fed in chunks as it is read. Only the current unterminated line of each stream and the first
+    match of each forbidden pattern are kept.
+    """
+
+    def __init__(self, expectations: Expectations) -> None:
+        self.expectations = expectations
+        self.aborted = False
+        self._required = list(expectations.required)
+        self._next_ordered = 0
+        self._forbidden: Dict[str, str] = {}
+        self._lines: Dict[str, int] = {stream: 0 for stream in expectations.streams}
+        self._partial: Dict[str, str] = {stream: '' for stream in expectations.streams}
+        self._decoders = {
+            stream: codecs.getincrementaldecoder(expectations.encoding)(errors='replace')
+            for stream in expectations.streams
+        }
+
+    def feed(self, stream: str, data: bytes, final: bool = False) -> bool:
+        """Match lines completed by the data and return whether the executable shall be stopped.
+
+        True is returned once, for the chunk completing the first line that matched a forbidden pattern
+        if `fail_fast` is set.
+        """
+        if stream not in self._decoders:
+            return False
+
+        text = self._partial[stream] + self._decoders[stream].decode(data, final)
+        lines = text.split('\n')
+        partial = lines.pop()
+        if partial and (final or len(partial) > MAX_LINE_LENGTH):
+            lines.append(partial)
+            partial = ''
+        self._partial[stream] = partial
+
+        for line in lines:
+            self._lines[stream] += 1
+            self._match(stream, line[:-1] if line.endswith('\r') else line)
+
+        if self.expectations.fail_fast and self._forbidden and not self.aborted:
+            self.aborted = True
+            return True
+        return False
+
+    def _match(self, stream: str, line: str) -> None:
+        expectations = self.expectations
+        if expectations._any_forbidden and expectations._any_forbidden.search(line):
+            for pattern in expectations.forbidden:
+                if pattern.pattern not in self._forbidden and pattern.search(line):
+                    self._forbidden[pattern.pattern] = (f'Forbidden pattern {pattern.pattern!r} matched line '
+                                                        f'{self._lines[stream]} of {stream}: {_quote(line)}')
+
+        if self._required:
+            self._required = [pattern for pattern in self._required if not pattern.search(line)]
+
+        position = 0
+        while self._next_ordered < len(expectations.ordered):
+            match = expectations.ordered[self._next_ordered].search(line, position)
+            if not match:
+                break
+            self._next_ordered += 1
+            position = match.end()
+
+    def close(self) -> List[str]:
+        """Match remaining unterminated lines and describe all unmet expectations."""
+        for stream in self._decoders:
+            self.feed(stream, b'', final=True)
+
+        unmet = list(self._forbidden.values())
+        unmet.extend(f'Required pattern {pattern.pattern!r} not found' for pattern in self._required)
+        ordered = self.expectations.ordered
+        if self._next_ordered < len(ordered):
+            after = f' after {ordered[self._next_ordered - 1].pattern!r}' if self._next_ordered else ''
+            unmet.append(f'Ordered pattern {ordered[self._next_ordered].pattern!r} '
+                         f'({self._next_ordered + 1} of {len(ordered)}) not found{after}')
+        return unmet
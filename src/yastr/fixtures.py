@@ -1,17 +1,31 @@
 from __future__ import annotations
 
 import inspect
-from contextlib import ExitStack, contextmanager
+from collections import Counter
+from contextlib import ExitStack, contextmanager, nullcontext
+from functools import lru_cache
+from threading import Lock, RLock
 from typing import TYPE_CHECKING
 from weakref import finalize
 
-from wrapt import ObjectProxy
+from pytest import Package, StashKey
+
+from . import trace
 
 if TYPE_CHECKING:
-    from typing import Any, List
+    from typing import Any, ContextManager, Dict, List, Optional, Sequence, Tuple
 
+    from _pytest.fixtures import FixtureDef
     from pytest import Node
 
+#: Fixture scopes ordered from lower to higher
+SCOPES = ('function', 'class', 'module', 'package', 'session')
+
+#: Scopes whose fixture values are shared between tests
+SHARED_SCOPES = ('module', 'package', 'session')
+
+fixture_plans_key = StashKey['Dict[Tuple[str, Tuple[str, ...]], FixturePlan]']()
+
 
 class FixtureLookupError(LookupError):
     """Exception typically raised if fixture is undefined."""
@@ -24,17 +38,181 @@ class FixtureLookupError(LookupError):
         return f'fixture \'{self.argname}\' not found'
 
 
+class ScopeMismatch(Exception):
+    """Exception raised if a fixture requests another fixture of a lower scope."""
+
+    def __init__(self, argname: str, scope: str, requested_scope: str) -> None:
+        super().__init__(argname, scope, requested_scope)
+        self.argname = argname
+        self.scope = scope
+        self.requested_scope = requested_scope
+
+    def __str__(self) -> str:
+        return (f'You tried to access the {self.requested_scope} scoped fixture \'{self.argname}\' '
+                f'with a {self.scope} scoped request object')
+
+
+def scope_key(node: Node, scope: str) -> Tuple[str, str]:
+    """Key identifying the instance of a shared scope a yastr test belongs to.
+
+    Module scope is bound to the config file, package scope to the enclosing package or the folder
+    of the config file if it is not part of a package.
+    """
+    if scope == 'module':
+        return scope, str(node.path)
+    if scope == 'package':
+        package = node.getparent(Package)
+        return scope, str(package.path if package else node.path.parent)
+    return scope, ''
+
+
+class FixturePlan:
+    """Resolved fixtures requested by yastr tests.
+
+    The fixture closure is resolved once for all tests of a folder requesting the same fixtures.
+
+    Attributes:
+        fixture_defs: Definitions of all fixtures in the closure by name
+        order: Requested fixtures and their dependencies ordered so that dependencies come first
+    """
+
+    def __init__(self, node: Node, names: Sequence[str]) -> None:
+        fixture_manager = node.session._fixturemanager
+        fixture_info = fixture_manager.getfixtureinfo(node, None, None, funcargs=False)
+        self.fixture_defs: Dict[str, Sequence[FixtureDef]] = fixture_manager.getfixtureclosure(
+            fixture_info.names_closure, node)[2]
+        self.order: List[str] = []
+
+        visited = set()
+        for name in names:
+            self._visit(name, visited)
+
+    def __repr__(self) -> str:
+        return f'<FixturePlan {self.order!r}>'
+
+    @property
+    def fixturenames(self) -> List[str]:
+        return list(self.fixture_defs.keys())
+
+    def getfixturedef(self, name: str) -> Optional[FixtureDef]:
+        """Get definition of fixture visible to the tests or None if it is undefined."""
+        fixture_defs = self.fixture_defs.get(name)
+        return fixture_defs[-1] if fixture_defs else None
+
+    def _visit(self, name: str, visited: set) -> None:
+        if name in visited or name == 'request':
+            return
+        visited.add(name)
+
+        fixture_def = self.getfixturedef(name)
+        if fixture_def is not None:
+            for param in fixture_def.argnames:
+                param_def = self.getfixturedef(param)
+                if param_def is not None and SCOPES.index(param_def.scope) < SCOPES.index(fixture_def.scope):
+                    raise ScopeMismatch(param, fixture_def.scope, param_def.scope)
+                self._visit(param, visited)
+        self.order.append(name)
+
+    @classmethod
+    def of(cls, node: Node) -> FixturePlan:
+        """Get memoized plan for fixtures requested by node."""
+        names = tuple(arg for mark in node.iter_markers(name='usefixtures') for arg in mark.args)
+        key = (str(node.path.parent), names)
+
+        plans = node.session.stash.setdefault(fixture_plans_key, {})
+        if key not in plans:
+            plans[key] = cls(node, names)
+        return plans[key]
+
+
+class FixtureScope:
+    """Fixture values of a shared scope instance."""
+
+    def __init__(self) -> None:
+        self.values: Dict[str, Any] = {}
+        self.stack = ExitStack()
+        self.lock = RLock()
+
+
+class FixtureScopes:
+    """Fixture values shared between yastr tests.
+
+    Every registered test is a user of its module, package and session scope. A scope is torn down
+    as soon as its last user was released.
+
+    Values are not cached by the pytest FixtureDefs, since yastr tests set up their fixtures in worker
+    threads while pytest only tracks the setup and teardown of the item run by the main thread. Thus
+    fixtures used by Python tests as well are set up once more for yastr tests.
+    """
+
+    def __init__(self) -> None:
+        self._scopes: Dict[Tuple[str, str], FixtureScope] = {}
+        self._users = Counter()
+        self._lock = Lock()
+
+    def register(self, node: Node) -> None:
+        """Register test as user of its scopes."""
+        for scope in SHARED_SCOPES:
+            self._users[scope_key(node, scope)] += 1
+
+    def get(self, node: Node, scope: str) -> FixtureScope:
+        """Get scope instance of test."""
+        key = scope_key(node, scope)
+        with self._lock:
+            if key not in self._scopes:
+                self._scopes[key] = FixtureScope()
+            return self._scopes[key]
+
+    def release(self, node: Node) -> None:
+        """Release test and tear down scopes without any remaining users."""
+        for scope in SHARED_SCOPES:
+            key = scope_key(node, scope)
+            if self._users[key] <= 0:
+                continue
+
+            self._users[key] -= 1
+            if self._users[key] == 0:
+                self._teardown(key)
+
+    def close(self) -> None:
+        """Tear down all scopes, starting with the lowest ones."""
+        for key in sorted(self._scopes, key=lambda key: SCOPES.index(key[0])):
+            self._teardown(key)
+
+    def _teardown(self, key: Tuple[str, str]) -> None:
+        with self._lock:
+            fixture_scope = self._scopes.pop(key, None)
+        if fixture_scope:
+            fixture_scope.stack.close()
+
+
+class _TracedTeardown:
+    """Context manager of a fixture recording its teardown."""
+
+    def __init__(self, cm: ContextManager, name: str, scope: str) -> None:
+        self.cm = cm
+        self.name = name
+        self.scope = scope
+
+    def __enter__(self) -> Any:
+        return self.cm.__enter__()
+
+    def __exit__(self, *exc_info: Any) -> Optional[bool]:
+        with trace.span('teardown fixture', 'fixture', fixture=self.name, scope=self.scope):
+            return self.cm.__exit__(*exc_info)
+
+
 class FixtureRequest:
     """Fixture request of yastr test.
-    
+
     This class shall be compatible with the pytest FixtureRequest.
     """
 
-    def __init__(self, node: Node) -> None:
+    def __init__(self, node: Node, scopes: Optional[FixtureScopes] = None) -> None:
         self.node = node
         self.session = node.session
         self.fixturename = None
-        self.scope = 'session'
+        self.scope = 'function'
         self.config = node.config
         self.function = None
         self.cls = None
@@ -43,12 +221,12 @@ class FixtureRequest:
         self.fspath = node.fspath
         self.keywords = node.keywords
 
-        self._fixture_manager = node.session._fixturemanager
-        self._fixture_info = self._fixture_manager.getfixtureinfo(node, None, None, funcargs=False)
-        self._fixture_defs = self._fixture_manager.getfixtureclosure(self._fixture_info.names_closure, node)[2]
+        self._plan = FixturePlan.of(node)
 
         self._cache = {}
         self._stack = ExitStack()
+        self._scopes = scopes or FixtureScopes()
+        self._owns_scopes = scopes is None
 
         finalize(self, self._stack.close)
 
@@ -57,7 +235,7 @@ class FixtureRequest:
 
     @property
     def fixturenames(self) -> List[str]:
-        return list(self._fixture_defs.keys())
+        return self._plan.fixturenames
 
     def addfinalizer(self, finalizer) -> None:
         self._stack.callback(finalizer)
@@ -72,57 +250,108 @@ class FixtureRequest:
         if name == 'request':
             return self
 
-        # Return cached value if available
-        if name in self._cache:
-            return self._cache[name]
-
-        try:
-            fixture_def = self._fixture_defs[name][0]
-        except (KeyError, IndexError):
+        fixture_def = self._plan.getfixturedef(name)
+        if fixture_def is None:
             self.raiseerror(name)
 
-        func = fixture_def.func
-        sig = inspect.signature(func)
-        param_names = sig.parameters.keys()
-        param_values = {param: SubRequest(self, name).getfixturevalue(param) for param in param_names}
-
-        if inspect.isgeneratorfunction(func):
-            func = contextmanager(func)
-            cm = func(**param_values)
-            value = self._stack.enter_context(cm)
+        if fixture_def.scope in SHARED_SCOPES:
+            fixture_scope = self._scopes.get(self.node, fixture_def.scope)
+            cache, stack, lock = fixture_scope.values, fixture_scope.stack, fixture_scope.lock
         else:
-            value = func(**param_values)
-
-        self._cache[name] = value
-        return value
+            cache, stack, lock = self._cache, self._stack, nullcontext()
+
+        with lock:
+            # Return cached value if available
+            if name in cache:
+                return cache[name]
+
+            func = fixture_def.func
+            if 'request' in fixture_def.argnames:
+                sub_request = _sub_request_class()(self, name, fixture_def.scope, stack)
+                param_values = {param: sub_request.getfixturevalue(param) for param in fixture_def.argnames}
+            else:
+                # Scopes of dependencies were already checked by the plan
+                param_values = {param: self.getfixturevalue(param) for param in fixture_def.argnames}
+
+            with trace.span('setup fixture', 'fixture', fixture=name, scope=fixture_def.scope):
+                if inspect.isgeneratorfunction(func):
+                    func = contextmanager(func)
+                    cm = func(**param_values)
+                    if trace.active():
+                        cm = _TracedTeardown(cm, name, fixture_def.scope)
+                    value = stack.enter_context(cm)
+                else:
+                    value = func(**param_values)
+
+            cache[name] = value
+            return value
 
     def _execute(self) -> None:
         """Acquire requested fixtures."""
-        fixture_names = tuple(arg for mark in self.node.iter_markers(name='usefixtures') for arg in mark.args)
-        for name in fixture_names:
+        for name in self._plan.order:
             self.getfixturevalue(name)
 
     def _teardown(self) -> None:
         """Teardown acquired fixtures."""
-        self._stack.close()
+        with trace.span('teardown fixtures', 'fixture'):
+            self._stack.close()
+        if self._owns_scopes:
+            self._scopes.close()
 
 
-class SubRequest(ObjectProxy):
-    """Request for dependency of fixture request."""
+@lru_cache(maxsize=None)
+def _sub_request_class() -> type:
+    """Create class of sub requests, importing wrapt only once a fixture requests them."""
+    from wrapt import ObjectProxy
 
-    def __init__(self, request: FixtureRequest, fixturename: str) -> None:
-        super().__init__(request)
-        self._self_fixturename = fixturename
+    class SubRequest(ObjectProxy):
+        """Request for dependency of fixture request."""
 
-    def __repr__(self) -> str:
-        return f'<SubRequest {self.fixturename!r} for {self.node!r}>'
+        def __init__(self, request: FixtureRequest, fixturename: str, scope: str, stack: ExitStack) -> None:
+            super().__init__(request)
+            self._self_fixturename = fixturename
+            self._self_scope = scope
+            self._self_stack = stack
 
-    @property
-    def fixturename(self) -> List[str]:
-        return self._self_fixturename
+        def __repr__(self) -> str:
+            return f'<SubRequest {self.fixturename!r} for {self.node!r}>'
+
+        @property
+        def fixturename(self) -> List[str]:
+            return self._self_fixturename
+
+        @property
+        def scope(self) -> str:
+            return self._self_scope
+
+        @property
+        def node(self) -> Node:
+            node = self.__wrapped__.node
+            if self._self_scope == 'session':
+                return node.session
+            if self._self_scope == 'package':
+                return node.getparent(Package) or node.session
+            if self._self_scope == 'module':
+                return node.parent
+            return node
+
+        def addfinalizer(self, finalizer) -> None:
+            self._self_stack.callback(finalizer)
+
+        def getfixturevalue(self, name: str) -> Any:
+            if name == 'request':
+                return self
+
+            fixture_def = self.__wrapped__._plan.getfixturedef(name)
+            if fixture_def is not None and SCOPES.index(fixture_def.scope) < SCOPES.index(self._self_scope):
+                raise ScopeMismatch(name, self._self_scope, fixture_def.scope)
+
+            return self.__wrapped__.getfixturevalue(name)
+
+    return SubRequest
 
-    def getfixturevalue(self, name: str) -> Any:
-        if name == 'request':
-            return self
 
-        return self.__wrapped__.getfixturevalue(name)
+def __getattr__(name: str) -> Any:
+    if name == 'SubRequest':
+        return _sub_request_class()
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
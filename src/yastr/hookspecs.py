@@ -0,0 +1,19 @@
+"""Hooks provided by yastr."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, Optional
+
+    from pytest import Config
+
+
+def pytest_yastr_template_context(config: Config) -> Optional[Dict[str, Any]]:
+    """Provide extra values available in all templated test configs.
+
+    Called once per session before any config is loaded. The returned values of all implementations are
+    merged. They are passed to the processes loading configs in parallel and must be picklable if these are
+    spawned instead of forked.
+    """
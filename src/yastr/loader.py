@@ -0,0 +1,154 @@
+"""Batch loading of test configs."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING
+
+from . import template, trace
+from .config import ConfigError, load_defaults, load_tests, merge_config
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+    from .cache import ConfigCache
+    from .config import TestConfig, TestKey
+    from .template import Dependencies
+
+    TestConfigs = Dict[TestKey, TestConfig]
+    LoadResult = Tuple[Union[TestConfigs, ConfigError], Dependencies]
+
+#: Minimum number of configs that must be loaded before a process pool is used
+PARALLEL_THRESHOLD = 32
+
+#: Start method of worker processes. Forking is not safe on macOS and unavailable on Windows, spawned workers
+#: of frozen executables require them to call multiprocessing.freeze_support() first.
+START_METHOD = 'fork' if sys.platform == 'linux' else 'spawn'
+
+
+def _load(path: Path, defaults: Dict[str, Any]) -> LoadResult:
+    """Load configs and return error instead of raising it, together with the templates and variables read."""
+    with template.recording() as dependencies:
+        try:
+            return load_tests(path, defaults), dependencies
+        except ConfigError as ex:
+            return ex, dependencies
+
+
+def _load_traced(path: Path, defaults: Dict[str, Any]) -> Tuple[LoadResult, List[Dict[str, Any]]]:
+    """Load configs in worker process and return the recorded trace events as well."""
+    tracer = trace.start()
+    try:
+        return _load(path, defaults), tracer.events
+    finally:
+        trace.stop()
+
+
+class ConfigLoader:
+    """Loader of test configs.
+
+    Config files are registered first and loaded all together as soon as the first config is
+    requested. Configs that are not cached are loaded by a pool of worker processes.
+
+    Default values are inherited from defaults files in the config folder and all its parents up to
+    the root path. They are loaded once per folder.
+    """
+
+    def __init__(self,
+                 workers: int,
+                 rootpath: Path,
+                 defaults_patterns: Sequence[str] = (),
+                 cache: Optional[ConfigCache] = None) -> None:
+        self.workers = workers
+        self.rootpath = rootpath
+        self.defaults_patterns = defaults_patterns
+        self.cache = cache
+        self._pending: List[Path] = []
+        self._results: Dict[Path, Union[TestConfigs, ConfigError]] = {}
+        self._defaults: Dict[Path, Union[Tuple[Dict[str, Any], str], ConfigError]] = {}
+
+    def add(self, path: Path) -> None:
+        """Register config file for loading."""
+        self._pending.append(path)
+
+    def get(self, path: Path) -> TestConfigs:
+        """Get test configs of file, loading all registered files if necessary."""
+        if path not in self._results:
+            if path not in self._pending:
+                self._pending.append(path)
+            self._load_pending()
+
+        result = self._results[path]
+        if isinstance(result, ConfigError):
+            raise result
+        return result
+
+    def defaults(self, folder: Path) -> Tuple[Dict[str, Any], str]:
+        """Get default values for configs in folder and a digest of them."""
+        if folder not in self._defaults:
+            try:
+                self._defaults[folder] = self._load_defaults(folder)
+            except ConfigError as ex:
+                self._defaults[folder] = ex
+
+        result = self._defaults[folder]
+        if isinstance(result, ConfigError):
+            raise result
+        return result
+
+    def _load_defaults(self, folder: Path) -> Tuple[Dict[str, Any], str]:
+        if folder != self.rootpath and self.rootpath in folder.parents:
+            defaults, _ = self.defaults(folder.parent)
+        else:
+            defaults = {}
+
+        for path in sorted({path for pattern in self.defaults_patterns for path in folder.glob(pattern)}):
+            defaults = merge_config(defaults, load_defaults(path))
+
+        digest = hashlib.sha1(json.dumps(defaults, sort_keys=True, default=str).encode()).hexdigest()
+        return defaults, digest
+
+    def _load_pending(self) -> None:
+        paths, self._pending = self._pending, []
+
+        missing = []
+        for path in paths:
+            try:
+                defaults, digest = self.defaults(path.parent)
+            except ConfigError as ex:
+                self._results[path] = ex
+                continue
+
+            configs = self.cache.get(path, digest) if self.cache else None
+            if configs is None:
+                missing.append((path, defaults, digest))
+            else:
+                self._results[path] = configs
+
+        load_args = [[path for path, _, _ in missing], [defaults for _, defaults, _ in missing]]
+        with trace.span('load configs', 'config', count=len(missing)):
+            if self.workers > 1 and len(missing) >= PARALLEL_THRESHOLD:
+                chunksize = max(1, len(missing) // (self.workers * 4))
+                with ProcessPoolExecutor(self.workers,
+                                         mp_context=multiprocessing.get_context(START_METHOD),
+                                         initializer=template.configure,
+                                         initargs=template.settings()) as executor:
+                    if trace.active():
+                        results = []
+                        for result, events in executor.map(_load_traced, *load_args, chunksize=chunksize):
+                            results.append(result)
+                            trace.add(events)
+                    else:
+                        results = list(executor.map(_load, *load_args, chunksize=chunksize))
+            else:
+                results = list(map(_load, *load_args))
+
+        for (path, _, digest), (result, dependencies) in zip(missing, results):
+            self._results[path] = result
+            if self.cache and not isinstance(result, ConfigError):
+                self.cache.put(path, digest, result, dependencies)
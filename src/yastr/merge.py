@@ -0,0 +1,109 @@
+"""Merging of reports and results of sharded runs.
+
+    yastr-merge junit merged.xml shard-*/junit.xml
+    yastr-merge history merged.sqlite shard-*/history.sqlite
+    yastr-merge benchmarks merged.json shard-*/benchmarks.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from .benchmark import load_results, write_results
+from .cache import DurationHistory
+
+if TYPE_CHECKING:
+    from typing import List, Optional, Sequence
+
+#: Counters of JUnit test suites that are summed up
+JUNIT_COUNTERS = ('tests', 'errors', 'failures', 'skipped')
+
+#: Maximum number of tests kept in merged duration histories
+HISTORY_SIZE = 1000000
+
+
+def merge_junit(output: Path, inputs: Sequence[Path]) -> None:
+    """Merge test cases of JUnit XML reports into a single test suite."""
+    merged = None
+    for path in inputs:
+        root = ET.parse(path).getroot()
+        for suite in (root, ) if root.tag == 'testsuite' else root.iter('testsuite'):
+            if merged is None:
+                merged = ET.Element('testsuite', suite.attrib)
+                for counter in JUNIT_COUNTERS:
+                    merged.set(counter, '0')
+                merged.set('time', '0')
+                properties = ET.SubElement(merged, 'properties')
+
+            for counter in JUNIT_COUNTERS:
+                merged.set(counter, str(int(merged.get(counter)) + int(suite.get(counter, 0))))
+            merged.set('time', f'{float(merged.get("time")) + float(suite.get("time", 0)):.3f}')
+            if suite.get('timestamp') and suite.get('timestamp') < merged.get('timestamp', suite.get('timestamp')):
+                merged.set('timestamp', suite.get('timestamp'))
+
+            for child in suite:
+                if child.tag != 'properties':
+                    merged.append(child)
+                    continue
+                known = {(prop.get('name'), prop.get('value')) for prop in properties}
+                properties.extend(prop for prop in child if (prop.get('name'), prop.get('value')) not in known)
+
+    testsuites = ET.Element('testsuites')
+    if merged is not None:
+        if not len(properties):
+            merged.remove(properties)
+        testsuites.append(merged)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    ET.ElementTree(testsuites).write(output, encoding='utf-8', xml_declaration=True)
+
+
+def merge_history(output: Path, inputs: Sequence[Path]) -> None:
+    """Merge duration histories, keeping the most recently recorded duration of every test."""
+    output.parent.mkdir(parents=True, exist_ok=True)
+    history = DurationHistory(output, HISTORY_SIZE)
+    try:
+        for path in inputs:
+            history.merge(path)
+    finally:
+        history.close()
+
+
+def merge_benchmarks(output: Path, inputs: Sequence[Path]) -> None:
+    """Merge benchmark results files."""
+    results = {}
+    for path in inputs:
+        results.update(load_results(path))
+    write_results(output, results)
+
+
+MERGERS = {
+    'junit': merge_junit,
+    'history': merge_history,
+    'benchmarks': merge_benchmarks,
+}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='yastr-merge',
+                                     description=__doc__.splitlines()[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter,
+                                     epilog=__doc__.split('\n', 1)[1])
+    parser.add_argument('kind', choices=MERGERS, help='kind of the merged files')
+    parser.add_argument('output', type=Path, help='file to write the merged result to')
+    parser.add_argument('inputs', type=Path, nargs='+', help='files written by the shards')
+    args = parser.parse_args(argv)
+
+    missing = [str(path) for path in args.inputs if not path.is_file()]
+    if missing:
+        parser.error(f'input files not found: {", ".join(missing)}')
+
+    MERGERS[args.kind](args.output, args.inputs)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,100 +1,374 @@
 from __future__ import annotations
 
+import dataclasses
+import hashlib
+import json
 import os
 import shlex
-from fnmatch import fnmatch
+import time
 from functools import cached_property
 from pathlib import Path
-from subprocess import CalledProcessError, TimeoutExpired, run
 from typing import TYPE_CHECKING
 
 from _pytest.outcomes import Failed
-from pytest import Item, skip
+from _pytest.skipping import evaluate_skip_marks, evaluate_xfail_marks
+from pytest import File, Item, StashKey, UsageError, hookimpl, skip
 
-from .config import TestConfig, load_config
-from .fixtures import FixtureRequest
+from . import benchmark, hookspecs, template, trace
+from .cache import CachedResult, ConfigCache, DirectoryIndex, DurationHistory, ResultCache
+from .config import ConfigError, TestBenchmark
+from .expect import Expectations
+from .fixtures import FixtureRequest, FixtureScopes
+from .loader import ConfigLoader
+from .runner import (KILL_GRACE, Capacity, Demand, DriverError, DriverPool, ExecutionResult, JobPool, OutputSpool,
+                     ProcessGroups, execute, resolve_executable)
+from .shard import parse_shard, partition
+from .sink import ResultSink
+from .utils import compile_patterns, format_size, parse_size, safe_filename
 
 if TYPE_CHECKING:
-    from typing import Any, Dict, Optional, Tuple
+    from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
 
+    from _pytest._code.code import ExceptionInfo, TerminalRepr
     from _pytest.compat import LEGACY_PATH
-    from pytest import Node
+    from pytest import Config, Node, Session, TerminalReporter, TestReport
+
+    from .config import TestConfig
+    from .runner import ResourceUsage
+
+config_cache_key = StashKey[ConfigCache]()
+config_loader_key = StashKey[ConfigLoader]()
+config_matcher_key = StashKey['Callable[[str], bool]']()
+directory_index_key = StashKey[DirectoryIndex]()
+pruned_key = StashKey['Callable[[Path], bool]']()
+fixture_scopes_key = StashKey[FixtureScopes]()
+driver_pool_key = StashKey[DriverPool]()
+duration_history_key = StashKey[DurationHistory]()
+job_pool_key = StashKey[JobPool]()
+process_groups_key = StashKey[ProcessGroups]()
+result_cache_key = StashKey[ResultCache]()
+output_dir_key = StashKey[Path]()
+output_memory_key = StashKey['Optional[int]']()
+output_limit_key = StashKey['Optional[int]']()
+cpus_key = StashKey['Optional[int]']()
+memory_key = StashKey['Optional[int]']()
+test_driver_key = StashKey['List[str]']()
+usages_key = StashKey['List[Tuple[str, float, ResourceUsage]]']()
+benchmarks_key = StashKey['Dict[str, Dict[str, float]]']()
+benchmark_baseline_key = StashKey['Dict[str, Dict[str, float]]']()
+shard_key = StashKey['Tuple[int, int]']()
+result_sink_key = StashKey[ResultSink]()
+kill_grace_key = StashKey[float]()
+
+REPORT_OUTPUT_CHOICES = ('all', 'failed')
+TEST_DRIVER_MODE_CHOICES = ('spawn', 'persistent')
+SCHEDULE_CHOICES = ('collection', 'longest')
+
+
+class YastrFile(File):
+    """Pytest collector for yastr config files."""
+
+    def collect(self) -> Iterator[YastrTest]:
+        folder = self.path.parent.relative_to(self.config.rootpath)
+        for (name, param_id), user_config in self.config.stash[config_loader_key].get(self.path).items():
+            suffix = '' if param_id is None else f'[{param_id}]'
+            if name is None:
+                # Unnamed tests are named by the file, followed by the parameter id if they are parametrized
+                name = self.path.name + suffix
+                yield YastrTest.from_parent(self, name=name, nodeid=f'{folder}::{name}', user_config=user_config)
+            else:
+                yield YastrTest.from_parent(self,
+                                            name=name + suffix,
+                                            nodeid=f'{folder}::{self.path.name}::{name}{suffix}',
+                                            user_config=user_config)
+
+    def repr_failure(self, excinfo: ExceptionInfo[BaseException]) -> Union[str, TerminalRepr]:
+        if isinstance(excinfo.value, ConfigError):
+            return f'ConfigError: {excinfo.value}'
+        return super().repr_failure(excinfo)
 
 
 class YastrTest(Item):
     """Pytest item for running executables triggered by yastr config files."""
 
-    def __init__(self, path: Path, name: Optional[str] = None, **kwargs: Dict[str, Any]) -> None:
-        super().__init__(name=(name or path.name), path=path, **kwargs)
-        self.own_markers.extend(self.user_config.resolved_markers)
+    def __init__(self, *, user_config: TestConfig, **kwargs: Dict[str, Any]) -> None:
+        super().__init__(**kwargs)
+        self.user_config = user_config
+        with trace.span('resolve markers', 'collect', nodeid=self.nodeid):
+            self.own_markers.extend(user_config.resolved_markers)
 
-    @cached_property
-    def user_config(self) -> TestConfig:
-        """User configuration for test."""
-        return load_config(self.path)
+        self._search_path = user_config.environment.get('PATH', os.environ.get('PATH'))
+        self._benchmark_results: List[ExecutionResult] = []
+        self.test_executable = resolve_executable(self.test_command[0], self._search_path)
 
     @property
-    def test_env(self) -> Dict[str, str]:
-        """Environment variables for executing the test."""
-        new_env = os.environ.copy()
-        new_env.update(self.user_config.environment)
-        return new_env
+    def test_env(self) -> Optional[Dict[str, str]]:
+        """Environment variables for executing the test or None if the current environment is inherited.
+
+        The environment is built from the current environment per call, since fixtures or conftest files
+        may change it at any time.
+        """
+        if not self.user_config.environment:
+            return None
+        return {**os.environ, **self.user_config.environment}
+
+    @property
+    def test_demand(self) -> Demand:
+        """Resources required for executing the test."""
+        resources = self.user_config.resources
+        test_benchmark = self.test_benchmark
+        return Demand(
+            resources.cpus * (test_benchmark.concurrency if test_benchmark else 1),
+            resources.memory_bytes,
+            frozenset(name for name, mode in resources.locks.items() if mode == 'exclusive'),
+            frozenset(name for name, mode in resources.locks.items() if mode == 'shared'),
+        )
+
+    @cached_property
+    def test_benchmark(self) -> Optional[TestBenchmark]:
+        """Benchmark settings of the test including command line overrides or None if it is no benchmark."""
+        test_benchmark = self.user_config.benchmark
+        if test_benchmark is None and not self.config.getoption('yastr_benchmark'):
+            return None
+
+        overrides = {
+            name: self.config.getoption(f'yastr_benchmark_{name}')
+            for name in ('warmup', 'repetitions', 'concurrency')
+        }
+        return dataclasses.replace(test_benchmark or TestBenchmark(),
+                                   **{name: value for name, value in overrides.items() if value is not None})
+
+    @cached_property
+    def test_expect(self) -> Optional[Expectations]:
+        """Compiled output expectations of the test or None if it has none."""
+        test_expect = self.user_config.expect
+        if test_expect is None:
+            return None
+        return Expectations(**dataclasses.asdict(test_expect), encoding=self.user_config.encoding)
 
     @property
     def test_timeout(self) -> float:
         """Timeout for executing the test."""
         return self.user_config.timeout or self.config.getoption('timeout')
 
-    @property
-    def nodeid(self) -> str:
-        folder = self.path.parent.relative_to(self.config.rootpath)
-        return f'{folder}::{self.name}'
-
     def reportinfo(self) -> Tuple[LEGACY_PATH, int, str]:
         return self.fspath, 0, ''
 
+    @property
+    def test_command(self) -> List[str]:
+        """Command line for executing the test."""
+        return self.config.stash[test_driver_key] + [self.user_config.executable] + self.user_config.args
+
+    @property
+    def will_run(self) -> bool:
+        """Check if executable is going to be called when running the test."""
+        if self.user_config.skip or evaluate_skip_marks(self):
+            return False
+
+        xfailed = evaluate_xfail_marks(self)
+        return not xfailed or xfailed.run or self.config.getoption('runxfail')
+
+    @cached_property
+    def result_key(self) -> Optional[str]:
+        """Digest of all inputs of the test or None if the result of the test cannot be cached.
+
+        The inputs are the test driver, the executable, the config file, the test config including the
+        environment variables and fixtures it sets and all files matching the input patterns. Results of
+        benchmarks are never cached.
+        """
+        result_cache = self.config.stash.get(result_cache_key, None)
+        executable = resolve_executable(self.user_config.executable, self._search_path)
+        if not result_cache or not self.test_executable or not executable or self.test_benchmark:
+            return None
+
+        folder = self.path.parent
+        inputs = sorted({path for pattern in self.user_config.inputs for path in folder.glob(pattern)})
+        parts = {
+            'nodeid': self.nodeid,
+            'command': self.test_command,
+            'executables': [result_cache.file_digest(Path(path)) for path in (self.test_executable, executable)],
+            'config': result_cache.file_digest(self.path),
+            'user_config': repr(self.user_config),
+            'inputs': [(str(path.relative_to(folder)), result_cache.file_digest(path))
+                       for path in inputs if path.is_file()],
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+    @cached_property
+    def cached_result(self) -> Optional[CachedResult]:
+        """Result of a previous run with the same inputs that passed or None if there is none."""
+        if self.result_key is None:
+            return None
+        return self.config.stash[result_cache_key].get(self.result_key)
+
     def runtest(self) -> None:
         """Run executable respecting yastr test config."""
         if self.user_config.skip:
             skip('Skipped by user config')
 
-        cmd = [self.user_config.executable] + self.user_config.args
-        test_driver = self.config.getini('test_driver')
-        if test_driver:
-            cmd = shlex.split(test_driver) + cmd
+        cached_result = self.cached_result
+        if cached_result:
+            self.user_properties.append(('cached_duration', cached_result.duration))
+            for name in ('stdout_log', 'stderr_log'):
+                if getattr(cached_result, name):
+                    self.user_properties.append((name, getattr(cached_result, name)))
+            return
 
-        fixture_req = FixtureRequest(self)
-        fixture_req._execute()
+        job_pool = self.config.stash.get(job_pool_key, None)
+        if job_pool:
+            result = job_pool.result(self, YastrTest._execute)
+        else:
+            result = self._execute()
+
+        duration_history = self.config.stash.get(duration_history_key, None)
+        if duration_history:
+            duration_history.record(self.nodeid, result.duration)
+
+        self.user_properties.append(('wall_time', result.duration))
+        if result.usage:
+            self.user_properties.extend(dataclasses.asdict(result.usage).items())
+            self.config.stash.setdefault(usages_key, []).append((self.nodeid, result.duration, result.usage))
+
+        failure = None
+        if result.timed_out:
+            failure = f'Executable timed out after {self.test_timeout} second(s)'
+        elif result.unmet:
+            failure = 'Output did not meet expectations:\n' + '\n'.join(f'  {message}' for message in result.unmet)
+        elif result.returncode != 0:
+            failure = f'Executable returned code {result.returncode}'
+        elif self.test_benchmark:
+            failure = self._record_benchmark()
+
+        report_output = failure or self.config.getini('yastr_report_output') == 'all'
+        for name, output in (('stdout', result.stdout), ('stderr', result.stderr)):
+            if output.spooled:
+                self.user_properties.append((f'{name}_log', str(output.path)))
+            if report_output:
+                with trace.span('decode output', 'test', nodeid=self.nodeid, stream=name):
+                    text = output.text(self.user_config.encoding)
+                self.add_report_section('call', name, text)
+
+        if failure:
+            raise Failed(failure, pytrace=False)
+
+        if self.result_key is not None:
+            self.config.stash[result_cache_key].put(
+                self.result_key,
+                CachedResult(
+                    self.nodeid,
+                    result.duration,
+                    str(result.stdout.path) if result.stdout.spooled else None,
+                    str(result.stderr.path) if result.stderr.spooled else None,
+                    time.time(),
+                ),
+            )
+
+    def _record_benchmark(self) -> Optional[str]:
+        """Record statistics of benchmark runs and return failure message if they regressed."""
+        test_benchmark = self.test_benchmark
+        stats = benchmark.statistics_of(self._benchmark_results)
+        self.user_properties.extend((f'benchmark_{name}', value) for name, value in stats.items())
+        self.config.stash.setdefault(benchmarks_key, {})[self.nodeid] = {
+            'warmup': test_benchmark.warmup,
+            'repetitions': test_benchmark.repetitions,
+            'concurrency': test_benchmark.concurrency,
+            **stats,
+        }
+
+        baseline = self.config.stash.get(benchmark_baseline_key, {}).get(self.nodeid)
+        regressions = benchmark.regressions(stats, baseline, test_benchmark.thresholds)
+        if regressions:
+            return 'Benchmark regressed: ' + '; '.join(regressions)
+        return None
+
+    def _execute(self) -> ExecutionResult:
+        """Acquire fixtures, call executable and release fixtures again.
+
+        Benchmarks call the executable repeatedly and return the result of the last or first failing run.
+        """
+        with trace.tagged(nodeid=self.nodeid), trace.span('execute', 'test'):
+            fixture_req = FixtureRequest(self, self.config.stash.get(fixture_scopes_key, None))
+
+            try:
+                fixture_req._execute()
+
+                test_benchmark = self.test_benchmark
+                if not test_benchmark:
+                    return self._call()
+
+                results = self._benchmark_results = benchmark.run(
+                    self._call,
+                    test_benchmark.warmup,
+                    test_benchmark.repetitions,
+                    test_benchmark.concurrency,
+                )
+                return next((result for result in results if not result.succeeded), results[-1])
+            finally:
+                fixture_req._teardown()
+
+    def _call(self, run: Optional[int] = None) -> ExecutionResult:
+        """Call executable once, spooling its outputs to separate logs per benchmark run if `run` is given."""
+        driver_pool = self.config.stash.get(driver_pool_key, None)
+        if driver_pool:
+            result = self._execute_driven(driver_pool, run)
+            if result:
+                return result
 
         try:
-            proc = run(
-                cmd,
-                env=self.test_env,
-                timeout=self.test_timeout,
-                capture_output=True,
-                check=True,
+            return execute(
+                self.test_command,
+                self.test_env,
+                self.test_timeout,
+                self._spool('stdout', run),
+                self._spool('stderr', run),
+                self.test_executable,
+                self.user_config.limits.rlimits,
+                self.config.stash[kill_grace_key],
+                self.test_expect,
+                self.config.stash.get(process_groups_key, None),
             )
-        except TimeoutExpired as ex:
-            stdout, stderr = ex.stdout, ex.stderr
-            raise Failed(f'Executable timed out after {self.test_timeout} second(s)', pytrace=False) from None
-        except CalledProcessError as ex:
-            stdout, stderr = ex.stdout, ex.stderr
-            raise Failed(f'Executable returned code {ex.returncode}', pytrace=False) from None
-        except:  # noqa: E722
-            stdout, stderr = '', ''
-            raise
-        else:
-            stdout, stderr = proc.stdout, proc.stderr
-        finally:
-            fixture_req._teardown()
+        except FileNotFoundError as ex:
+            raise Failed(f'Executable {ex.filename} not found', pytrace=False) from None
+
+    def _execute_driven(self, driver_pool: DriverPool, run: Optional[int]) -> Optional[ExecutionResult]:
+        """Call executable using a persistent test driver if available."""
+        env = self.test_env
+        if env is None:
+            # The environment may have changed since the driver was started
+            env = dict(os.environ)
+
+        try:
+            return driver_pool.execute(
+                [self.user_config.executable] + self.user_config.args,
+                env,
+                self.test_timeout,
+                self._spool('stdout', run),
+                self._spool('stderr', run),
+                self.user_config.limits.rlimits,
+                self.config.stash[kill_grace_key],
+                self.test_expect,
+                self.config.stash.get(process_groups_key, None),
+            )
+        except DriverError as ex:
+            raise Failed(str(ex), pytrace=False) from None
+
+    @cached_property
+    def _log_name(self) -> str:
+        """Base name of log files, made unique by a digest since different ids may have the same safe name."""
+        return f'{safe_filename(self.nodeid)}-{hashlib.sha1(self.nodeid.encode()).hexdigest()[:8]}'
+
+    def _spool(self, name: str, run: Optional[int] = None) -> OutputSpool:
+        """Create spool for output stream of executable, with a log file per benchmark run if `run` is given."""
+        log_name = self._log_name if run is None else f'{self._log_name}.{run}'
+        return OutputSpool(
+            self.config.stash[output_dir_key] / f'{log_name}.{name}.log',
+            self.config.stash[output_memory_key],
+            self.config.stash[output_limit_key],
+        )
 
-            if stdout is not None:
-                stdout = stdout.decode(self.user_config.encoding)
-                self.add_report_section('call', 'stdout', stdout)
 
-            if stderr is not None:
-                stderr = stderr.decode(self.user_config.encoding)
-                self.add_report_section('call', 'stderr', stderr)
+def pytest_addhooks(pluginmanager) -> None:
+    pluginmanager.add_hookspecs(hookspecs)
 
 
 def pytest_addoption(parser) -> None:
@@ -104,12 +378,101 @@ def pytest_addoption(parser) -> None:
         default=['*.yastr.*'],
         help='file names of test config files',
     )
+    parser.addini(
+        'yastr_prune_dirs',
+        type='args',
+        default=[],
+        help='glob patterns of directory names or paths relative to the root directory that are not searched for '
+        'tests at all',
+    )
+    parser.addini(
+        'yastr_defaults',
+        type='args',
+        default=['yastr.defaults.*'],
+        help='file names of files with default values for test configs in the same folder and below',
+    )
+    parser.addini(
+        'yastr_output_dir',
+        type='string',
+        default=None,
+        help='folder for storing outputs of executables that do not fit into memory (default: temporary folder)',
+    )
+    parser.addini(
+        'yastr_output_memory',
+        type='string',
+        default='1M',
+        help='bytes of each output of an executable kept in memory, split into its head and tail',
+    )
+    parser.addini(
+        'yastr_output_limit',
+        type='string',
+        default='',
+        help='maximum bytes of each output of an executable stored on disk (default: unlimited)',
+    )
+    parser.addini(
+        'yastr_kill_grace',
+        type='string',
+        default='',
+        help=f'seconds timed out executables and their descendants may take for exiting after being terminated '
+        f'before they are killed (default: {KILL_GRACE:g})',
+    )
+    parser.addini(
+        'yastr_report_output',
+        type='string',
+        default='all',
+        help='add outputs of executables to reports for "all" tests or only for "failed" ones',
+    )
     parser.addini(
         'test_driver',
         type='string',
         default=None,
         help='test driver executable that calls the test executable like <driver> <executable> <args>',
     )
+    parser.addini(
+        'test_driver_mode',
+        type='string',
+        default='spawn',
+        help='"spawn" the test driver per test or keep it running "persistent" and send tests to it',
+    )
+    parser.addini(
+        'yastr_config_cache_size',
+        type='string',
+        default='100000',
+        help='maximum number of test configs kept in the config cache',
+    )
+    parser.addini(
+        'yastr_result_cache_size',
+        type='string',
+        default='100000',
+        help='maximum number of passed test results kept in the result cache',
+    )
+    parser.addini(
+        'yastr_cpus',
+        type='string',
+        default='',
+        help='CPU slots available for concurrently running test executables '
+        '(default: number of CPU cores, at least the number of jobs)',
+    )
+    parser.addini(
+        'yastr_memory',
+        type='string',
+        default='',
+        help='memory available for concurrently running test executables, e.g. 16G (default: unlimited)',
+    )
+    parser.addini(
+        'yastr_history_size',
+        type='string',
+        default='100000',
+        help='maximum number of tests whose durations are recorded',
+    )
+    parser.addoption(
+        '--yastr-load-workers',
+        type=int,
+        default=os.cpu_count(),
+        action='store',
+        dest='yastr_load_workers',
+        help='number of worker processes used for loading test configs',
+    )
     parser.addoption(
         '--timeout',
         type=float,
@@ -118,9 +481,552 @@ def pytest_addoption(parser) -> None:
         dest='timeout',
         help='default timeout for calling test executables',
     )
+    parser.addoption(
+        '--yastr-jobs',
+        type=int,
+        default=1,
+        action='store',
+        dest='yastr_jobs',
+        help='number of test executables that are run concurrently',
+    )
+    parser.addoption(
+        '--yastr-trace',
+        default=None,
+        action='store',
+        dest='yastr_trace',
+        metavar='FILE',
+        help='record timed spans of all yastr phases and write them to FILE in Chrome trace event format',
+    )
+    parser.addoption(
+        '--yastr-top',
+        type=int,
+        default=0,
+        action='store',
+        dest='yastr_top',
+        metavar='N',
+        help='show resource usage of the N test executables with the longest wall time',
+    )
+    parser.addoption(
+        '--yastr-schedule',
+        default='collection',
+        choices=SCHEDULE_CHOICES,
+        action='store',
+        dest='yastr_schedule',
+        help='order of starting concurrently run test executables: in "collection" order or '
+        'the "longest" expected first (default: collection)',
+    )
+    parser.addoption(
+        '--yastr-benchmark',
+        default=False,
+        action='store_true',
+        dest='yastr_benchmark',
+        help='run all tests as benchmarks, not only those with benchmark settings',
+    )
+    parser.addoption(
+        '--yastr-benchmark-warmup',
+        type=int,
+        default=None,
+        action='store',
+        dest='yastr_benchmark_warmup',
+        metavar='N',
+        help='override number of runs of benchmarks before measuring',
+    )
+    parser.addoption(
+        '--yastr-benchmark-repetitions',
+        type=int,
+        default=None,
+        action='store',
+        dest='yastr_benchmark_repetitions',
+        metavar='N',
+        help='override number of measured runs of benchmarks',
+    )
+    parser.addoption(
+        '--yastr-benchmark-concurrency',
+        type=int,
+        default=None,
+        action='store',
+        dest='yastr_benchmark_concurrency',
+        metavar='N',
+        help='override number of runs of benchmarks executed at the same time',
+    )
+    parser.addoption(
+        '--yastr-benchmark-results',
+        default=None,
+        action='store',
+        dest='yastr_benchmark_results',
+        metavar='FILE',
+        help='write statistics of all benchmarks to FILE in JSON format',
+    )
+    parser.addoption(
+        '--yastr-benchmark-baseline',
+        default=None,
+        action='store',
+        dest='yastr_benchmark_baseline',
+        metavar='FILE',
+        help='compare benchmarks having thresholds with results written to FILE by a previous run',
+    )
+    parser.addoption(
+        '--yastr-results-jsonl',
+        default=None,
+        action='store',
+        dest='yastr_results_jsonl',
+        metavar='FILE',
+        help='append the result of every test to FILE in JSON lines format as soon as it finished',
+    )
+    parser.addoption(
+        '--yastr-results-junit',
+        default=None,
+        action='store',
+        dest='yastr_results_junit',
+        metavar='FILE',
+        help='append the result of every test to the JUnit XML report FILE as soon as it finished',
+    )
+    parser.addoption(
+        '--yastr-release-output',
+        default=False,
+        action='store_true',
+        dest='yastr_release_output',
+        help='release outputs of tests that did not fail from memory once written to the results files',
+    )
+    parser.addoption(
+        '--yastr-history',
+        default=None,
+        action='store',
+        dest='yastr_history',
+        metavar='FILE',
+        help='record test durations in FILE instead of the pytest cache',
+    )
+    parser.addoption(
+        '--yastr-shard',
+        default=None,
+        action='store',
+        dest='yastr_shard',
+        metavar='I/N',
+        help='only run the I-th of N partitions of all tests, balanced by the durations recorded in the '
+        'file given by --yastr-history or by a stable hash of their ids',
+    )
+    parser.addoption(
+        '--yastr-no-config-cache',
+        default=False,
+        action='store_true',
+        dest='yastr_no_config_cache',
+        help='always load test configs from file instead of using the config cache',
+    )
+    parser.addoption(
+        '--yastr-dir-index',
+        default=False,
+        action='store_true',
+        dest='yastr_dir_index',
+        help='skip directories without tests that did not change since the previous run',
+    )
+    parser.addoption(
+        '--yastr-result-cache',
+        default=False,
+        action='store_true',
+        dest='yastr_result_cache',
+        help='skip tests that passed before and whose inputs did not change since then',
+    )
+    parser.addoption(
+        '--yastr-cache-clear',
+        default=False,
+        action='store_true',
+        dest='yastr_cache_clear',
+        help='remove all results from the result cache at start',
+    )
+
+
+def _ini_count(config: Config, name: str) -> int:
+    """Get ini option that is a number of entries, raising a usage error if it is invalid."""
+    try:
+        value = int(config.getini(name))
+    except ValueError:
+        value = -1
+    if value < 0:
+        raise UsageError(f'{name} must be a non-negative integer')
+    return value
+
+
+def _ini_size(config: Config, name: str) -> Optional[int]:
+    """Get ini option that is a size in bytes, raising a usage error if it is invalid."""
+    try:
+        return parse_size(config.getini(name))
+    except ValueError:
+        raise UsageError(f'{name} must be a size in bytes like 64K, 8M or 2G') from None
+
+
+def pytest_configure(config: Config) -> None:
+    if config.getoption('yastr_trace'):
+        trace.start()
+
+    if config.getini('yastr_report_output') not in REPORT_OUTPUT_CHOICES:
+        raise UsageError(f'yastr_report_output must be one of: {", ".join(REPORT_OUTPUT_CHOICES)}')
+
+    try:
+        config.stash[kill_grace_key] = float(config.getini('yastr_kill_grace') or KILL_GRACE)
+    except ValueError:
+        raise UsageError('yastr_kill_grace must be a number of seconds') from None
+    if config.stash[kill_grace_key] < 0:
+        raise UsageError('yastr_kill_grace must not be negative')
+
+    config_cache_size = _ini_count(config, 'yastr_config_cache_size')
+    result_cache_size = _ini_count(config, 'yastr_result_cache_size')
+    history_size = _ini_count(config, 'yastr_history_size')
+    config.stash[output_memory_key] = _ini_size(config, 'yastr_output_memory')
+    config.stash[output_limit_key] = _ini_size(config, 'yastr_output_limit')
+    config.stash[memory_key] = _ini_size(config, 'yastr_memory')
+
+    cpus = config.getini('yastr_cpus')
+    try:
+        config.stash[cpus_key] = int(cpus) if cpus else None
+    except ValueError:
+        config.stash[cpus_key] = 0
+    if config.stash[cpus_key] is not None and config.stash[cpus_key] < 1:
+        raise UsageError('yastr_cpus must be a positive integer')
+
+    if config.getini('test_driver_mode') not in TEST_DRIVER_MODE_CHOICES:
+        raise UsageError(f'test_driver_mode must be one of: {", ".join(TEST_DRIVER_MODE_CHOICES)}')
+
+    for name in ('warmup', 'repetitions', 'concurrency'):
+        value = config.getoption(f'yastr_benchmark_{name}')
+        if value is not None and value < (0 if name == 'warmup' else 1):
+            raise UsageError(f'--yastr-benchmark-{name} must be at least {0 if name == "warmup" else 1}')
+
+    baseline = config.getoption('yastr_benchmark_baseline')
+    if baseline:
+        try:
+            config.stash[benchmark_baseline_key] = benchmark.load_results(config.invocation_params.dir / baseline)
+        except (OSError, ValueError, KeyError) as ex:
+            raise UsageError(f'Cannot load benchmark baseline {baseline}: {ex}') from None
+
+    if config.getoption('yastr_shard'):
+        try:
+            config.stash[shard_key] = parse_shard(config.getoption('yastr_shard'))
+        except ValueError as ex:
+            raise UsageError(str(ex)) from None
+
+    jsonl, junit = config.getoption('yastr_results_jsonl'), config.getoption('yastr_results_junit')
+    if jsonl or junit:
+        config.stash[result_sink_key] = ResultSink(
+            config.invocation_params.dir / jsonl if jsonl else None,
+            config.invocation_params.dir / junit if junit else None,
+            config.getoption('yastr_release_output'),
+        )
+
+    test_driver = config.getini('test_driver')
+    config.stash[test_driver_key] = shlex.split(test_driver) if test_driver else []
+    if config.getini('test_driver_mode') == 'persistent' and not test_driver:
+        raise UsageError('test_driver must be set for persistent test driver mode')
+
+    config.stash[config_matcher_key] = compile_patterns(config.getini('yastr_configs'))
+    config.stash[pruned_key] = _prune_matcher(config)
+
+    if config.getoption('yastr_dir_index') and hasattr(config, 'cache'):
+        config.stash[directory_index_key] = _directory_index(config)
+
+    context = {}
+    for values in reversed(config.hook.pytest_yastr_template_context(config=config)):
+        context.update(values)
+    template.configure(context, str(config.cache.mkdir('yastr') / 'templates') if hasattr(config, 'cache') else None)
+
+    config_cache = None
+    if not config.getoption('yastr_no_config_cache') and hasattr(config, 'cache'):
+        cache_path = config.cache.mkdir('yastr') / 'configs.sqlite'
+        config_cache = config.stash[config_cache_key] = ConfigCache(cache_path, config_cache_size)
+
+    if (config.getoption('yastr_result_cache') or config.getoption('yastr_cache_clear')) and hasattr(config, 'cache'):
+        cache_path = config.cache.mkdir('yastr') / 'results.sqlite'
+        result_cache = ResultCache(cache_path, result_cache_size)
+        if config.getoption('yastr_cache_clear'):
+            result_cache.clear()
+        if config.getoption('yastr_result_cache'):
+            config.stash[result_cache_key] = result_cache
+        else:
+            result_cache.close()
+
+    history_path = None
+    if config.getoption('yastr_history'):
+        history_path = config.invocation_params.dir / config.getoption('yastr_history')
+        history_path.parent.mkdir(parents=True, exist_ok=True)
+    elif hasattr(config, 'cache'):
+        history_path = config.cache.mkdir('yastr') / 'history.sqlite'
+    if history_path:
+        config.stash[duration_history_key] = DurationHistory(history_path, history_size)
+
+    config.stash[config_loader_key] = ConfigLoader(
+        config.getoption('yastr_load_workers'),
+        config.rootpath,
+        config.getini('yastr_defaults'),
+        config_cache,
+    )
+
+
+def pytest_unconfigure(config: Config) -> None:
+    template.configure()
+
+    tracer = trace.stop()
+    if tracer and config.getoption('yastr_trace'):
+        tracer.write(config.invocation_params.dir / config.getoption('yastr_trace'))
+
+    config_cache = config.stash.get(config_cache_key, None)
+    if config_cache:
+        config_cache.close()
+        del config.stash[config_cache_key]
+
+    directory_index = config.stash.get(directory_index_key, None)
+    if directory_index:
+        directory_index.close()
+        del config.stash[directory_index_key]
+
+    result_cache = config.stash.get(result_cache_key, None)
+    if result_cache:
+        result_cache.close()
+        del config.stash[result_cache_key]
+
+    duration_history = config.stash.get(duration_history_key, None)
+    if duration_history:
+        duration_history.close()
+        del config.stash[duration_history_key]
+
+    result_sink = config.stash.get(result_sink_key, None)
+    if result_sink:
+        result_sink.close()
+        del config.stash[result_sink_key]
+
+
+@hookimpl(hookwrapper=True)
+def pytest_collection(session: Session) -> Iterator[None]:
+    with trace.span('collection', 'collect'):
+        yield
+
+
+def _prune_matcher(config: Config) -> Callable[[Path], bool]:
+    """Create function checking if a directory is pruned by its name or path relative to the root path."""
+    patterns = config.getini('yastr_prune_dirs')
+    if not patterns:
+        return lambda path: False
+
+    matcher = compile_patterns(patterns)
+    rootpath = config.rootpath
+
+    def _pruned(path: Path) -> bool:
+        if matcher(path.name):
+            return True
+        try:
+            return matcher(path.relative_to(rootpath).as_posix())
+        except ValueError:
+            return False
+
+    return _pruned
+
+
+def _directory_index(config: Config) -> DirectoryIndex:
+    """Create index of directories containing config files, conftest files or python test files."""
+    is_config = config.stash[config_matcher_key]
+    is_python_test = compile_patterns(config.getini('python_files'))
+    is_pruned = config.stash[pruned_key]
+    is_excluded = compile_patterns(config.getini('norecursedirs'))
+
+    settings = json.dumps([
+        str(config.rootpath),
+        config.getini('yastr_configs'),
+        config.getini('python_files'),
+        config.getini('norecursedirs'),
+        config.getini('yastr_prune_dirs'),
+    ])
+    return DirectoryIndex(
+        config.cache.mkdir('yastr') / 'dirs.sqlite',
+        hashlib.sha1(settings.encode()).hexdigest(),
+        lambda path: path.name == 'conftest.py' or is_python_test(path.name) or is_config(str(path)),
+        lambda path: path.name != '__pycache__' and not is_excluded(path.name) and not is_pruned(path),
+    )
+
+
+def pytest_ignore_collect(collection_path: Path, config: Config) -> Optional[bool]:
+    pruned = config.stash[pruned_key]
+    if pruned(collection_path) and collection_path.is_dir():
+        return True
+
+    directory_index = config.stash.get(directory_index_key, None)
+    if directory_index:
+        try:
+            entry = directory_index.scan(collection_path.parent)
+        except OSError:
+            return None
+        if collection_path.name in entry.children and directory_index.is_empty(collection_path):
+            return True
+    return None
 
 
 def pytest_collect_file(path: LEGACY_PATH, parent: Node) -> Node:
-    is_config = any(fnmatch(path, pattern) for pattern in parent.config.getini('yastr_configs'))
-    if is_config:
-        return YastrTest.from_parent(path=Path(path), parent=parent)
+    if parent.config.stash[config_matcher_key](str(path)):
+        with trace.span('discover config', 'collect', path=str(path)):
+            yastr_file = YastrFile.from_parent(parent, path=Path(path))
+            parent.config.stash[config_loader_key].add(yastr_file.path)
+        return yastr_file
+
+
+def pytest_collection_modifyitems(session: Session, config: Config, items: List[Item]) -> None:
+    shard = config.stash.get(shard_key, None)
+    if not shard:
+        return
+
+    # Only an explicitly given history is the same on all machines running shards
+    durations = None
+    duration_history = config.stash.get(duration_history_key, None)
+    if config.getoption('yastr_history') and duration_history and duration_history.durations:
+        durations = duration_history.estimate(item.nodeid for item in items)
+
+    index, count = shard
+    shards = partition([item.nodeid for item in items], count, durations)
+    selected = [item for item, item_shard in zip(items, shards) if item_shard == index]
+    deselected = [item for item, item_shard in zip(items, shards) if item_shard != index]
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = selected
+
+
+def pytest_sessionstart(session: Session) -> None:
+    output_dir = session.config.getini('yastr_output_dir')
+    if output_dir:
+        output_dir = session.config.rootpath / output_dir
+    else:
+        output_dir = session.config._tmp_path_factory.getbasetemp() / 'yastr-output'
+    session.config.stash[output_dir_key] = output_dir
+    session.config.stash[process_groups_key] = ProcessGroups()
+
+    if session.config.getini('test_driver_mode') == 'persistent' and not session.config.option.collectonly:
+        session.config.stash[driver_pool_key] = DriverPool(session.config.stash[test_driver_key])
+
+
+@hookimpl(tryfirst=True)
+def pytest_runtestloop(session: Session) -> None:
+    if session.config.option.collectonly:
+        return
+
+    fixture_scopes = session.config.stash[fixture_scopes_key] = FixtureScopes()
+    for item in session.items:
+        if isinstance(item, YastrTest):
+            fixture_scopes.register(item)
+
+    jobs = session.config.getoption('yastr_jobs')
+    if jobs <= 1:
+        return
+    if session.testsfailed and not session.config.option.continue_on_collection_errors:
+        return
+
+    items = [item for item in session.items if isinstance(item, YastrTest) and item.will_run and not item.cached_result]
+
+    duration_history = session.config.stash.get(duration_history_key, None)
+    if session.config.getoption('yastr_schedule') == 'longest' and duration_history:
+        expected = duration_history.estimate(item.nodeid for item in items)
+        items.sort(key=lambda item: expected[item.nodeid], reverse=True)
+
+    capacity = Capacity(
+        session.config.stash[cpus_key] or max(jobs, os.cpu_count() or 1),
+        session.config.stash[memory_key],
+    )
+    job_pool = JobPool(jobs, capacity, lambda item: item.test_demand)
+    job_pool.submit(items, YastrTest._execute)
+    session.config.stash[job_pool_key] = job_pool
+
+
+def pytest_report_teststatus(report: TestReport) -> Optional[Tuple[str, str, str]]:
+    if report.when == 'call' and report.passed and any(name == 'cached_duration' for name, _ in report.user_properties):
+        return 'cached', 'c', 'CACHED'
+    return None
+
+
+def _usage_columns(duration: float, usage: ResourceUsage) -> Tuple[Any, ...]:
+    return (
+        f'{duration:.2f}s',
+        f'{usage.user_time:.2f}s',
+        f'{usage.system_time:.2f}s',
+        format_size(usage.max_rss),
+        usage.voluntary_switches,
+        usage.involuntary_switches,
+        usage.block_input,
+        usage.block_output,
+    )
+
+
+def _benchmark_columns(stats: Dict[str, float]) -> Tuple[Any, ...]:
+    columns = [stats['repetitions']]
+    columns.extend(f'{stats[f"wall_{name}"]:.4f}s' for name in ('min', 'median', 'p95', 'p99', 'stddev'))
+    columns.append(f'{stats["cpu_median"]:.4f}s' if 'cpu_median' in stats else '-')
+    return tuple(columns)
+
+
+def pytest_terminal_summary(terminalreporter: TerminalReporter, config: Config) -> None:
+    benchmarks = config.stash.get(benchmarks_key, {})
+    if benchmarks:
+        terminalreporter.write_sep('=', 'benchmarks')
+        header = ('runs', 'min', 'median', 'p95', 'p99', 'stddev', 'cpu median')
+        terminalreporter.write_line(''.join(f'{column:>11}' for column in header) + '  test')
+        for nodeid, stats in benchmarks.items():
+            columns = _benchmark_columns(stats)
+            terminalreporter.write_line(''.join(f'{column:>11}' for column in columns) + f'  {nodeid}')
+
+    top = config.getoption('yastr_top')
+    usages = config.stash.get(usages_key, [])
+    if not top or not usages:
+        return
+
+    terminalreporter.write_sep('=', f'top {top} test executables by wall time')
+    header = ('wall', 'user', 'system', 'max rss', 'vol cs', 'invol cs', 'blk in', 'blk out')
+    terminalreporter.write_line(''.join(f'{column:>10}' for column in header) + '  test')
+    for nodeid, duration, usage in sorted(usages, key=lambda entry: entry[1], reverse=True)[:top]:
+        columns = _usage_columns(duration, usage)
+        terminalreporter.write_line(''.join(f'{column:>10}' for column in columns) + f'  {nodeid}')
+
+
+@hookimpl(hookwrapper=True)
+def pytest_runtest_makereport(item: Item) -> Iterator[None]:
+    outcome = yield
+    result_sink = item.config.stash.get(result_sink_key, None)
+    if result_sink and isinstance(item, YastrTest):
+        result_sink.add(outcome.get_result())
+
+
+@hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item: Item) -> Iterator[None]:
+    yield
+    result_sink = item.config.stash.get(result_sink_key, None)
+    if result_sink and isinstance(item, YastrTest):
+        # Reports have been logged by all plugins, so their output can be released once the result is written
+        outcome = result_sink.finish(item.nodeid)
+        if result_sink.release and outcome not in ('failed', 'error'):
+            item._report_sections.clear()
+
+
+def pytest_runtest_teardown(item: Item) -> None:
+    fixture_scopes = item.config.stash.get(fixture_scopes_key, None)
+    if fixture_scopes and isinstance(item, YastrTest):
+        fixture_scopes.release(item)
+
+
+def pytest_sessionfinish(session: Session) -> None:
+    results = session.config.getoption('yastr_benchmark_results')
+    if results and not session.config.option.collectonly:
+        benchmark.write_results(session.config.invocation_params.dir / results,
+                                session.config.stash.get(benchmarks_key, {}))
+
+    # Executables still running in the background if the session was interrupted
+    process_groups = session.config.stash.get(process_groups_key, None)
+    if process_groups:
+        process_groups.kill()
+        del session.config.stash[process_groups_key]
+
+    job_pool = session.config.stash.get(job_pool_key, None)
+    if job_pool:
+        job_pool.shutdown()
+        del session.config.stash[job_pool_key]
+
+    driver_pool = session.config.stash.get(driver_pool_key, None)
+    if driver_pool:
+        driver_pool.close()
+        del session.config.stash[driver_pool_key]
+
+    fixture_scopes = session.config.stash.get(fixture_scopes_key, None)
+    if fixture_scopes:
+        fixture_scopes.close()
+        del session.config.stash[fixture_scopes_key]
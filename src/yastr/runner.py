@@ -0,0 +1,845 @@
+"""Execution of test executables."""
+
+from __future__ import annotations
+
+import base64
+import json
+import os
+import selectors
+import shutil
+import signal
+import sys
+import warnings
+from collections import Counter
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from functools import lru_cache
+from queue import Empty, SimpleQueue
+from subprocess import PIPE, Popen, TimeoutExpired
+from threading import Condition, Lock, Thread
+from time import monotonic, sleep
+from typing import TYPE_CHECKING
+
+from . import trace
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    from typing import IO, Any, BinaryIO, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Set, Tuple
+
+    from pytest import Item
+
+    from .expect import Expectations, OutputMatcher
+
+#: Size of chunks read from output streams
+CHUNK_SIZE = 64 * 1024
+
+#: Popen arguments starting a process in its own process group. Unlike a new session, this is done without
+#: leaving the fast path of subprocess on newer versions.
+NEW_PROCESS_GROUP = {'process_group': 0} if sys.version_info >= (3, 11) else {'start_new_session': True}
+
+#: Seconds a persistent test driver may take for answering after the timeout of a test expired
+DRIVER_GRACE = 10.0
+
+#: Seconds terminated processes may take for exiting before they are killed
+KILL_GRACE = 5.0
+
+#: Seconds between checks if all terminated processes exited
+KILL_POLL_INTERVAL = 0.01
+
+#: Names of resource limits of test executables and the limited resources
+RLIMITS = {
+    'cpu_time': 'RLIMIT_CPU',
+    'address_space': 'RLIMIT_AS',
+    'open_files': 'RLIMIT_NOFILE',
+    'file_size': 'RLIMIT_FSIZE',
+}
+
+
+class OutputSpool:
+    """Captured output stream of an executable.
+
+    At most `memory` bytes are kept in memory, split into the head and the tail of the output. If the
+    output grows beyond that, it is spooled to the file at `path` which is cut off after `limit` bytes.
+    """
+
+    def __init__(self, path: Optional[Path] = None, memory: int = 1024 * 1024, limit: Optional[int] = None) -> None:
+        self.path = path
+        self.memory = memory
+        self.limit = limit
+        self.size = 0
+        self.head = bytearray()
+        self.tail = bytearray()
+        self._file: Optional[BinaryIO] = None
+        self._written = 0
+
+    @property
+    def spooled(self) -> bool:
+        """Output was written to the spool file."""
+        return self._written > 0
+
+    @property
+    def written(self) -> int:
+        """Bytes written to the spool file."""
+        return self._written
+
+    def write(self, data: bytes) -> None:
+        """Append data to output."""
+        self.size += len(data)
+
+        if self._file is None and self.path and self.size > self.memory:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, 'wb')
+            self._spool(bytes(self.head + self.tail))
+        if self._file is not None:
+            self._spool(data)
+
+        free = self.memory // 2 - len(self.head)
+        if free > 0:
+            self.head += data[:free]
+            data = data[free:]
+        self.tail += data
+        excess = len(self.head) + len(self.tail) - self.memory
+        if excess > 0:
+            del self.tail[:excess]
+
+    def _spool(self, data: bytes) -> None:
+        if self.limit is not None:
+            data = data[:max(self.limit - self._written, 0)]
+        self._file.write(data)
+        self._written += len(data)
+
+    def adopt(self, head: bytes, tail: bytes, size: int, written: int) -> None:
+        """Take over output streamed into the spool file by another process, keeping its head and tail."""
+        self.head = bytearray(head)
+        self.tail = bytearray(tail)
+        self.size = size
+        self._written = written
+
+    def close(self) -> None:
+        """Close the spool file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def text(self, encoding: str) -> str:
+        """Decode output kept in memory."""
+        if self.size <= self.memory:
+            return (self.head + self.tail).decode(encoding)
+
+        omitted = self.size - len(self.head) - len(self.tail)
+        location = f'see {self.path}' if self.spooled else 'not stored'
+        return '\n'.join([
+            self.head.decode(encoding, errors='replace'),
+            f'[... {omitted} bytes omitted, {location} ...]',
+            self.tail.decode(encoding, errors='replace'),
+        ])
+
+
+@lru_cache(maxsize=None)
+def resolve_executable(name: str, path: Optional[str] = None) -> Optional[str]:
+    """Resolve executable to an absolute path by searching the given PATH value."""
+    resolved = shutil.which(name, path=path)
+    return os.path.abspath(resolved) if resolved else None
+
+
+def _remaining(deadline: Optional[float]) -> Optional[float]:
+    return None if deadline is None else max(deadline - monotonic(), 0)
+
+
+def _kill(proc: Popen, grace: float = 0) -> None:
+    """Terminate process together with all processes of its group, killing them after the grace period.
+
+    Processes are started in their own process group, so the group contains all descendants of a process
+    unless they moved to another group themselves.
+    """
+    if os.name != 'posix':
+        proc.kill()
+        return
+
+    deadline = monotonic() + grace
+    try:
+        os.killpg(proc.pid, signal.SIGTERM if grace > 0 else signal.SIGKILL)
+        if grace <= 0:
+            return
+        proc.wait(timeout=grace)
+        # The group exists as long as descendants of the exited process are running
+        while monotonic() < deadline:
+            os.killpg(proc.pid, 0)
+            sleep(KILL_POLL_INTERVAL)
+    except TimeoutExpired:
+        pass
+    except OSError:
+        return
+
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except OSError:
+        pass
+
+
+def _rlimits(limits: Optional[Dict[str, int]]) -> List[Tuple[int, int]]:
+    """Get resources and values of resource limits by name of `RLIMITS`, capped at the current hard limits."""
+    if not limits:
+        return []
+    if os.name != 'posix':
+        warnings.warn('Resource limits are only supported on POSIX platforms', RuntimeWarning)
+        return []
+
+    import resource
+
+    rlimits = []
+    for name, value in limits.items():
+        rlimit = getattr(resource, RLIMITS[name])
+        _, hard = resource.getrlimit(rlimit)
+        value = value if hard == resource.RLIM_INFINITY else min(value, hard)
+        rlimits.append((rlimit, value))
+    return rlimits
+
+
+def _limiter(rlimits: List[Tuple[int, int]]) -> Optional[Callable[[], None]]:
+    """Create function applying resource limits in the child process before the command is executed.
+
+    Processes are only spawned this way if limits are set, since it prevents spawning them using vfork.
+    """
+    if not rlimits:
+        return None
+
+    import resource
+
+    def _apply() -> None:
+        for rlimit, value in rlimits:
+            resource.setrlimit(rlimit, (value, value))
+
+    return _apply
+
+
+def _pump(stream: IO[bytes], spool: OutputSpool) -> None:
+    """Copy stream to spool until it is closed."""
+    for chunk in iter(lambda: stream.read1(CHUNK_SIZE), b''):
+        spool.write(chunk)
+
+
+def _communicate_threaded(proc: Popen, stdout: OutputSpool, stderr: OutputSpool, deadline: Optional[float],
+                          grace: float) -> bool:
+    """Stream outputs of process using a thread per output."""
+    pumps = [
+        Thread(target=_pump, args=(proc.stdout, stdout), daemon=True),
+        Thread(target=_pump, args=(proc.stderr, stderr), daemon=True),
+    ]
+    for pump in pumps:
+        pump.start()
+
+    try:
+        proc.wait(timeout=_remaining(deadline))
+        timed_out = False
+    except TimeoutExpired:
+        _kill(proc, grace)
+        timed_out = True
+
+    for pump in pumps:
+        pump.join()
+    return timed_out
+
+
+def _communicate_selected(proc: Popen, stdout: OutputSpool, stderr: OutputSpool, deadline: Optional[float],
+                          grace: float) -> bool:
+    """Stream outputs of process from the current thread."""
+    timed_out = False
+
+    with selectors.DefaultSelector() as selector:
+        selector.register(proc.stdout, selectors.EVENT_READ, stdout)
+        selector.register(proc.stderr, selectors.EVENT_READ, stderr)
+
+        while selector.get_map():
+            timeout = None if timed_out else _remaining(deadline)
+            if timeout == 0:
+                _kill(proc, grace)
+                timed_out = True
+                continue
+
+            for key, _ in selector.select(timeout):
+                data = os.read(key.fd, CHUNK_SIZE)
+                if data:
+                    key.data.write(data)
+                else:
+                    selector.unregister(key.fileobj)
+
+    if not timed_out:
+        try:
+            proc.wait(timeout=_remaining(deadline))
+        except TimeoutExpired:
+            _kill(proc, grace)
+            timed_out = True
+    return timed_out
+
+
+@dataclass
+class ResourceUsage:
+    """Resources used by a finished executable and its waited-for descendants.
+
+    Attributes:
+        user_time: CPU time in seconds spent in user mode
+        system_time: CPU time in seconds spent in system mode
+        max_rss: Maximum resident set size in bytes
+        voluntary_switches: Context switches due to waiting for resources
+        involuntary_switches: Context switches due to preemption
+        block_input: Block input operations
+        block_output: Block output operations
+    """
+
+    user_time: float
+    system_time: float
+    max_rss: int
+    voluntary_switches: int
+    involuntary_switches: int
+    block_input: int
+    block_output: int
+
+    @classmethod
+    def of(cls, rusage: Any) -> ResourceUsage:
+        """Create from resource usage returned by os.wait4."""
+        return cls(
+            rusage.ru_utime,
+            rusage.ru_stime,
+            rusage.ru_maxrss * (1 if sys.platform == 'darwin' else 1024),
+            rusage.ru_nvcsw,
+            rusage.ru_nivcsw,
+            rusage.ru_inblock,
+            rusage.ru_oublock,
+        )
+
+
+class ReapingPopen(Popen):
+    """Popen reaping the child process using wait4 to collect its resource usage."""
+
+    usage: Optional[ResourceUsage] = None
+
+    def _wait4(self, pid: int, options: int) -> Tuple[int, int]:
+        pid, status, rusage = os.wait4(pid, options)
+        if pid == self.pid:
+            self.usage = ResourceUsage.of(rusage)
+        return pid, status
+
+    def _internal_poll(self, *args: Any, **kwargs: Any) -> Optional[int]:
+        kwargs.setdefault('_waitpid', self._wait4)
+        return super()._internal_poll(*args, **kwargs)
+
+    def _try_wait(self, wait_flags: int) -> Tuple[int, int]:
+        try:
+            return self._wait4(self.pid, wait_flags)
+        except ChildProcessError:
+            return self.pid, 0
+
+
+@dataclass
+class ExecutionResult:
+    """Result of a finished test executable.
+
+    Attributes:
+        returncode: Exit code of executable or None if it timed out
+        stdout: Captured standard output
+        stderr: Captured standard error
+        duration: Wall time in seconds
+        timed_out: Executable was killed after exceeding the timeout
+        usage: Resources used by the executable if available
+        unmet: Descriptions of output expectations that were not met
+    """
+
+    returncode: Optional[int]
+    stdout: OutputSpool
+    stderr: OutputSpool
+    duration: float
+    timed_out: bool = False
+    usage: Optional[ResourceUsage] = None
+    unmet: List[str] = field(default_factory=list)
+
+    @property
+    def succeeded(self) -> bool:
+        """Executable exited with code 0 and met all output expectations."""
+        return self.returncode == 0 and not self.unmet
+
+
+class _MatchedOutput:
+    """Output spool whose data is also matched against expectations, killing the process on forbidden output."""
+
+    def __init__(self, spool: OutputSpool, stream: str, matcher: OutputMatcher, proc: Popen, lock: Lock) -> None:
+        self.spool = spool
+        self.stream = stream
+        self.matcher = matcher
+        self.proc = proc
+        self.lock = lock
+
+    def write(self, data: bytes) -> None:
+        self.spool.write(data)
+        with self.lock:
+            abort = self.matcher.feed(self.stream, data)
+        if abort:
+            _kill(self.proc)
+
+
+_communicate = _communicate_selected if os.name == 'posix' else _communicate_threaded
+_Popen = ReapingPopen if hasattr(os, 'wait4') else Popen
+
+
+class ProcessGroups:
+    """Registry of running processes, whose process groups are killed if the session is interrupted.
+
+    Processes run in their own process group and do not receive signals like SIGINT of the terminal, so
+    processes started by background threads would survive an interrupted session otherwise. Processes added
+    after the groups were killed are killed right away.
+    """
+
+    def __init__(self) -> None:
+        self.killed = False
+        self._processes: Dict[Popen, float] = {}
+        self._lock = Lock()
+
+    def add(self, proc: Popen, grace: float = 0) -> None:
+        """Register running process, which is terminated and killed after the grace period when killing."""
+        with self._lock:
+            if not self.killed:
+                self._processes[proc] = grace
+                return
+        _kill(proc, grace)
+
+    def discard(self, proc: Popen) -> None:
+        """Unregister process that is no longer running."""
+        with self._lock:
+            self._processes.pop(proc, None)
+
+    def kill(self) -> None:
+        """Kill groups of all registered processes, terminating them first if they have a grace period."""
+        with self._lock:
+            self.killed = True
+            processes, self._processes = self._processes, {}
+
+        killers = [Thread(target=_kill, args=(proc, grace), daemon=True) for proc, grace in processes.items()]
+        for killer in killers:
+            killer.start()
+        for killer in killers:
+            killer.join()
+
+
+def execute(cmd: List[str],
+            env: Optional[Dict[str, str]] = None,
+            timeout: Optional[float] = None,
+            stdout: Optional[OutputSpool] = None,
+            stderr: Optional[OutputSpool] = None,
+            executable: Optional[str] = None,
+            limits: Optional[Dict[str, int]] = None,
+            grace: float = KILL_GRACE,
+            expect: Optional[Expectations] = None,
+            processes: Optional[ProcessGroups] = None) -> ExecutionResult:
+    """Run command and wait until it finished or the timeout expired.
+
+    The output is streamed into the given spools while the command is running. The resource usage is
+    collected on platforms supporting wait4.
+
+    The command runs in its own process group. If it times out, all processes of its group are terminated
+    and killed if they did not exit within the grace period. Resource limits by name of `RLIMITS` are
+    applied to the process before the command is executed, so all processes started by it inherit them.
+
+    Given expectations are matched while the output is streamed. If a forbidden pattern matches and they
+    shall fail fast, all processes of the group are killed right away. The process is registered at the
+    given process groups while it is running.
+    """
+    stdout = stdout or OutputSpool()
+    stderr = stderr or OutputSpool()
+    matcher = expect.matcher() if expect else None
+    start = monotonic()
+
+    deadline = None if timeout is None else start + timeout
+    rlimits = _rlimits(limits)
+
+    try:
+        with trace.span('spawn', 'process'):
+            proc = _Popen(cmd,
+                          executable=executable,
+                          env=env,
+                          stdout=PIPE,
+                          stderr=PIPE,
+                          preexec_fn=_limiter(rlimits),
+                          **NEW_PROCESS_GROUP)
+        with proc, trace.span('wait', 'process', pid=proc.pid):
+            outputs = (stdout, stderr)
+            if matcher:
+                lock = Lock()
+                outputs = (_MatchedOutput(stdout, 'stdout', matcher, proc, lock),
+                           _MatchedOutput(stderr, 'stderr', matcher, proc, lock))
+            if processes:
+                processes.add(proc)
+            try:
+                timed_out = _communicate(proc, *outputs, deadline, grace)
+            except BaseException:
+                # Processes in their own group do not receive signals like SIGINT of the terminal
+                _kill(proc)
+                raise
+            finally:
+                if processes:
+                    processes.discard(proc)
+            returncode = proc.wait()
+    finally:
+        stdout.close()
+        stderr.close()
+
+    return ExecutionResult(None if timed_out else returncode, stdout, stderr, monotonic() - start, timed_out,
+                           getattr(proc, 'usage', None), matcher.close() if matcher else [])
+
+
+class DriverError(RuntimeError):
+    """Error reported by a persistent test driver for a single test."""
+
+
+def _spool_spec(spool: OutputSpool) -> Dict[str, Any]:
+    """Describe spool for streaming output into it from another process."""
+    return {'path': str(spool.path) if spool.path else None, 'memory': spool.memory, 'limit': spool.limit}
+
+
+def _decoded(output: str) -> Iterator[bytes]:
+    """Decode base64 encoded output in chunks."""
+    for start in range(0, len(output), CHUNK_SIZE):
+        yield base64.b64decode(output[start:start + CHUNK_SIZE])
+
+
+class DriverConnection:
+    """Persistent test driver process.
+
+    Tests are sent to the driver as one JSON object per line on its stdin, the driver answers with one JSON
+    object per line on its stdout. The driver streams outputs of executables into the spool files itself and
+    only transfers the parts kept in memory base64 encoded.
+    """
+
+    def __init__(self, cmd: List[str]) -> None:
+        self.proc = Popen(cmd, stdin=PIPE, stdout=PIPE, **NEW_PROCESS_GROUP)
+        self._lines: SimpleQueue[Optional[bytes]] = SimpleQueue()
+        self._reader = Thread(target=self._read, daemon=True)
+        self._reader.start()
+        self._last_id = 0
+
+    def _read(self) -> None:
+        for line in self.proc.stdout:
+            self._lines.put(line)
+        self._lines.put(None)
+
+    def request(self, message: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Send request to driver and wait for its response."""
+        self._last_id += 1
+        message = {'id': self._last_id, **message}
+        self.proc.stdin.write(json.dumps(message).encode() + b'\n')
+        self.proc.stdin.flush()
+
+        deadline = None if timeout is None else monotonic() + timeout
+        while True:
+            try:
+                line = self._lines.get(timeout=_remaining(deadline))
+            except Empty:
+                raise TimeoutError('Test driver did not respond in time') from None
+            if line is None:
+                raise ConnectionError(f'Test driver exited with code {self.proc.wait()}')
+
+            try:
+                response = json.loads(line)
+            except ValueError:
+                raise ConnectionError(f'Invalid response from test driver: {line!r}') from None
+            # Skip late responses of previous requests
+            if isinstance(response, dict) and response.get('id') == message['id']:
+                return response
+
+    def close(self) -> None:
+        """Ask driver to exit by closing its input and kill it if it does not."""
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+
+        try:
+            self.proc.wait(timeout=DRIVER_GRACE)
+        except TimeoutExpired:
+            _kill(self.proc)
+            self.proc.wait()
+        self._reader.join()
+        self.proc.stdout.close()
+
+
+class DriverPool:
+    """Persistent test drivers, one per concurrently running test.
+
+    If a driver cannot be started or breaks, no further drivers are used and tests shall fall back to
+    spawning the driver per test.
+    """
+
+    def __init__(self, cmd: List[str]) -> None:
+        self.cmd = cmd
+        self.failed = False
+        self._idle: List[DriverConnection] = []
+        self._connections: List[DriverConnection] = []
+        self._lock = Lock()
+
+    def _acquire(self) -> Optional[DriverConnection]:
+        with self._lock:
+            if self.failed:
+                return None
+            if self._idle:
+                return self._idle.pop()
+
+            try:
+                connection = DriverConnection(self.cmd)
+            except OSError as ex:
+                self._fail(ex)
+                return None
+            self._connections.append(connection)
+            return connection
+
+    def _fail(self, ex: Exception) -> None:
+        if not self.failed:
+            self.failed = True
+            warnings.warn(f'Persistent test driver failed, falling back to spawning it per test: {ex}', RuntimeWarning)
+
+    def _discard(self, connection: DriverConnection) -> None:
+        with self._lock:
+            self._connections.remove(connection)
+        _kill(connection.proc)
+        connection.close()
+
+    def execute(self,
+                cmd: List[str],
+                env: Optional[Dict[str, str]] = None,
+                timeout: Optional[float] = None,
+                stdout: Optional[OutputSpool] = None,
+                stderr: Optional[OutputSpool] = None,
+                limits: Optional[Dict[str, int]] = None,
+                grace: float = KILL_GRACE,
+                expect: Optional[Expectations] = None,
+                processes: Optional[ProcessGroups] = None) -> Optional[ExecutionResult]:
+        """Run command using a persistent driver.
+
+        Returns None if no driver is available, so the command must be spawned instead. Output expectations
+        are matched by the driver, or afterwards if the driver does not report unmet expectations. The driver
+        is registered at the given process groups while it is running the command, so it is terminated and
+        can kill the command when they are killed.
+        """
+        connection = self._acquire()
+        if connection is None:
+            return None
+
+        stdout = stdout or OutputSpool()
+        stderr = stderr or OutputSpool()
+        start = monotonic()
+
+        if processes:
+            processes.add(connection.proc, grace)
+        try:
+            with trace.span('driver request', 'process', driver=connection.proc.pid):
+                response = connection.request(
+                    {
+                        'command': cmd,
+                        'env': env,
+                        'timeout': timeout,
+                        'limits': limits,
+                        'grace': grace,
+                        'expect': expect.spec() if expect else None,
+                        'output': {'stdout': _spool_spec(stdout), 'stderr': _spool_spec(stderr)},
+                    },
+                    None if timeout is None else timeout + grace + DRIVER_GRACE,
+                )
+        except TimeoutError:
+            self._discard(connection)
+            stdout.close()
+            stderr.close()
+            return ExecutionResult(None, stdout, stderr, monotonic() - start, True)
+        except OSError as ex:
+            # Drivers terminated along with all other processes did not fail
+            if not (processes and processes.killed):
+                with self._lock:
+                    self._fail(ex)
+            self._discard(connection)
+            return None
+        finally:
+            if processes:
+                processes.discard(connection.proc)
+
+        with self._lock:
+            self._idle.append(connection)
+
+        if response.get('error'):
+            raise DriverError(response['error'])
+
+        matcher = expect.matcher() if expect and 'unmet' not in response else None
+        try:
+            for name, spool in (('stdout', stdout), ('stderr', stderr)):
+                output = response.get(name, '')
+                if isinstance(output, dict):
+                    spool.adopt(base64.b64decode(output['head']), base64.b64decode(output['tail']), output['size'],
+                                output['written'])
+                    if matcher:
+                        matcher.feed(name, bytes(spool.head + spool.tail))
+                    continue
+
+                # Drivers not spooling outputs themselves transfer them completely
+                for chunk in _decoded(output):
+                    spool.write(chunk)
+                    if matcher:
+                        matcher.feed(name, chunk)
+        finally:
+            stdout.close()
+            stderr.close()
+
+        unmet = matcher.close() if matcher else response.get('unmet', [])
+
+        timed_out = bool(response.get('timed_out'))
+        try:
+            usage = ResourceUsage(**response['usage']) if response.get('usage') else None
+        except TypeError:
+            usage = None
+        return ExecutionResult(None if timed_out else response.get('returncode'), stdout, stderr,
+                               monotonic() - start, timed_out, usage, unmet)
+
+    def close(self) -> None:
+        """Stop all drivers."""
+        with self._lock:
+            connections, self._connections, self._idle = self._connections, [], []
+        for connection in connections:
+            connection.close()
+
+
+@dataclass(frozen=True)
+class Demand:
+    """Resources required by a job while it is running.
+
+    Attributes:
+        cpus: Number of CPU slots
+        memory: Memory in bytes
+        exclusive: Names of locks held exclusively
+        shared: Names of locks shared with other jobs
+    """
+
+    cpus: int = 1
+    memory: int = 0
+    exclusive: FrozenSet[str] = frozenset()
+    shared: FrozenSet[str] = frozenset()
+
+
+class Capacity:
+    """Resources available for concurrently running jobs.
+
+    Jobs requiring more CPU slots or memory than available in total are treated as requiring all of
+    them, so they are run alone instead of never.
+    """
+
+    def __init__(self, cpus: Optional[int] = None, memory: Optional[int] = None) -> None:
+        self.cpus = cpus
+        self.memory = memory
+        self._cpus = 0
+        self._memory = 0
+        self._exclusive: Set[str] = set()
+        self._shared: Counter[str] = Counter()
+
+    def _clamp(self, demand: Demand) -> Tuple[int, int]:
+        cpus = demand.cpus if self.cpus is None else min(demand.cpus, self.cpus)
+        memory = demand.memory if self.memory is None else min(demand.memory, self.memory)
+        return cpus, memory
+
+    def fits(self, demand: Demand) -> bool:
+        """Check if job with given demand can be started now."""
+        cpus, memory = self._clamp(demand)
+        if self.cpus is not None and self._cpus + cpus > self.cpus:
+            return False
+        if self.memory is not None and self._memory + memory > self.memory:
+            return False
+        if any(lock in self._exclusive or self._shared[lock] for lock in demand.exclusive):
+            return False
+        return not any(lock in self._exclusive for lock in demand.shared)
+
+    def acquire(self, demand: Demand) -> None:
+        """Reserve resources of started job."""
+        cpus, memory = self._clamp(demand)
+        self._cpus += cpus
+        self._memory += memory
+        self._exclusive.update(demand.exclusive)
+        self._shared.update(demand.shared)
+
+    def release(self, demand: Demand) -> None:
+        """Free resources of finished job."""
+        cpus, memory = self._clamp(demand)
+        self._cpus -= cpus
+        self._memory -= memory
+        self._exclusive.difference_update(demand.exclusive)
+        self._shared.subtract(demand.shared)
+
+
+class JobPool:
+    """Bounded pool running test executions in background threads.
+
+    At most `jobs` executions are running at the same time and only as long as their resource demands
+    fit into the given capacity. Executions are started in submission order, but an execution that has to
+    wait for resources may be overtaken by later ones that fit. Results are picked up per item, so
+    reporting stays in collection order.
+    """
+
+    def __init__(self,
+                 jobs: int,
+                 capacity: Optional[Capacity] = None,
+                 demand: Optional[Callable[[Item], Demand]] = None) -> None:
+        self.jobs = jobs
+        self.capacity = capacity or Capacity()
+        self.demand = demand or (lambda item: Demand())
+        self._futures: Dict[Item, Future] = {}
+        self._pending: List[Tuple[Item, Callable[[Item], ExecutionResult], Demand, Future]] = []
+        self._condition = Condition()
+        self._stopped = False
+        self._workers = [Thread(target=self._work, name=f'yastr_{i}', daemon=True) for i in range(jobs)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, items: Iterable[Item], func: Callable[[Item], ExecutionResult]) -> None:
+        """Schedule execution of given items."""
+        with self._condition:
+            for item in items:
+                future = self._futures[item] = Future()
+                self._pending.append((item, func, self.demand(item), future))
+            self._condition.notify_all()
+
+    def _next(self) -> Optional[Tuple[Item, Callable[[Item], ExecutionResult], Demand, Future]]:
+        """Wait for next pending execution that fits into the capacity or None if the pool is stopped."""
+        with self._condition:
+            while not self._stopped:
+                for i, job in enumerate(self._pending):
+                    if self.capacity.fits(job[2]):
+                        del self._pending[i]
+                        self.capacity.acquire(job[2])
+                        return job
+                self._condition.wait()
+        return None
+
+    def _work(self) -> None:
+        for item, func, demand, future in iter(self._next, None):
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(func(item))
+                    except BaseException as ex:
+                        future.set_exception(ex)
+            finally:
+                with self._condition:
+                    self.capacity.release(demand)
+                    self._condition.notify_all()
+
+    def result(self, item: Item, func: Callable[[Item], ExecutionResult]) -> ExecutionResult:
+        """Wait for result of item or execute it directly if it was not scheduled."""
+        future = self._futures.pop(item, None)
+        if future is None:
+            return func(item)
+        return future.result()
+
+    def shutdown(self) -> None:
+        """Cancel pending executions and wait for running ones."""
+        with self._condition:
+            self._stopped = True
+            for _, _, _, future in self._pending:
+                future.cancel()
+            self._pending.clear()
+            self._futures.clear()
+            self._condition.notify_all()
+
+        for worker in self._workers:
+            worker.join()
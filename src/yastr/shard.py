@@ -0,0 +1,47 @@
+"""Deterministic partitioning of tests across independent runs."""
+
+from __future__ import annotations
+
+import hashlib
+import heapq
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Dict, List, Optional, Sequence, Tuple
+
+
+def parse_shard(text: str) -> Tuple[int, int]:
+    """Parse shard spec like 2/5 into the zero-based shard index and the number of shards."""
+    try:
+        index, count = (int(part) for part in text.split('/'))
+    except ValueError:
+        raise ValueError(f'Invalid shard {text}, must be like <index>/<count>') from None
+
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f'Invalid shard {text}, index must be between 1 and the number of shards')
+    return index - 1, count
+
+
+def stable_hash(nodeid: str) -> int:
+    """Hash of test id that is the same in every process."""
+    return int.from_bytes(hashlib.sha256(nodeid.encode()).digest()[:8], 'big')
+
+
+def partition(nodeids: Sequence[str], count: int, durations: Optional[Dict[str, float]] = None) -> List[int]:
+    """Assign every test to a shard.
+
+    Without durations, tests are assigned by a stable hash of their id. Otherwise, the longest tests
+    are assigned first to the shard with the lowest total duration so far, preferring the shard with the
+    fewest and then the lowest index. Since only the ids and durations are considered, every run given
+    the same tests and durations computes the same partition.
+    """
+    if not durations:
+        return [stable_hash(nodeid) % count for nodeid in nodeids]
+
+    shards = [0] * len(nodeids)
+    loads = [(0.0, 0, shard) for shard in range(count)]
+    for i in sorted(range(len(nodeids)), key=lambda i: (-durations.get(nodeids[i], 0.0), nodeids[i])):
+        load, size, shard = heapq.heappop(loads)
+        shards[i] = shard
+        heapq.heappush(loads, (load + durations.get(nodeids[i], 0.0), size + 1, shard))
+    return shards
@@ -0,0 +1,169 @@
+"""Streaming of test results to files while tests are running."""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+import xml.etree.ElementTree as ET
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    from typing import Any, Dict, List, Optional, TextIO, Tuple
+
+    from pytest import TestReport
+
+#: Counters of the JUnit test suite per outcome
+JUNIT_COUNTERS = {'error': 'errors', 'failed': 'failures', 'skipped': 'skipped', 'xfailed': 'skipped'}
+
+#: Characters reserved for the opening tag of the JUnit test suite, which is rewritten with the final counters
+JUNIT_HEADER_SIZE = 256
+
+#: Prefix of report sections containing captured output
+CAPTURED_PREFIX = 'Captured '
+
+
+def outcome_of(reports: List[TestReport]) -> str:
+    """Determine outcome of a test from the reports of its phases."""
+    for report in reports:
+        if report.failed:
+            return 'failed' if report.when == 'call' else 'error'
+    for report in reports:
+        if report.skipped:
+            return 'xfailed' if hasattr(report, 'wasxfail') else 'skipped'
+    if any(hasattr(report, 'wasxfail') for report in reports):
+        return 'xpassed'
+    return 'passed'
+
+
+def result_of(nodeid: str, reports: List[TestReport]) -> Dict[str, Any]:
+    """Create JSON serializable result of a test from the reports of its phases."""
+    outcome = outcome_of(reports)
+    result = {
+        'nodeid': nodeid,
+        'outcome': outcome,
+        'duration': sum(report.duration for report in reports),
+        'timestamp': time.time(),
+        'properties': {},
+    }
+    for report in reports:
+        result['properties'].update((name, value) for name, value in report.user_properties)
+        if report.failed:
+            result['message'] = report.longreprtext
+        elif report.skipped and 'message' not in result:
+            # Skip reports contain a tuple of file, line number and message
+            result['message'] = report.longrepr[2] if isinstance(report.longrepr, tuple) else report.longreprtext
+
+    # Sections of the last report contain the output captured in all phases
+    for title, content in reports[-1].sections:
+        if title.startswith(CAPTURED_PREFIX):
+            name = title[len(CAPTURED_PREFIX):].split(' ', 1)[0]
+            result[name] = result.get(name, '') + content
+    return result
+
+
+def release_output(sections: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """Remove sections containing captured output."""
+    return [(title, content) for title, content in sections if not title.startswith(CAPTURED_PREFIX)]
+
+
+def _testcase(result: Dict[str, Any]) -> ET.Element:
+    """Create JUnit XML element of a test result."""
+    names = result['nodeid'].split('::')
+    names[0:1] = [name for name in names[0].split('/') if name != '.']
+    testcase = ET.Element('testcase', classname='.'.join(names[:-1]), name=names[-1], time=f'{result["duration"]:.3f}')
+
+    if result['properties']:
+        properties = ET.SubElement(testcase, 'properties')
+        for name, value in result['properties'].items():
+            ET.SubElement(properties, 'property', name=str(name), value=str(value))
+
+    outcome = result['outcome']
+    message = result.get('message', '')
+    if outcome in ('failed', 'error'):
+        element = ET.SubElement(testcase, 'failure' if outcome == 'failed' else 'error',
+                                message=message.splitlines()[-1] if message else '')
+        element.text = message
+    elif outcome in ('skipped', 'xfailed'):
+        ET.SubElement(testcase, 'skipped', message=message.splitlines()[-1] if message else '')
+
+    for name in ('stdout', 'stderr'):
+        if result.get(name):
+            ET.SubElement(testcase, f'system-{name[3:]}').text = result[name]
+    return testcase
+
+
+class ResultSink:
+    """Writer of test results to a JSON lines file and a JUnit XML report.
+
+    Results are written and flushed as soon as their test finished, so both files can be followed while tests are
+    running and contain all finished tests if the run is aborted. The JUnit test suite is closed and its counters are
+    set when the sink is closed.
+    """
+
+    def __init__(self, jsonl: Optional[Path] = None, junit: Optional[Path] = None, release: bool = False) -> None:
+        self.release = release
+        self._reports: Dict[str, List[TestReport]] = {}
+        self._counters = {counter: 0 for counter in ('tests', *JUNIT_COUNTERS.values())}
+        self._started = time.time()
+        self._jsonl: Optional[TextIO] = None
+        self._junit: Optional[TextIO] = None
+
+        if jsonl:
+            jsonl.parent.mkdir(parents=True, exist_ok=True)
+            self._jsonl = open(jsonl, 'w', encoding='utf-8')
+        if junit:
+            junit.parent.mkdir(parents=True, exist_ok=True)
+            self._junit = open(junit, 'w', encoding='utf-8')
+            self._junit.write(self._junit_header())
+            self._junit.flush()
+
+    def _junit_header(self) -> str:
+        attributes = ' '.join(f'{name}="{value}"' for name, value in self._counters.items())
+        timestamp = time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self._started))
+        header = (f'<?xml version="1.0" encoding="utf-8"?>\n<testsuites><testsuite name="yastr" {attributes} '
+                  f'time="{time.time() - self._started:.3f}" timestamp="{timestamp}">')
+        return header.ljust(JUNIT_HEADER_SIZE) + '\n'
+
+    def add(self, report: TestReport) -> None:
+        """Add report of a test phase."""
+        self._reports.setdefault(report.nodeid, []).append(report)
+
+    def finish(self, nodeid: str) -> Optional[str]:
+        """Write result of a finished test and return its outcome.
+
+        Captured output of tests that did not fail is released from their reports if requested, since it is not
+        reported again at the end of the session.
+        """
+        reports = self._reports.pop(nodeid, [])
+        if not reports:
+            return None
+
+        result = result_of(nodeid, reports)
+        if self._jsonl:
+            self._jsonl.write(json.dumps(result, default=str) + '\n')
+            self._jsonl.flush()
+        if self._junit:
+            self._counters['tests'] += 1
+            if result['outcome'] in JUNIT_COUNTERS:
+                self._counters[JUNIT_COUNTERS[result['outcome']]] += 1
+            self._junit.write(ET.tostring(_testcase(result), encoding='unicode') + '\n')
+            self._junit.flush()
+
+        if self.release and result['outcome'] not in ('failed', 'error'):
+            for report in reports:
+                report.sections = release_output(report.sections)
+        return result['outcome']
+
+    def close(self) -> None:
+        """Close files, completing the JUnit XML report."""
+        if self._jsonl:
+            self._jsonl.close()
+            self._jsonl = None
+        if self._junit:
+            self._junit.write('</testsuite></testsuites>\n')
+            self._junit.seek(0, os.SEEK_SET)
+            self._junit.write(self._junit_header())
+            self._junit.close()
+            self._junit = None
@@ -0,0 +1,175 @@
+"""Rendering of templated test configs using Jinja.
+
+All configs are rendered by a shared environment that compiles every template once per process and
+keeps the compiled code in a bytecode cache across sessions. Configs without template syntax are not
+rendered at all, so Jinja is only imported if a config actually uses it.
+
+The included templates and environment variables read while rendering can be recorded, so rendered
+configs can be cached until any of them changes.
+"""
+
+from __future__ import annotations
+
+import os
+import platform
+import warnings
+from collections.abc import Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+TEMPLATE_MARKERS = ('{{', '{%', '{#')
+
+
+@dataclass
+class Dependencies:
+    """Files and environment variables read while rendering configs.
+
+    Attributes:
+        paths: Paths of all included, imported or extended templates
+        variables: Names of the environment variables read
+        environment: Whether the whole environment was read, e.g. by iterating over it
+    """
+
+    paths: Set[str] = field(default_factory=set)
+    variables: Set[str] = field(default_factory=set)
+    environment: bool = False
+
+
+_context: Dict[str, Any] = {}
+_bytecode_cache: Optional[str] = None
+_dependencies: Optional[Dependencies] = None
+
+
+class _Environ(Mapping):
+    """Read-only view of the environment variables recording which of them are read."""
+
+    def __getitem__(self, name: str) -> str:
+        if _dependencies is not None:
+            _dependencies.variables.add(name)
+        return os.environ[name]
+
+    def __iter__(self) -> Iterator[str]:
+        if _dependencies is not None:
+            _dependencies.environment = True
+        return iter(os.environ)
+
+    def __len__(self) -> int:
+        if _dependencies is not None:
+            _dependencies.environment = True
+        return len(os.environ)
+
+
+class _OS:
+    """Proxy of the os module for templates, reading the environment variables through `_Environ`."""
+
+    environ = _Environ()
+
+    def getenv(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.environ.get(name, default)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(os, name)
+
+
+_os = _OS()
+
+
+def is_templated(text: str) -> bool:
+    """Check if config text contains template syntax."""
+    return any(marker in text for marker in TEMPLATE_MARKERS)
+
+
+def configure(context: Optional[Dict[str, Any]] = None, bytecode_cache: Optional[str] = None) -> None:
+    """Set extra context values and bytecode cache folder for rendering configs in this process."""
+    global _context, _bytecode_cache
+    _context = dict(context or {})
+    _bytecode_cache = bytecode_cache
+    _environment.cache_clear()
+
+
+def settings() -> Tuple[Dict[str, Any], Optional[str]]:
+    """Arguments of `configure` for rendering configs the same way in other processes."""
+    return _context, _bytecode_cache
+
+
+def context() -> Dict[str, Any]:
+    """Values available in templates."""
+    return {'os': _os, 'platform': platform, **_context}
+
+
+def context_digest() -> str:
+    """Representation of the extra context values for invalidating cached configs."""
+    return repr(sorted(_context.items()))
+
+
+@contextmanager
+def recording() -> Iterator[Dependencies]:
+    """Record templates and environment variables read by configs rendered in the context."""
+    global _dependencies
+    previous, _dependencies = _dependencies, Dependencies()
+    try:
+        yield _dependencies
+    finally:
+        _dependencies = previous
+
+
+@lru_cache(maxsize=None)
+def _environment() -> Any:
+    import jinja2
+
+    class _Environment(jinja2.Environment):
+        """Environment resolving templates by path, included ones relative to the including template."""
+
+        def join_path(self, template: str, parent: str) -> str:
+            path = str(Path(parent).parent / template)
+            if _dependencies is not None:
+                _dependencies.paths.add(path)
+            return path
+
+    class _Loader(jinja2.BaseLoader):
+        """Loader of templates by absolute path."""
+
+        def get_source(self, environment: jinja2.Environment, template: str) -> Tuple[str, str, Any]:
+            path = Path(template)
+            try:
+                mtime = path.stat().st_mtime_ns
+                source = path.read_text()
+            except OSError:
+                raise jinja2.TemplateNotFound(template) from None
+
+            def _uptodate() -> bool:
+                try:
+                    return path.stat().st_mtime_ns == mtime
+                except OSError:
+                    return False
+
+            return source, str(path), _uptodate
+
+    bytecode_cache = None
+    if _bytecode_cache:
+        os.makedirs(_bytecode_cache, exist_ok=True)
+        bytecode_cache = jinja2.FileSystemBytecodeCache(_bytecode_cache)
+    return _Environment(loader=_Loader(), bytecode_cache=bytecode_cache)
+
+
+def render(path: Path, text: str) -> str:
+    """Render text of config file, returning it unchanged if it contains no template syntax.
+
+    Configs that fail to render are not considered templates, their text is returned unchanged as well.
+    """
+    if not is_templated(text):
+        return text
+
+    from jinja2 import TemplateError
+
+    try:
+        return _environment().get_template(str(path.absolute())).render(context())
+    except TemplateError as ex:
+        warnings.warn(f'Failed to render {path}, it may not be a template: {ex}')
+        return text
@@ -0,0 +1,133 @@
+"""Tracing of yastr phases in Chrome trace event format.
+
+Spans are only recorded while a tracer is active. Otherwise, `span` returns a shared no-op context
+manager, so instrumented code does not pay more than a function call.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import threading
+from contextlib import contextmanager, nullcontext
+from time import perf_counter_ns
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from pathlib import Path
+    from typing import Any, ContextManager, Dict, Iterable, Iterator, List, Optional
+
+_disabled = nullcontext()
+_tracer: Optional[Tracer] = None
+_local = threading.local()
+
+
+class Tracer:
+    """Recorder of timed spans.
+
+    Every span is recorded as complete event with the process and thread it was recorded in. Events of
+    other processes can be added, e.g. of worker processes loading test configs.
+    """
+
+    def __init__(self) -> None:
+        self.events: List[Dict[str, Any]] = []
+        self._threads: Dict[int, str] = {}
+
+    @contextmanager
+    def span(self, name: str, category: str, args: Dict[str, Any]) -> Iterator[None]:
+        start = perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = perf_counter_ns()
+            thread = threading.current_thread()
+            self._threads.setdefault(thread.ident, thread.name)
+            args = {'worker': thread.name, **(getattr(_local, 'tags', None) or {}), **args}
+            self.events.append({
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': start / 1000,
+                'dur': (end - start) / 1000,
+                'pid': os.getpid(),
+                'tid': thread.ident,
+                'args': args,
+            })
+
+    def add(self, events: Iterable[Dict[str, Any]]) -> None:
+        """Add events recorded by another tracer."""
+        self.events.extend(events)
+
+    def write(self, path: Path) -> None:
+        """Write all events as Chrome trace JSON file."""
+        metadata = [{
+            'name': 'thread_name',
+            'ph': 'M',
+            'pid': os.getpid(),
+            'tid': tid,
+            'args': {
+                'name': name
+            },
+        } for tid, name in self._threads.items()]
+        pids = {event['pid'] for event in self.events} - {os.getpid()}
+        metadata.extend({
+            'name': 'process_name',
+            'ph': 'M',
+            'pid': pid,
+            'args': {
+                'name': 'yastr' if pid == os.getpid() else 'yastr loader'
+            },
+        } for pid in pids | {os.getpid()})
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'traceEvents': metadata + self.events, 'displayTimeUnit': 'ms'}, f)
+
+
+def span(name: str, category: str = 'yastr', **args: Any) -> ContextManager[None]:
+    """Record span of the enclosed code if tracing is active."""
+    if _tracer is None:
+        return _disabled
+    return _tracer.span(name, category, args)
+
+
+@contextmanager
+def _tagged(tags: Dict[str, Any]) -> Iterator[None]:
+    previous = getattr(_local, 'tags', None)
+    _local.tags = {**(previous or {}), **tags}
+    try:
+        yield
+    finally:
+        _local.tags = previous
+
+
+def tagged(**tags: Any) -> ContextManager[None]:
+    """Add tags to all spans recorded by the current thread in the enclosed code if tracing is active."""
+    if _tracer is None:
+        return _disabled
+    return _tagged(tags)
+
+
+def add(events: Iterable[Dict[str, Any]]) -> None:
+    """Add events recorded by another process if tracing is active."""
+    if _tracer is not None:
+        _tracer.add(events)
+
+
+def start() -> Tracer:
+    """Activate tracing in the current process."""
+    global _tracer
+    _tracer = Tracer()
+    return _tracer
+
+
+def stop() -> Optional[Tracer]:
+    """Deactivate tracing and return the tracer that was active."""
+    global _tracer
+    tracer, _tracer = _tracer, None
+    return tracer
+
+
+def active() -> bool:
+    """Check if tracing is active."""
+    return _tracer is not None
@@ -1,5 +1,10 @@
 """Utility functions for different purposes."""
 
+import os
+import re
+from fnmatch import translate
+from typing import Callable, Iterable, Optional
+
 
 def mark_text(text: str, lineno: int, colno: int, surround: int = 10) -> str:
     """Cut snippet out of given text at given position and set marker."""
@@ -10,3 +15,41 @@ def mark_text(text: str, lineno: int, colno: int, surround: int = 10) -> str:
     snippet = line_text[snippet_start:(snippet_end + 1)]
     cursor_pos = colno - snippet_start - 1
     return '\n'.join([snippet, ' ' * cursor_pos + '^'])
+
+
+def parse_size(text: str) -> Optional[int]:
+    """Parse size in bytes with optional binary unit suffix like 64K, 8M or 2G."""
+    text = str(text).strip().upper()
+    if not text:
+        return None
+
+    match = re.fullmatch(r'(\d+(?:\.\d+)?)\s*([KMGT]?)I?B?', text)
+    if not match:
+        raise ValueError(f'Invalid size: {text}')
+
+    number, unit = match.groups()
+    return int(float(number) * 1024**'_KMGT'.index(unit or '_'))
+
+
+def format_size(size: int) -> str:
+    """Format size in bytes with binary unit suffix like 64K, 8.0M or 2.5G."""
+    for unit in '_KMG':
+        if size < 1024:
+            return f'{size}' if unit == '_' else f'{size:.1f}{unit}'
+        size /= 1024
+    return f'{size:.1f}T'
+
+
+def safe_filename(name: str) -> str:
+    """Replace all characters that are not safe to use in file names."""
+    return re.sub(r'[^\w.-]+', '_', name).strip('._')
+
+
+def compile_patterns(patterns: Iterable[str]) -> Callable[[str], bool]:
+    """Compile glob patterns into a single function checking if a path matches any of them like fnmatch."""
+    patterns = [os.path.normcase(pattern) for pattern in patterns]
+    if not patterns:
+        return lambda path: False
+
+    regex = re.compile('|'.join(translate(pattern) for pattern in patterns))
+    return lambda path: regex.match(os.path.normcase(path)) is not None
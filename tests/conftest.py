@@ -1 +1,12 @@
+# Import the plugin up front, so all its modules survive the sys.modules snapshots of inline runs.
+# Otherwise attributes of the yastr package can refer to stale submodules of previous runs.
+import yastr.plugin  # noqa: F401
+
+# Same for marshmallow, which yastr imports on first use and creates its schema from only once.
+# Its validation errors would be of another class than the ones raised by the schema if it was imported again.
+import marshmallow  # noqa: F401
+import marshmallow_dataclass  # noqa: F401
+# And for yaml, whose compiled loader keeps referring to the classes of its first import.
+import yaml  # noqa: F401
+
 pytest_plugins = 'pytester'
@@ -0,0 +1,102 @@
+import json
+from pathlib import Path
+
+COUNTER = '''
+import pathlib
+path = pathlib.Path("runs.txt")
+path.write_text(path.read_text() + "x" if path.exists() else "x")
+'''
+
+
+def test_benchmark(pytester):
+    pytester.makefile('.py', counter=COUNTER)
+    pytester.makefile('.yastr.json',
+                      config='{"executable": "python", "args": ["counter.py"], '
+                      '"benchmark": {"warmup": 2, "repetitions": 5}}')
+
+    result = pytester.runpytest_subprocess('-p', 'yastr.plugin', '--yastr-benchmark-results=results.json')
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(['*= benchmarks =*', '*runs*median*p95*p99*stddev*', '*5*s*.::config.yastr.json'])
+
+    assert (pytester.path / 'runs.txt').read_text() == 'x' * 7
+
+    results = json.loads((pytester.path / 'results.json').read_text())['benchmarks']
+    stats = results['.::config.yastr.json']
+    assert stats['repetitions'] == 5
+    assert stats['wall_min'] <= stats['wall_median'] <= stats['wall_p95'] <= stats['wall_p99']
+    assert 'cpu_median' in stats
+
+
+def test_override(pytester):
+    pytester.makefile('.py', counter=COUNTER)
+    pytester.makefile('.yastr.json', config='{"executable": "python", "args": ["counter.py"]}')
+
+    run = pytester.inline_run('--yastr-benchmark', '--yastr-benchmark-repetitions=3', '--yastr-benchmark-concurrency=2',
+                              plugins=['yastr.plugin'])
+    passed, _, _ = run.listoutcomes()
+
+    assert (pytester.path / 'runs.txt').read_text() == 'x' * 3
+    assert 'benchmark_wall_median' in dict(passed[0].user_properties)
+
+
+def test_concurrent_output(pytester):
+    pytester.makefile('.py', testfile='import os, time; print(f"{os.getpid()}\\n" * 500, end=""); time.sleep(0.2)')
+    pytester.makefile('.yastr.json',
+                      config='{"executable": "python", "args": ["testfile.py"], '
+                      '"benchmark": {"warmup": 1, "repetitions": 4, "concurrency": 4}}')
+    pytester.makeini('[pytest]\nyastr_output_dir = output\nyastr_output_memory = 1K')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, _, _ = run.listoutcomes()
+
+    logs = sorted((pytester.path / 'output').glob('*.stdout.log'))
+    assert len(logs) == 5
+    for log in logs:
+        assert len(set(log.read_text().splitlines())) == 1
+        assert len(log.read_text().splitlines()) == 500
+    assert Path(dict(passed[0].user_properties)['stdout_log']) in logs
+
+
+def test_failing_run(pytester):
+    pytester.makefile('.yastr.json',
+                      config='{"executable": "python", "args": ["-c", "raise SystemExit(3)"], '
+                      '"benchmark": {"repetitions": 3}}')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    _, _, failed = run.listoutcomes()
+
+    assert 'Executable returned code 3' in failed[0].longreprtext
+
+
+def test_regression(pytester):
+    pytester.makefile('.yastr.json',
+                      config='{"executable": "python", "args": ["-c", "pass"], '
+                      '"benchmark": {"repetitions": 2, "thresholds": {"wall_median": 0.5}}}')
+    pytester.makefile('.json',
+                      fast='{"benchmarks": {".::config.yastr.json": {"wall_median": 0.000001}}}',
+                      slow='{"benchmarks": {".::config.yastr.json": {"wall_median": 100}}}')
+
+    run = pytester.inline_run('--yastr-benchmark-baseline=slow.json', plugins=['yastr.plugin'])
+    run.assertoutcome(passed=1)
+
+    run = pytester.inline_run('--yastr-benchmark-baseline=fast.json', plugins=['yastr.plugin'])
+    _, _, failed = run.listoutcomes()
+    assert 'Benchmark regressed: wall_median of' in failed[0].longreprtext
+    assert 'by more than 50%' in failed[0].longreprtext
+
+
+def test_invalid_threshold(pytester):
+    pytester.makefile('.yastr.json',
+                      config='{"executable": "python", "benchmark": {"thresholds": {"wall_mode": 0.1}}}')
+
+    result = pytester.runpytest('-p', 'yastr.plugin')
+    result.assert_outcomes(errors=1)
+    result.stdout.fnmatch_lines(['*Invalid statistic wall_mode*'])
+
+
+def test_statistics():
+    from yastr.benchmark import percentile, summarize
+
+    assert percentile([1, 2, 3, 4, 5], 50) == 3
+    assert percentile([1, 2], 95) == 1.95
+    assert summarize([2.0]) == {'min': 2.0, 'median': 2.0, 'mean': 2.0, 'p95': 2.0, 'p99': 2.0, 'stddev': 0.0}
@@ -0,0 +1,107 @@
+import sqlite3
+
+
+def _fail_loading(path, *args):
+    raise AssertionError(f'{path} loaded from file')
+
+
+def test_cached(pytester, monkeypatch):
+    pytester.makefile('.yastr.json', config='{"executable": "python", "args": ["-c", "print(\'foo\')"]}')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    run.assertoutcome(passed=1)
+
+    monkeypatch.setattr('yastr.loader.load_tests', _fail_loading)
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    run.assertoutcome(passed=1)
+
+
+def test_invalidate_file(pytester):
+    pytester.makefile('.yastr.json', config='{"executable": "python", "args": ["-c", "print(\'foo\')"]}')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+    assert passed[0].capstdout.strip() == 'foo'
+
+    pytester.makefile('.yastr.json', config='{"executable": "python", "args": ["-c", "print(\'foobar\')"]}')
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+    assert passed[0].capstdout.strip() == 'foobar'
+
+
+def test_invalidate_template_context(pytester, monkeypatch):
+    pytester.makefile('.yastr.json',
+                      config='{"executable": "python", "args": ["-c", "print(\'{{ os.environ.VALUE }}\')"]}')
+
+    monkeypatch.setenv('VALUE', 'foo')
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+    assert passed[0].capstdout.strip() == 'foo'
+
+    monkeypatch.setenv('VALUE', 'bar')
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+    assert passed[0].capstdout.strip() == 'bar'
+
+
+def test_template_environment(pytester, monkeypatch):
+    pytester.makefile('.yastr.json',
+                      config='{"executable": "python", "args": ["-c", "print(\'{{ os.getenv(\"VALUE\") }}\')"]}')
+
+    monkeypatch.setenv('VALUE', 'foo')
+    pytester.inline_run(plugins=['yastr.plugin']).assertoutcome(passed=1)
+    with monkeypatch.context() as patch:
+        patch.setenv('OTHER', 'bar')
+        patch.setattr('yastr.loader.load_tests', _fail_loading)
+        pytester.inline_run(plugins=['yastr.plugin']).assertoutcome(passed=1)
+
+    monkeypatch.delenv('VALUE')
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+    assert passed[0].capstdout.strip() == 'None'
+
+
+def test_invalidate_include(pytester, monkeypatch):
+    pytester.makefile('.inc', args='"args": ["-c", "print(\'foo\')"]')
+    pytester.makefile('.yastr.json', config='{"executable": "python", {% include "args.inc" %}}')
+
+    pytester.inline_run(plugins=['yastr.plugin']).assertoutcome(passed=1)
+    with monkeypatch.context() as patch:
+        patch.setattr('yastr.loader.load_tests', _fail_loading)
+        pytester.inline_run(plugins=['yastr.plugin']).assertoutcome(passed=1)
+
+    pytester.makefile('.inc', args='"args": ["-c", "print(\'foobar\')"]')
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+    assert passed[0].capstdout.strip() == 'foobar'
+
+
+def test_disabled(pytester, monkeypatch):
+    pytester.makefile('.yastr.json', config='{"executable": "python", "args": ["-c", "print(\'foo\')"]}')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    run.assertoutcome(passed=1)
+
+    monkeypatch.setattr('yastr.cache.ConfigCache.get', lambda self, path, defaults: _fail_loading(path))
+    run = pytester.inline_run('--yastr-no-config-cache', plugins=['yastr.plugin'])
+    run.assertoutcome(passed=1)
+
+
+def test_eviction(pytester):
+    pytester.makefile('.yastr.json', a='{"executable": "python", "args": ["-c", "print(\'a\')"]}')
+    pytester.makefile('.yastr.json', b='{"executable": "python", "args": ["-c", "print(\'b\')"]}')
+    pytester.makeini('[pytest]\nyastr_config_cache_size = 1')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    run.assertoutcome(passed=2)
+
+    db = sqlite3.connect(pytester.path / '.pytest_cache' / 'd' / 'yastr' / 'configs.sqlite')
+    assert db.execute('SELECT COUNT(*) FROM configs').fetchone()[0] == 1
+    db.close()
+
+
+def test_invalid_size(pytester):
+    pytester.makeini('[pytest]\nyastr_config_cache_size = many')
+
+    result = pytester.runpytest('-p', 'yastr.plugin')
+    result.stderr.fnmatch_lines(['*yastr_config_cache_size must be a non-negative integer*'])
@@ -0,0 +1,74 @@
+import os
+import time
+
+CONFIG = '{"executable": "python", "args": ["-c", "pass"]}'
+
+CONFTEST = '''
+    visited = []
+
+    def pytest_collect_file(file_path, parent):
+        visited.append(file_path.name)
+
+    def pytest_sessionfinish(session):
+        (session.config.rootpath / 'visited.txt').write_text('\\n'.join(visited))
+'''
+
+
+def _age(root):
+    past = time.time() - 60
+    for folder, _, _ in os.walk(root):
+        os.utime(folder, (past, past))
+
+
+def test_prune(pytester):
+    for folder in ('out', 'src', 'src/gen', 'lib/gen'):
+        (pytester.path / folder).mkdir(parents=True)
+        (pytester.path / folder / 'config.yastr.json').write_text(CONFIG)
+    pytester.makeini('[pytest]\nyastr_prune_dirs = out src/gen')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, _, _ = run.listoutcomes()
+
+    assert sorted(report.nodeid for report in passed) == ['lib/gen::config.yastr.json', 'src::config.yastr.json']
+
+
+def test_dir_index(pytester):
+    pytester.makeconftest(CONFTEST)
+    (pytester.path / 'tests').mkdir()
+    (pytester.path / 'tests' / 'config.yastr.json').write_text(CONFIG)
+    (pytester.path / 'assets' / 'deep').mkdir(parents=True)
+    (pytester.path / 'assets' / 'deep' / 'data.txt').write_text('')
+    _age(pytester.path)
+
+    pytester.inline_run('--yastr-dir-index', plugins=['yastr.plugin']).assertoutcome(passed=1)
+    assert 'data.txt' in (pytester.path / 'visited.txt').read_text()
+
+    pytester.inline_run('--yastr-dir-index', plugins=['yastr.plugin']).assertoutcome(passed=1)
+    assert 'data.txt' not in (pytester.path / 'visited.txt').read_text()
+
+    (pytester.path / 'assets' / 'deep' / 'config.yastr.json').write_text(CONFIG)
+    pytester.inline_run('--yastr-dir-index', plugins=['yastr.plugin']).assertoutcome(passed=2)
+
+
+def test_recently_modified(pytester):
+    (pytester.path / 'tests').mkdir()
+    (pytester.path / 'tests' / 'config.yastr.json').write_text(CONFIG)
+    (pytester.path / 'assets').mkdir()
+
+    pytester.inline_run('--yastr-dir-index', plugins=['yastr.plugin']).assertoutcome(passed=1)
+
+    # Modifications within the resolution of the modification time must not be missed
+    (pytester.path / 'assets' / 'config.yastr.json').write_text(CONFIG)
+    mtime = (pytester.path / 'tests').stat().st_mtime_ns
+    os.utime(pytester.path / 'assets', ns=(mtime, mtime))
+    pytester.inline_run('--yastr-dir-index', plugins=['yastr.plugin']).assertoutcome(passed=2)
+
+
+def test_matcher():
+    from yastr.utils import compile_patterns
+
+    matcher = compile_patterns(['*.yastr.*', 'test_*.json'])
+    assert matcher('/a/b/config.yastr.yaml')
+    assert matcher('test_foo.json')
+    assert not matcher('/a/b/config.yaml')
+    assert not compile_patterns([])('foo')
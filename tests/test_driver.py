@@ -1,3 +1,27 @@
+import sys
+from pathlib import Path
+
+DRIVER = '''
+import sys
+
+from yastr.driver import main
+
+with open('driver.log', 'a') as f:
+    print('start', file=f)
+
+sys.exit(main())
+'''
+
+SPAWN_ONLY_DRIVER = '''
+import subprocess
+import sys
+
+if len(sys.argv) == 1:
+    sys.exit(1)
+sys.exit(subprocess.call(sys.argv[1:]))
+'''
+
+
 def test_setting(pytester):
     pytester.makefile('.py',
                       driver='import sys; from subprocess import run; print("foo", flush=True); run(sys.argv[1:])')
@@ -16,3 +40,140 @@ def test_setting(pytester):
     assert passed[0].nodeid == '.::config.yastr.json'
     assert passed[0].capstdout.strip() == 'foo\nbar'
     assert passed[0].capstderr.strip() == ''
+
+
+def test_persistent(pytester):
+    pytester.makepyfile(driver=DRIVER)
+    pytester.makeini(f'''
+        [pytest]
+        test_driver = "{sys.executable}" driver.py
+        test_driver_mode = persistent
+    ''')
+    pytester.makefile('.yastr.json',
+                      a='{"executable": "python", "args": ["-c", "print(\'foo\')"]}',
+                      b='{"executable": "python", "args": ["-c", "import os; print(os.environ[\'BAR\'])"], '
+                      '"environment": {"BAR": "bar"}}',
+                      c='{"executable": "python", "args": ["-c", "exit(3)"]}')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+
+    assert [report.capstdout.strip() for report in passed] == ['foo', 'bar']
+    assert 'Executable returned code 3' in failed[0].longreprtext
+    assert (pytester.path / 'driver.log').read_text().splitlines() == ['start']
+
+
+def test_persistent_spooled(pytester):
+    pytester.makepyfile(driver=DRIVER)
+    pytester.makeini(f'''
+        [pytest]
+        test_driver = "{sys.executable}" driver.py
+        test_driver_mode = persistent
+        yastr_output_dir = output
+        yastr_output_memory = 1K
+    ''')
+    pytester.makefile('.py', testfile='for i in range(1000): print(f"line {i:04}")')
+    pytester.makefile('.yastr.json', config='{"executable": "python", "args": ["testfile.py"]}')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+
+    log_path = Path(dict(passed[0].user_properties)['stdout_log'])
+    assert log_path.read_text() == ''.join(f'line {i:04}\n' for i in range(1000))
+    assert f'bytes omitted, see {log_path} ...]' in passed[0].capstdout
+    assert len(passed[0].capstdout) < 1024 + len(str(log_path)) + 50
+
+
+def test_persistent_response_bounded(tmp_path):
+    from yastr.driver import handle
+
+    response = handle({
+        'id': 1,
+        'command': [sys.executable, '-c', 'print("x" * 100000)'],
+        'output': {
+            'stdout': {'path': str(tmp_path / 'stdout.log'), 'memory': 1024, 'limit': None},
+            'stderr': {'path': None, 'memory': 1024, 'limit': None},
+        },
+    })
+
+    assert response['stdout']['size'] == response['stdout']['written'] == 100001
+    assert len(response['stdout']['head']) + len(response['stdout']['tail']) < 2 * 1024
+    assert (tmp_path / 'stdout.log').stat().st_size == 100001
+
+
+def test_persistent_timeout(pytester):
+    pytester.makepyfile(driver=DRIVER)
+    pytester.makeini(f'''
+        [pytest]
+        test_driver = "{sys.executable}" driver.py
+        test_driver_mode = persistent
+    ''')
+    pytester.makefile('.yastr.json',
+                      config='{"executable": "python", "args": ["-c", "import time; time.sleep(10)"], "timeout": 0.5}')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+
+    assert not passed
+    assert 'Executable timed out after 0.5 second(s)' in failed[0].longreprtext
+
+
+def test_persistent_limits(pytester):
+    pytester.makepyfile(driver=DRIVER)
+    pytester.makeini(f'''
+        [pytest]
+        test_driver = "{sys.executable}" driver.py
+        test_driver_mode = persistent
+    ''')
+    pytester.makefile('.yastr.json',
+                      config='{"executable": "python", "args": ["-c", "import resource; '
+                      'print(resource.getrlimit(resource.RLIMIT_NOFILE)[0])"], "limits": {"open_files": 64}}')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+
+    assert passed[0].capstdout.strip() == '64'
+
+
+def test_persistent_not_found(pytester):
+    pytester.makeini(f'''
+        [pytest]
+        test_driver = "{sys.executable}" -m yastr.driver
+        test_driver_mode = persistent
+    ''')
+    pytester.makefile('.yastr.json', config='{"executable": "missing-executable"}')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+
+    assert not passed
+    assert 'Executable missing-executable not found' in failed[0].longreprtext
+
+
+def test_persistent_fallback(pytester):
+    pytester.makepyfile(driver=SPAWN_ONLY_DRIVER)
+    pytester.makeini(f'''
+        [pytest]
+        test_driver = "{sys.executable}" driver.py
+        test_driver_mode = persistent
+    ''')
+    pytester.makefile('.yastr.json',
+                      a='{"executable": "python", "args": ["-c", "print(\'foo\')"]}',
+                      b='{"executable": "python", "args": ["-c", "print(\'bar\')"]}')
+
+    run = pytester.inline_run('-W', 'ignore::RuntimeWarning', plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+
+    assert not failed
+    assert [report.capstdout.strip() for report in passed] == ['foo', 'bar']
+
+
+def test_persistent_without_driver(pytester):
+    pytester.makeini('''
+        [pytest]
+        test_driver_mode = persistent
+    ''')
+    pytester.makefile('.yastr.json', config='{"executable": "python"}')
+
+    result = pytester.runpytest('-p', 'yastr.plugin')
+    result.stderr.fnmatch_lines(['*test_driver must be set for persistent test driver mode*'])
@@ -0,0 +1,94 @@
+import sys
+import time
+
+SCRIPT = """
+import sys, time
+print('starting', flush=True)
+print('step 1', flush=True)
+print('warning: low disk', file=sys.stderr, flush=True)
+print('step 2', flush=True)
+print('done', flush=True)
+"""
+
+
+def _outcome(pytester, expect, *args):
+    pytester.makepyfile(testfile=SCRIPT)
+    pytester.makefile('.yastr.json',
+                      config=f'{{"executable": "python", "args": ["testfile.py"], "expect": {expect}}}')
+    run = pytester.inline_run(*args, plugins=['yastr.plugin'])
+    passed, _, failed = run.listoutcomes()
+    return passed, failed
+
+
+def test_met(pytester):
+    passed, _ = _outcome(pytester, '{"required": ["^done$"], "forbidden": ["FATAL"], "ordered": ["step 1", "step 2"]}')
+    assert passed
+
+
+def test_unmet(pytester):
+    _, failed = _outcome(pytester, '{"required": ["^done$", "missing"], "ordered": ["step 2", "step 1"]}')
+    assert 'Output did not meet expectations' in failed[0].longreprtext
+    assert "Required pattern 'missing' not found" in failed[0].longreprtext
+    assert "Ordered pattern 'step 1' (2 of 2) not found after 'step 2'" in failed[0].longreprtext
+    assert "'^done$'" not in failed[0].longreprtext
+
+
+def test_stream(pytester):
+    _, failed = _outcome(pytester, '{"forbidden": ["warning"], "stream": "stderr"}')
+    assert "Forbidden pattern 'warning' matched line 1 of stderr: 'warning: low disk'" in failed[0].longreprtext
+
+    passed, _ = _outcome(pytester, '{"forbidden": ["warning"], "stream": "stdout"}')
+    assert passed
+
+
+def test_fail_fast(pytester):
+    pytester.makepyfile(testfile="""
+        import time
+        print('FATAL: broken', flush=True)
+        time.sleep(100)
+    """)
+    pytester.makefile('.yastr.json',
+                      config='{"executable": "python", "args": ["testfile.py"], "timeout": 60, '
+                      '"expect": {"forbidden": ["FATAL"]}}')
+
+    start = time.monotonic()
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    _, _, failed = run.listoutcomes()
+
+    assert time.monotonic() - start < 30
+    assert "Forbidden pattern 'FATAL' matched line 1 of stdout: 'FATAL: broken'" in failed[0].longreprtext
+    assert 'timed out' not in failed[0].longreprtext
+
+
+def test_no_fail_fast(pytester):
+    _, failed = _outcome(pytester, '{"forbidden": ["step"], "fail_fast": false}')
+    assert "Forbidden pattern 'step' matched line 2 of stdout: 'step 1'" in failed[0].longreprtext
+    assert failed[0].capstdout.split()[-1] == 'done'
+
+
+def test_persistent_driver(pytester):
+    pytester.makepyfile(driver='import sys; from yastr.driver import main; sys.exit(main())')
+    pytester.makeini(f'''
+        [pytest]
+        test_driver = "{sys.executable}" driver.py
+        test_driver_mode = persistent
+    ''')
+    _, failed = _outcome(pytester, '{"required": ["missing"]}')
+    assert "Required pattern 'missing' not found" in failed[0].longreprtext
+
+
+def test_invalid(pytester):
+    pytester.makefile('.yastr.json', config='{"executable": "python", "expect": {"required": ["("]}}')
+    result = pytester.runpytest('-p', 'yastr.plugin')
+    result.stdout.fnmatch_lines(["*Invalid pattern '('*"])
+
+
+def test_matcher():
+    from yastr.expect import Expectations
+
+    matcher = Expectations(required=['^ä$'], ordered=['a', 'b', 'c'], forbidden=['x$']).matcher()
+    data = 'ä\r\na b\nx\ny\nc'.encode()
+    assert not any(matcher.feed('stdout', data[i:i + 1]) for i in range(4))
+    assert matcher.feed('stdout', data[4:]) is True
+    assert matcher.aborted
+    assert matcher.close() == ["Forbidden pattern 'x$' matched line 3 of stdout: 'x'"]
@@ -144,7 +144,7 @@ def test_request(pytester):
         @pytest.fixture
         def bar(request):
             assert request.fixturename == 'bar'
-            assert request.scope == 'session'
+            assert request.scope == 'function'
             assert request.fixturenames == ['foo', 'bar']
             assert request.function is None
             assert request.cls is None
@@ -164,7 +164,7 @@ def test_request(pytester):
         @pytest.fixture
         def foo(request, bar):
             assert request.fixturename == 'foo'
-            assert request.scope == 'session'
+            assert request.scope == 'function'
             assert request.fixturenames == ['foo', 'bar']
             assert request.function is None
             assert request.cls is None
@@ -202,3 +202,51 @@ def test_missing(pytester):
     assert not passed
     assert failed[0].nodeid == '.::config.yastr.json'
     assert 'FixtureLookupError: fixture \'missing\' not found' in failed[0].longreprtext
+
+
+def test_override(pytester):
+    pytester.mkdir('sub')
+    config = '{"executable": "python", "args": ["-c", "pass"], "fixtures": ["foo"]}'
+    pytester.makefile('.yastr.json', **{'sub/config': config})
+    pytester.makeconftest('''
+        import pytest
+        import sys
+
+        @pytest.fixture
+        def foo():
+            print('root', flush=True, file=sys.stderr)
+    ''')
+    pytester.makepyfile(**{'sub/conftest': '''
+        import pytest
+        import sys
+
+        @pytest.fixture
+        def foo():
+            print('sub', flush=True, file=sys.stderr)
+    '''})
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+
+    assert not failed
+    assert passed[0].capstderr.strip() == 'sub'
+
+
+def test_plan_shared(pytester):
+    from yastr.fixtures import fixture_plans_key
+
+    config = '{"executable": "python", "args": ["-c", "pass"], "fixtures": ["foo"]}'
+    pytester.makefile('.yastr.json', a=config, b=config)
+    pytester.makeconftest('''
+        import pytest
+
+        @pytest.fixture
+        def foo():
+            pass
+    ''')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    run.assertoutcome(passed=2)
+
+    session = run.getcall('pytest_sessionfinish').session
+    assert len(session.stash[fixture_plans_key]) == 1
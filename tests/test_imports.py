@@ -0,0 +1,35 @@
+CONFTEST = '''
+    import sys
+
+    def pytest_terminal_summary(terminalreporter):
+        modules = ('anyconfig', 'marshmallow', 'wrapt')
+        terminalreporter.write_line(f'imported: {[name for name in modules if name in sys.modules]}')
+'''
+
+
+def test_deferred(pytester):
+    pytester.makeconftest(CONFTEST)
+    pytester.makefile('.yastr.json', config='{"executable": "python", "args": ["-c", "pass"]}')
+
+    result = pytester.runpytest_subprocess('-p', 'yastr.plugin')
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(["imported: ['anyconfig']"])
+
+    result = pytester.runpytest_subprocess('-p', 'yastr.plugin')
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(['imported: []'])
+
+
+def test_fixture_request(pytester):
+    pytester.makeconftest(CONFTEST + '''
+    import pytest
+
+    @pytest.fixture
+    def foo(request):
+        yield request.fixturename
+''')
+    pytester.makefile('.yastr.json', config='{"executable": "python", "args": ["-c", "pass"], "fixtures": ["foo"]}')
+
+    result = pytester.runpytest_subprocess('-p', 'yastr.plugin')
+    result.assert_outcomes(passed=1)
+    result.stdout.fnmatch_lines(["imported: [[]*'wrapt'[]]"])
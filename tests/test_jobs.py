@@ -0,0 +1,49 @@
+WAIT_FOR_OTHER = '''
+import pathlib, sys, time
+pathlib.Path(sys.argv[1]).touch()
+deadline = time.monotonic() + 10
+while not pathlib.Path(sys.argv[2]).exists():
+    if time.monotonic() > deadline:
+        sys.exit(1)
+    time.sleep(0.01)
+print(sys.argv[1])
+'''
+
+
+def test_concurrent(pytester):
+    pytester.makefile('.py', testfile=WAIT_FOR_OTHER)
+    pytester.makefile('.yastr.json', a='{"executable": "python", "args": ["testfile.py", "a.flag", "b.flag"]}')
+    pytester.makefile('.yastr.json', b='{"executable": "python", "args": ["testfile.py", "b.flag", "a.flag"]}')
+
+    run = pytester.inline_run('--yastr-jobs=2', plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+
+    assert not skipped
+    assert not failed
+    assert [report.nodeid for report in passed] == ['.::a.yastr.json', '.::b.yastr.json']
+    assert passed[0].capstdout.strip() == 'a.flag'
+    assert passed[1].capstdout.strip() == 'b.flag'
+
+
+def test_fixtures(pytester):
+    pytester.makefile('.py', testfile='import os; print(os.environ["FOO"])')
+    pytester.makefile('.yastr.json', config='{"executable": "python", "args": ["testfile.py"], "fixtures": ["foo"]}')
+    pytester.makefile('.yastr.json', skipped='{"executable": "python", "fixtures": ["foo"], "markers": ["skip"]}')
+    pytester.makeconftest('''
+        import os
+        import pytest
+
+        @pytest.fixture
+        def foo():
+            os.environ['FOO'] = 'bar'
+            yield
+            del os.environ['FOO']
+    ''')
+
+    run = pytester.inline_run('--yastr-jobs=4', plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+
+    assert not failed
+    assert passed[0].nodeid == '.::config.yastr.json'
+    assert passed[0].capstdout.strip() == 'bar'
+    assert skipped[0].nodeid == '.::skipped.yastr.json'
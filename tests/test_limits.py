@@ -0,0 +1,184 @@
+import os
+import sys
+import time
+from pathlib import Path
+
+import pytest
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason='requires process groups and resource limits')
+
+
+def _running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # Killed processes remain zombies until they are reaped
+    stat = Path(f'/proc/{pid}/stat')
+    return not stat.exists() or ') Z ' not in stat.read_text()
+
+
+def test_kill_descendants(pytester):
+    pytester.makefile('.py',
+                      testfile="""
+        import subprocess, sys, time
+        child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(100)'])
+        with open('child.pid', 'w') as f:
+            f.write(str(child.pid))
+        time.sleep(100)
+    """)
+    pytester.makefile('.yastr.json', config='{"executable": "python", "args": ["testfile.py"], "timeout": 1}')
+
+    start = time.monotonic()
+    pytester.inline_run(plugins=['yastr.plugin']).assertoutcome(failed=1)
+
+    assert time.monotonic() - start < 30
+    pid = int((pytester.path / 'child.pid').read_text())
+    for _ in range(100):
+        if not _running(pid):
+            break
+        time.sleep(0.05)
+    assert not _running(pid)
+
+
+def test_grace(pytester):
+    pytester.makefile('.py',
+                      testfile="""
+        import signal, sys, time
+
+        def _terminated(signum, frame):
+            print('terminated', flush=True)
+            sys.exit(1)
+
+        signal.signal(signal.SIGTERM, _terminated)
+        print('started', flush=True)
+        time.sleep(100)
+    """)
+    pytester.makefile('.yastr.json', config='{"executable": "python", "args": ["testfile.py"], "timeout": 1}')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    _, _, failed = run.listoutcomes()
+    assert failed[0].capstdout.split() == ['started', 'terminated']
+
+    pytester.makeini('[pytest]\nyastr_kill_grace = 0')
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    _, _, failed = run.listoutcomes()
+    assert failed[0].capstdout.split() == ['started']
+
+
+def test_invalid_grace(pytester):
+    pytester.makeini('[pytest]\nyastr_kill_grace = soon')
+
+    result = pytester.runpytest('-p', 'yastr.plugin')
+    result.stderr.fnmatch_lines(['*yastr_kill_grace must be a number of seconds*'])
+
+
+def test_limits(pytester):
+    pytester.makefile('.py',
+                      testfile="""
+        import resource
+        for name in ('CPU', 'AS', 'NOFILE', 'FSIZE'):
+            print(resource.getrlimit(getattr(resource, f'RLIMIT_{name}'))[0])
+    """)
+    pytester.makefile('.yastr.json',
+                      config='''{
+                          "executable": "python",
+                          "args": ["testfile.py"],
+                          "limits": {"cpu_time": 60, "address_space": "8G", "open_files": 64, "file_size": "1M"}
+                      }''')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, _, _ = run.listoutcomes()
+    assert passed[0].capstdout.split() == ['60', str(8 * 1024**3), '64', str(1024**2)]
+
+
+def test_limits_forked(pytester):
+    pytester.makefile('.py',
+                      testfile="""
+        import os, resource
+        pid = os.fork()
+        if pid == 0:
+            print(resource.getrlimit(resource.RLIMIT_NOFILE)[0], flush=True)
+            os._exit(0)
+        os.waitpid(pid, 0)
+    """)
+    pytester.makefile('.yastr.json',
+                      config='{"executable": "python", "args": ["testfile.py"], "limits": {"open_files": 64}}')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, _, _ = run.listoutcomes()
+    assert passed[0].capstdout.split() == ['64']
+
+
+def test_file_size(pytester):
+    pytester.makefile('.py',
+                      testfile="""
+        with open('out.bin', 'wb') as f:
+            f.write(bytes(2048))
+    """)
+    pytester.makefile('.yastr.json',
+                      config='{"executable": "python", "args": ["testfile.py"], "limits": {"file_size": "1K"}}')
+
+    pytester.inline_run(plugins=['yastr.plugin']).assertoutcome(failed=1)
+    assert (pytester.path / 'out.bin').stat().st_size <= 1024
+
+
+def test_close_fds(pytester):
+    read_fd, write_fd = os.pipe()
+    os.set_inheritable(write_fd, True)
+    pytester.makefile('.py',
+                      testfile=f"""
+        import os
+        try:
+            os.fstat({write_fd})
+        except OSError:
+            print('closed')
+    """)
+    pytester.makefile('.yastr.json', config='{"executable": "python", "args": ["testfile.py"]}')
+
+    try:
+        run = pytester.inline_run(plugins=['yastr.plugin'])
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+    passed, _, _ = run.listoutcomes()
+    assert passed[0].capstdout.strip() == 'closed'
+
+
+@pytest.mark.parametrize('driver_mode', ['spawn', 'persistent'])
+def test_interrupt_jobs(pytester, driver_mode):
+    pytester.makepyfile(test_a=r'''
+        import pathlib, time
+
+        def test_interrupt():
+            path = pathlib.Path('sleeper.pid')
+            for _ in range(600):
+                if path.exists() and path.read_text().endswith('\n'):
+                    break
+                time.sleep(0.05)
+            raise KeyboardInterrupt
+    ''')
+    pytester.makefile('.py',
+                      sleeper="""
+        import os, time
+        with open('sleeper.pid', 'w') as f:
+            f.write(f'{os.getpid()}\\n')
+        time.sleep(100)
+    """)
+    pytester.makefile('.yastr.json', z='{"executable": "python", "args": ["sleeper.py"]}')
+    pytester.makeini(f'''
+        [pytest]
+        test_driver = "{sys.executable}" -m yastr.driver
+        test_driver_mode = {driver_mode}
+    ''')
+
+    start = time.monotonic()
+    pytester.inline_run('--yastr-jobs', '2', plugins=['yastr.plugin'], no_reraise_ctrlc=True)
+
+    assert time.monotonic() - start < 30
+    pid = int((pytester.path / 'sleeper.pid').read_text())
+    for _ in range(100):
+        if not _running(pid):
+            break
+        time.sleep(0.05)
+    assert not _running(pid)
@@ -0,0 +1,32 @@
+def test_parallel(pytester):
+    for i in range(40):
+        pytester.makefile('.yastr.json', **{f'config{i}': '{"executable": "python", "markers": ["skip"]}'})
+
+    result = pytester.runpytest_subprocess('-p', 'yastr.plugin', '--yastr-load-workers=4')
+
+    result.assert_outcomes(skipped=40)
+
+
+def test_parallel_error(pytester):
+    for i in range(40):
+        pytester.makefile('.yastr.json', **{f'config{i}': '{"executable": "python", "markers": ["skip"]}'})
+    pytester.makefile('.yastr.json', invalid='{"executable": "python",, "markers": ["skip"]}')
+
+    result = pytester.runpytest_subprocess('-p', 'yastr.plugin', '--yastr-load-workers=4')
+
+    result.assert_outcomes(errors=1)
+    result.stdout.fnmatch_lines([
+        'ConfigError: Invalid JSON syntax at line 1 column 25: *invalid.yastr.json',
+        '*"python",, "markers":',
+        '*^',
+    ])
+
+
+def test_parallel_spawn(pytester):
+    pytester.makeconftest('import yastr.loader\nyastr.loader.START_METHOD = "spawn"')
+    for i in range(40):
+        pytester.makefile('.yastr.json', **{f'config{i}': '{"executable": "python", "markers": ["skip"]}'})
+
+    result = pytester.runpytest_subprocess('-p', 'yastr.plugin', '--yastr-load-workers=4')
+
+    result.assert_outcomes(skipped=40)
@@ -0,0 +1,78 @@
+from pathlib import Path
+
+
+def test_spooled(pytester):
+    pytester.makefile('.py', testfile='for i in range(1000): print(f"line {i:04}")')
+    pytester.makefile('.yastr.json', config='{"executable": "python", "args": ["testfile.py"]}')
+    pytester.makeini('[pytest]\nyastr_output_dir = output\nyastr_output_memory = 1K')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+
+    assert not skipped
+    assert not failed
+
+    log_path = Path(dict(passed[0].user_properties)['stdout_log'])
+    assert log_path.parent == pytester.path / 'output'
+    assert log_path.name.startswith('config.yastr.json-')
+    assert 'stderr_log' not in dict(passed[0].user_properties)
+    assert log_path.read_text() == ''.join(f'line {i:04}\n' for i in range(1000))
+
+    stdout = passed[0].capstdout
+    assert stdout.startswith('line 0000\nline 0001\n')
+    assert f'bytes omitted, see {log_path} ...]' in stdout
+    assert stdout.endswith('line 0998\nline 0999\n')
+    assert len(stdout) < 1024 + len(str(log_path)) + 50
+
+
+def test_limit(pytester):
+    pytester.makefile('.py', testfile='print("x" * 10000)')
+    pytester.makefile('.yastr.json', config='{"executable": "python", "args": ["testfile.py"]}')
+    pytester.makeini('[pytest]\nyastr_output_dir = output\nyastr_output_memory = 1K\nyastr_output_limit = 2K')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+
+    assert not failed
+    assert Path(dict(passed[0].user_properties)['stdout_log']).stat().st_size == 2048
+
+
+def test_invalid_limit(pytester):
+    pytester.makeini('[pytest]\nyastr_output_limit = lots')
+
+    result = pytester.runpytest('-p', 'yastr.plugin')
+    result.stderr.fnmatch_lines(['*yastr_output_limit must be a size in bytes like 64K, 8M or 2G*'])
+
+
+def test_unique_logs(pytester):
+    pytester.mkdir('a')
+    pytester.makefile('.yastr.json',
+                      **{
+                          'a/b': '{"executable": "python", "args": ["-c", "print(\'a\' * 2000)"]}',
+                          'a_b': '{"executable": "python", "args": ["-c", "print(\'b\' * 2000)"]}',
+                      })
+    pytester.makeini('[pytest]\nyastr_output_dir = output\nyastr_output_memory = 1K')
+
+    run = pytester.inline_run('--yastr-jobs', '2', plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+
+    logs = {report.nodeid: Path(dict(report.user_properties)['stdout_log']) for report in passed}
+    assert logs['a::b.yastr.json'] != logs['.::a_b.yastr.json']
+    assert logs['a::b.yastr.json'].read_text() == 'a' * 2000 + '\n'
+    assert logs['.::a_b.yastr.json'].read_text() == 'b' * 2000 + '\n'
+
+
+def test_report_failed(pytester):
+    pytester.makefile('.yastr.json', passing='{"executable": "python", "args": ["-c", "print(\'foo\')"]}')
+    pytester.makefile('.yastr.json',
+                      failing='{"executable": "python", "args": ["-c", "print(\'bar\'); raise SystemExit(1)"]}')
+    pytester.makeini('[pytest]\nyastr_report_output = failed')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+
+    assert passed[0].nodeid == '.::passing.yastr.json'
+    assert passed[0].capstdout == ''
+    assert failed[0].nodeid == '.::failing.yastr.json'
+    assert failed[0].capstdout.strip() == 'bar'
+    assert 'Executable returned code 1' in failed[0].longreprtext
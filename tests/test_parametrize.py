@@ -0,0 +1,93 @@
+import json
+
+SCRIPT = 'import os, sys; print(*sys.argv[1:], os.environ["SIZE"])'
+
+
+def test_product(pytester):
+    pytester.makefile('.py', testfile=SCRIPT)
+    pytester.makefile('.yastr.json',
+                      config='''{
+                          "executable": "python",
+                          "args": ["testfile.py", "--threads={threads}", "{unknown}"],
+                          "environment": {"SIZE": "{size}"},
+                          "parametrize": {"values": {"threads": [1, 8], "size": ["small", "large"]}}
+                      }''')
+
+    run = pytester.inline_run('--yastr-trace=trace.json', plugins=['yastr.plugin'])
+    passed, _, _ = run.listoutcomes()
+
+    assert [(report.nodeid, report.capstdout.strip()) for report in passed] == [
+        ('.::config.yastr.json[threads=1-size=small]', '--threads=1 {unknown} small'),
+        ('.::config.yastr.json[threads=1-size=large]', '--threads=1 {unknown} large'),
+        ('.::config.yastr.json[threads=8-size=small]', '--threads=8 {unknown} small'),
+        ('.::config.yastr.json[threads=8-size=large]', '--threads=8 {unknown} large'),
+    ]
+
+    events = json.loads((pytester.path / 'trace.json').read_text())['traceEvents']
+    assert len([event for event in events if event['name'] == 'parse']) == 1
+
+
+def test_zip(pytester):
+    pytester.makefile('.py', testfile=SCRIPT)
+    pytester.makefile('.yastr.json',
+                      config='''{
+                          "executable": "python",
+                          "args": ["testfile.py", "{threads}"],
+                          "parametrize": {"mode": "zip", "values": {"threads": [1, 8], "size": ["small", "large"]}},
+                          "environment": {"SIZE": "{size}"}
+                      }''')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, _, _ = run.listoutcomes()
+
+    assert [report.capstdout.strip() for report in passed] == ['1 small', '8 large']
+
+
+def test_zip_invalid(pytester):
+    pytester.makefile('.yastr.json',
+                      config='{"executable": "python", '
+                      '"parametrize": {"mode": "zip", "values": {"a": [1], "b": [1, 2]}}}')
+
+    report = pytester.inline_run(plugins=['yastr.plugin']).getfailures()[0]
+    assert 'Zipped parameters need the same number of values.' in report.longreprtext
+
+
+def test_selection(pytester):
+    pytester.makeini('[pytest]\nmarkers = slow')
+    pytester.makefile('.yastr.json',
+                      config='''{
+                          "executable": "python",
+                          "args": ["-c", "pass"],
+                          "parametrize": {"values": {"threads": [1, {"value": 64, "markers": ["slow"]}]}}
+                      }''')
+
+    run = pytester.inline_run('-m', 'not slow', plugins=['yastr.plugin'])
+    assert [report.nodeid for report in run.listoutcomes()[0]] == ['.::config.yastr.json[threads=1]']
+
+    run = pytester.inline_run('-k', '64', plugins=['yastr.plugin'])
+    assert [report.nodeid for report in run.listoutcomes()[0]] == ['.::config.yastr.json[threads=64]']
+
+
+def test_suite(pytester):
+    pytester.makefile('.yastr.json',
+                      suite='''{
+                          "executable": "python",
+                          "parametrize": {"values": {"code": [0, 1]}},
+                          "tests": {
+                              "first": {"args": ["-c", "exit({code})"]},
+                              "second": {"args": ["-c", "pass"], "parametrize": null}
+                          }
+                      }''')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, _, failed = run.listoutcomes()
+
+    assert [report.nodeid for report in passed] == ['.::suite.yastr.json::first[code=0]', '.::suite.yastr.json::second']
+    assert [report.nodeid for report in failed] == ['.::suite.yastr.json::first[code=1]']
+
+
+def test_invalid(pytester):
+    pytester.makefile('.yastr.json', config='{"executable": "python", "parametrize": {"values": {"a b": [1]}}}')
+
+    report = pytester.inline_run(plugins=['yastr.plugin']).getfailures()[0]
+    assert "Invalid parameter name 'a b'" in report.longreprtext
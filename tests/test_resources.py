@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+
+def _config(name, resources):
+    script = (f'import time; open("events.log", "a").write("start {name}\\n"); time.sleep(0.3); '
+              f'open("events.log", "a").write("end {name}\\n")')
+    return json.dumps({'executable': 'python', 'args': ['-c', script], 'resources': resources})
+
+
+def _overlapping(pytester):
+    events = (pytester.path / 'events.log').read_text().splitlines()
+    return events[1].startswith('start')
+
+
+def test_exclusive_lock(pytester):
+    resources = {'locks': {'serial': 'exclusive'}}
+    pytester.makefile('.yastr.json', a=_config('a', resources), b=_config('b', resources))
+
+    pytester.inline_run('--yastr-jobs=2', plugins=['yastr.plugin']).assertoutcome(passed=2)
+    assert not _overlapping(pytester)
+
+
+def test_shared_lock(pytester):
+    resources = {'locks': {'serial': 'shared'}}
+    pytester.makefile('.yastr.json', a=_config('a', resources), b=_config('b', resources))
+
+    pytester.inline_run('--yastr-jobs=2', plugins=['yastr.plugin']).assertoutcome(passed=2)
+    assert _overlapping(pytester)
+
+
+def test_shared_exclusive_lock(pytester):
+    pytester.makefile('.yastr.json',
+                      a=_config('a', {'locks': {'serial': 'shared'}}),
+                      b=_config('b', {'locks': {'serial': 'exclusive'}}))
+
+    pytester.inline_run('--yastr-jobs=2', plugins=['yastr.plugin']).assertoutcome(passed=2)
+    assert not _overlapping(pytester)
+
+
+def test_cpus(pytester):
+    pytester.makeini('''
+        [pytest]
+        yastr_cpus = 3
+    ''')
+    pytester.makefile('.yastr.json', a=_config('a', {'cpus': 2}), b=_config('b', {'cpus': 2}))
+
+    pytester.inline_run('--yastr-jobs=2', plugins=['yastr.plugin']).assertoutcome(passed=2)
+    assert not _overlapping(pytester)
+
+
+def test_cpus_exceeding_capacity(pytester):
+    pytester.makeini('''
+        [pytest]
+        yastr_cpus = 2
+    ''')
+    pytester.makefile('.yastr.json', a=_config('a', {'cpus': 8}), b=_config('b', {}))
+
+    pytester.inline_run('--yastr-jobs=2', plugins=['yastr.plugin']).assertoutcome(passed=2)
+    assert not _overlapping(pytester)
+
+
+def test_memory(pytester):
+    pytester.makeini('''
+        [pytest]
+        yastr_memory = 1G
+    ''')
+    pytester.makefile('.yastr.json',
+                      a=_config('a', {'memory': '768M'}),
+                      b=_config('b', {'memory': '512M'}),
+                      c=_config('c', {'memory': '256M'}))
+
+    pytester.inline_run('--yastr-jobs=3', plugins=['yastr.plugin']).assertoutcome(passed=3)
+
+    events = (pytester.path / 'events.log').read_text().splitlines()
+    assert sorted(events[:2]) == ['start a', 'start c']
+
+
+@pytest.mark.parametrize('option, value, message', [
+    ('yastr_cpus', '0', 'yastr_cpus must be a positive integer'),
+    ('yastr_cpus', 'all', 'yastr_cpus must be a positive integer'),
+    ('yastr_memory', '1X', 'yastr_memory must be a size in bytes like 64K, 8M or 2G'),
+])
+def test_invalid_capacity(pytester, option, value, message):
+    pytester.makeini(f'[pytest]\n{option} = {value}')
+
+    result = pytester.runpytest('-p', 'yastr.plugin')
+    result.stderr.fnmatch_lines([f'*{message}*'])
+
+
+def test_invalid(pytester):
+    pytester.makefile('.yastr.json', config=_config('a', {'cpus': 0, 'locks': {'serial': 'private'}}))
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    report = run.getfailures()[0]
+
+    assert 'Invalid mode of lock serial' in report.longreprtext
+    assert 'cpus' in report.longreprtext
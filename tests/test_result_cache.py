@@ -0,0 +1,107 @@
+import shutil
+from pathlib import Path
+
+CONFIG = '''{
+    "executable": "python",
+    "args": ["-c", "open('runs.log', 'a').write('run\\\\n')"],
+    "inputs": ["data/*.txt"]
+}'''
+
+
+def _runs(pytester):
+    path = pytester.path / 'runs.log'
+    return len(path.read_text().splitlines()) if path.exists() else 0
+
+
+def test_cached(pytester):
+    pytester.makefile('.yastr.json', config=CONFIG)
+
+    result = pytester.runpytest('-p', 'yastr.plugin', '--yastr-result-cache')
+    result.assert_outcomes(passed=1)
+    assert _runs(pytester) == 1
+
+    run = pytester.inline_run('--yastr-result-cache', plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+    assert len(passed) == 1
+    assert 'cached_duration' in dict(passed[0].user_properties)
+    assert _runs(pytester) == 1
+
+    result = pytester.runpytest('-p', 'yastr.plugin', '--yastr-result-cache')
+    result.stdout.fnmatch_lines(['*1 cached*'])
+    assert _runs(pytester) == 1
+
+
+def test_disabled(pytester):
+    pytester.makefile('.yastr.json', config=CONFIG)
+
+    pytester.inline_run('--yastr-result-cache', plugins=['yastr.plugin']).assertoutcome(passed=1)
+    pytester.inline_run(plugins=['yastr.plugin']).assertoutcome(passed=1)
+    assert _runs(pytester) == 2
+
+
+def test_failed(pytester):
+    pytester.makefile('.yastr.json',
+                      config='{"executable": "python", "args": ["-c", "open(\'runs.log\', \'a\').write(\'run\\\\n\'); '
+                      'exit(1)"]}')
+
+    pytester.inline_run('--yastr-result-cache', plugins=['yastr.plugin']).assertoutcome(failed=1)
+    pytester.inline_run('--yastr-result-cache', plugins=['yastr.plugin']).assertoutcome(failed=1)
+    assert _runs(pytester) == 2
+
+
+def test_invalidate_inputs(pytester):
+    pytester.makefile('.yastr.json', config=CONFIG)
+    pytester.mkdir('data')
+    pytester.makefile('.txt', **{'data/input': 'foo'})
+
+    pytester.inline_run('--yastr-result-cache', plugins=['yastr.plugin']).assertoutcome(passed=1)
+    pytester.makefile('.txt', **{'data/other': 'bar'})
+    pytester.inline_run('--yastr-result-cache', plugins=['yastr.plugin']).assertoutcome(passed=1)
+    pytester.makefile('.txt', **{'data/input': 'foobar'})
+    pytester.inline_run('--yastr-result-cache', plugins=['yastr.plugin']).assertoutcome(passed=1)
+    pytester.inline_run('--yastr-result-cache', plugins=['yastr.plugin']).assertoutcome(passed=1)
+    assert _runs(pytester) == 3
+
+
+def test_invalidate_config(pytester):
+    pytester.makefile('.yastr.json', config=CONFIG)
+
+    pytester.inline_run('--yastr-result-cache', plugins=['yastr.plugin']).assertoutcome(passed=1)
+    pytester.makefile('.yastr.json', config=CONFIG.replace('"inputs"', '"environment": {"FOO": "bar"}, "inputs"'))
+    pytester.inline_run('--yastr-result-cache', plugins=['yastr.plugin']).assertoutcome(passed=1)
+    assert _runs(pytester) == 2
+
+
+def test_clear(pytester):
+    pytester.makefile('.yastr.json', config=CONFIG)
+
+    pytester.inline_run('--yastr-result-cache', plugins=['yastr.plugin']).assertoutcome(passed=1)
+    pytester.inline_run('--yastr-cache-clear', plugins=['yastr.plugin']).assertoutcome(passed=1)
+    pytester.inline_run('--yastr-result-cache', plugins=['yastr.plugin']).assertoutcome(passed=1)
+    assert _runs(pytester) == 3
+
+
+def test_logs(pytester):
+    pytester.makefile('.yastr.json',
+                      first='{"executable": "python", "args": ["-c", "print(\'a\' * 2000)"]}',
+                      second='{"executable": "python", "args": ["-c", "print(\'b\' * 2000)"]}')
+    pytester.makeini('[pytest]\nyastr_output_dir = output\nyastr_output_memory = 1K\nyastr_result_cache_size = 1')
+
+    pytester.inline_run('--yastr-result-cache', '-k', 'first', plugins=['yastr.plugin']).assertoutcome(passed=1)
+    shutil.rmtree(pytester.path / 'output')
+
+    run = pytester.inline_run('--yastr-result-cache', '-k', 'first', plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+    log_path = Path(dict(passed[0].user_properties)['stdout_log'])
+    assert 'cached_duration' in dict(passed[0].user_properties)
+    assert log_path.read_text() == 'a' * 2000 + '\n'
+
+    pytester.inline_run('--yastr-result-cache', '-k', 'second', plugins=['yastr.plugin']).assertoutcome(passed=1)
+    assert not log_path.exists()
+
+
+def test_invalid_size(pytester):
+    pytester.makeini('[pytest]\nyastr_result_cache_size = -1')
+
+    result = pytester.runpytest('-p', 'yastr.plugin')
+    result.stderr.fnmatch_lines(['*yastr_result_cache_size must be a non-negative integer*'])
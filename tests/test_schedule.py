@@ -0,0 +1,80 @@
+import sqlite3
+
+
+def _config(name, duration):
+    return ('{"executable": "python", "args": ["-c", "import time; open(\'start.log\', \'a\').write(\'%s\\\\n\'); '
+            'time.sleep(%s)"]}' % (name, duration))
+
+
+def test_history(pytester):
+    from yastr.cache import DurationHistory
+
+    pytester.makefile('.yastr.json', a=_config('a', 0), b=_config('b', 0.2))
+
+    pytester.inline_run(plugins=['yastr.plugin']).assertoutcome(passed=2)
+
+    history = DurationHistory(pytester.path / '.pytest_cache' / 'd' / 'yastr' / 'history.sqlite', 100)
+    assert history.get('.::a.yastr.json') < history.get('.::b.yastr.json')
+    assert history.get('.::b.yastr.json') >= 0.2
+    assert history.get('.::c.yastr.json') is None
+    history.close()
+
+
+def test_estimate(tmp_path):
+    from yastr.cache import DurationHistory
+
+    history = DurationHistory(tmp_path / 'history.sqlite', 100)
+    history.record('a', 1.0)
+    history.record('b', 2.0)
+    history.record('b', 4.0)
+    history.record('c', 5.0)
+
+    assert history.estimate(['a', 'b', 'c', 'd']) == {'a': 1.0, 'b': 3.0, 'c': 5.0, 'd': 3.0}
+    history.close()
+
+    history = DurationHistory(tmp_path / 'history.sqlite', 2)
+    assert history.get('b') == 3.0
+    history.close()
+
+
+def test_schema_versions(tmp_path, monkeypatch):
+    from yastr.cache import SCHEMA_VERSIONS, DurationHistory
+
+    history = DurationHistory(tmp_path / 'history.sqlite', 100)
+    history.record('a', 1.0)
+    history.close()
+
+    db = sqlite3.connect(tmp_path / 'history.sqlite')
+    with db:
+        db.execute('DROP TABLE versions')
+    db.close()
+
+    monkeypatch.setitem(SCHEMA_VERSIONS, 'configs', SCHEMA_VERSIONS['configs'] + 1)
+    history = DurationHistory(tmp_path / 'history.sqlite', 100)
+    assert history.get('a') == 1.0
+    history.close()
+
+    monkeypatch.setitem(SCHEMA_VERSIONS, 'durations', SCHEMA_VERSIONS['durations'] + 1)
+    history = DurationHistory(tmp_path / 'history.sqlite', 100)
+    assert history.get('a') is None
+    history.close()
+
+
+def test_longest_first(pytester):
+    pytester.makefile('.yastr.json', a=_config('a', 0), b=_config('b', 0), c=_config('c', 0.5), d=_config('d', 0.5))
+
+    pytester.inline_run(plugins=['yastr.plugin']).assertoutcome(passed=4)
+    (pytester.path / 'start.log').unlink()
+
+    run = pytester.inline_run('--yastr-jobs=2', '--yastr-schedule=longest', plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+
+    assert [report.nodeid for report in passed] == [f'.::{name}.yastr.json' for name in 'abcd']
+    assert sorted((pytester.path / 'start.log').read_text().splitlines()[:2]) == ['c', 'd']
+
+
+def test_invalid_history_size(pytester):
+    pytester.makeini('[pytest]\nyastr_history_size = 1.5')
+
+    result = pytester.runpytest('-p', 'yastr.plugin')
+    result.stderr.fnmatch_lines(['*yastr_history_size must be a non-negative integer*'])
@@ -0,0 +1,105 @@
+CONFTEST = '''
+    import pytest
+
+    def log(text):
+        with open('events.log', 'a') as f:
+            print(text, file=f)
+
+    @pytest.fixture(scope='session')
+    def session_fixture():
+        log('setup session')
+        yield
+        log('teardown session')
+
+    @pytest.fixture(scope='module')
+    def module_fixture(request, session_fixture):
+        log(f'setup module {request.node.name}')
+        yield
+        log(f'teardown module {request.node.name}')
+
+    @pytest.fixture
+    def function_fixture():
+        pass
+
+    @pytest.fixture(scope='module')
+    def mismatch_fixture(function_fixture):
+        pass
+'''
+
+
+def test_session(pytester):
+    pytester.makeconftest(CONFTEST)
+    pytester.mkdir('a')
+    pytester.mkdir('b')
+    config = '{"executable": "python", "args": ["-c", "pass"], "fixtures": ["session_fixture"]}'
+    pytester.makefile('.yastr.json', **{'a/config': config, 'b/config': config})
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    run.assertoutcome(passed=2)
+
+    events = (pytester.path / 'events.log').read_text().splitlines()
+    assert events == ['setup session', 'teardown session']
+
+
+def test_module(pytester):
+    pytester.makeconftest(CONFTEST)
+    suite = '''{
+        "executable": "python",
+        "args": ["-c", "open('events.log', 'a').write('run\\\\n')"],
+        "fixtures": ["module_fixture"],
+        "tests": {"first": {}, "second": {}}
+    }'''
+    pytester.makefile('.yastr.json', a=suite, b=suite)
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    run.assertoutcome(passed=4)
+
+    events = (pytester.path / 'events.log').read_text().splitlines()
+    assert events == [
+        'setup session',
+        'setup module a.yastr.json',
+        'run',
+        'run',
+        'teardown module a.yastr.json',
+        'setup module b.yastr.json',
+        'run',
+        'run',
+        'teardown module b.yastr.json',
+        'teardown session',
+    ]
+
+
+def test_module_jobs(pytester):
+    pytester.makeconftest(CONFTEST)
+    suite = '''{
+        "executable": "python",
+        "args": ["-c", "pass"],
+        "fixtures": ["module_fixture"],
+        "tests": {"first": {}, "second": {}, "third": {}}
+    }'''
+    pytester.makefile('.yastr.json', a=suite, b=suite)
+
+    run = pytester.inline_run('--yastr-jobs=4', plugins=['yastr.plugin'])
+    run.assertoutcome(passed=6)
+
+    events = (pytester.path / 'events.log').read_text().splitlines()
+    assert sorted(events) == sorted([
+        'setup session',
+        'setup module a.yastr.json',
+        'setup module b.yastr.json',
+        'teardown module a.yastr.json',
+        'teardown module b.yastr.json',
+        'teardown session',
+    ])
+    assert events[-1] == 'teardown session'
+
+
+def test_mismatch(pytester):
+    pytester.makeconftest(CONFTEST)
+    pytester.makefile('.yastr.json', config='{"executable": "python", "fixtures": ["mismatch_fixture"]}')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+
+    assert not passed
+    assert 'ScopeMismatch' in failed[0].longreprtext
@@ -0,0 +1,89 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+
+def _configs(pytester, count):
+    pytester.makefile('.yastr.json', **{f'config{i}': '{"executable": "python", "args": ["-c", "pass"]}'
+                                        for i in range(count)})
+
+
+def _passed(run):
+    passed, _, _ = run.listoutcomes()
+    return {report.nodeid for report in passed}
+
+
+def test_hash(pytester):
+    _configs(pytester, 12)
+
+    shards = [_passed(pytester.inline_run(f'--yastr-shard={i}/3', plugins=['yastr.plugin'])) for i in (1, 2, 3)]
+
+    assert sum(len(shard) for shard in shards) == 12
+    assert set.union(*shards) == {f'.::config{i}.yastr.json' for i in range(12)}
+    assert shards == [_passed(pytester.inline_run(f'--yastr-shard={i}/3', plugins=['yastr.plugin'])) for i in (1, 2, 3)]
+
+
+def test_history(pytester):
+    _configs(pytester, 4)
+    pytester.makefile('.yastr.json', slow='{"executable": "python", "args": ["-c", "import time; time.sleep(1)"]}')
+
+    pytester.inline_run('--yastr-history=history.sqlite', plugins=['yastr.plugin']).assertoutcome(passed=5)
+
+    args = ['--yastr-history=history.sqlite']
+    first = _passed(pytester.inline_run(*args, '--yastr-shard=1/2', plugins=['yastr.plugin']))
+    second = _passed(pytester.inline_run(*args, '--yastr-shard=2/2', plugins=['yastr.plugin']))
+
+    assert first == {'.::slow.yastr.json'}
+    assert len(second) == 4
+
+
+def test_invalid(pytester):
+    _configs(pytester, 1)
+
+    result = pytester.runpytest('-p', 'yastr.plugin', '--yastr-shard=3/2')
+    result.stderr.fnmatch_lines(['*Invalid shard 3/2*'])
+
+
+def test_partition():
+    from yastr.shard import partition
+
+    assert partition(['a', 'b', 'c', 'd'], 2, {'a': 3.0, 'b': 2.0, 'c': 1.0, 'd': 0.0}) == [0, 1, 1, 0]
+    assert partition(['a', 'b', 'c', 'd'], 2, {'a': 0.0, 'b': 0.0, 'c': 0.0, 'd': 0.0}) == [0, 1, 0, 1]
+
+
+def test_merge(pytester):
+    from yastr.merge import main
+
+    pytester.makefile('.yastr.json',
+                      passing='{"executable": "python", "args": ["-c", "pass"]}',
+                      failing='{"executable": "python", "args": ["-c", "raise SystemExit(1)"]}')
+
+    for i in (1, 2):
+        pytester.inline_run(f'--yastr-shard={i}/2', f'--junitxml=junit{i}.xml', f'--yastr-history=history{i}.sqlite',
+                            plugins=['yastr.plugin'])
+
+    assert main(['junit', 'junit.xml', 'junit1.xml', 'junit2.xml']) == 0
+    suite = ET.parse(pytester.path / 'junit.xml').getroot().find('testsuite')
+    assert (suite.get('tests'), suite.get('failures')) == ('2', '1')
+    assert sorted(case.get('name') for case in suite.iter('testcase')) == ['failing.yastr.json', 'passing.yastr.json']
+
+    assert main(['history', 'history.sqlite', 'history1.sqlite', 'history2.sqlite']) == 0
+    from yastr.cache import DurationHistory
+    history = DurationHistory(pytester.path / 'history.sqlite', 10)
+    assert set(history.durations) == {'.::passing.yastr.json', '.::failing.yastr.json'}
+    history.close()
+
+
+def test_merge_other_version(tmp_path, monkeypatch):
+    from yastr.cache import SCHEMA_VERSIONS, DurationHistory
+
+    history = DurationHistory(tmp_path / 'other.sqlite', 10)
+    history.record('a', 1.0)
+    history.close()
+
+    monkeypatch.setitem(SCHEMA_VERSIONS, 'durations', SCHEMA_VERSIONS['durations'] + 1)
+    history = DurationHistory(tmp_path / 'history.sqlite', 10)
+    with pytest.warns(RuntimeWarning, match='created by another yastr version'):
+        history.merge(tmp_path / 'other.sqlite')
+    assert history.get('a') is None
+    history.close()
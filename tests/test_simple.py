@@ -41,6 +41,25 @@ def test_env(pytester):
     assert passed[0].capstderr.strip() == ''
 
 
+def test_env_changed(pytester, monkeypatch):
+    monkeypatch.setenv('BAZ', 'foo')
+    pytester.makeconftest('''
+        import os
+
+        def pytest_collection_finish(session):
+            os.environ['BAZ'] = 'baz'
+    ''')
+    pytester.makefile('.py', testfile='import os; print(os.environ.get("FOO"), os.environ["BAZ"])')
+    pytester.makefile('.yastr.json',
+                      a='{"executable": "python", "args": ["testfile.py"], "environment": {"FOO": "bar"}}',
+                      b='{"executable": "python", "args": ["testfile.py"]}')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+
+    assert [report.capstdout.strip() for report in passed] == ['bar baz', 'None baz']
+
+
 def test_skip(pytester):
     pytester.makefile('.py', testfile='print("works!")')
     pytester.makefile('.yastr.json', config='{"executable": "testfile.bat", "skip": "true"}')
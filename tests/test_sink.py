@@ -0,0 +1,66 @@
+import json
+import xml.etree.ElementTree as ET
+
+CONFTEST = '''
+    def pytest_runtest_logstart(nodeid, location):
+        with open('results.jsonl') as results:
+            print(f'{nodeid}: {len(results.readlines())} result(s) written')
+'''
+
+
+def _configs(pytester):
+    pytester.makefile('.yastr.json',
+                      a='{"executable": "python", "args": ["-c", "print(\'foo <&>\')"]}',
+                      b='{"executable": "python", "args": ["-c", "import sys; print(\'bar\'); sys.exit(2)"]}',
+                      c='{"executable": "python", "skip": true}')
+
+
+def test_jsonl(pytester):
+    pytester.makeconftest(CONFTEST)
+    _configs(pytester)
+
+    result = pytester.runpytest('-p', 'yastr.plugin', '-s', '--yastr-results-jsonl=results.jsonl',
+                                '-o', 'yastr_report_output=all')
+    result.assert_outcomes(passed=1, failed=1, skipped=1)
+    result.stdout.fnmatch_lines(['*.::c.yastr.json: 2 result(s) written'])
+
+    results = [json.loads(line) for line in (pytester.path / 'results.jsonl').read_text().splitlines()]
+    assert [(entry['nodeid'], entry['outcome']) for entry in results] == [
+        ('.::a.yastr.json', 'passed'),
+        ('.::b.yastr.json', 'failed'),
+        ('.::c.yastr.json', 'skipped'),
+    ]
+    assert results[0]['stdout'] == 'foo <&>\n'
+    assert 'wall_time' in results[0]['properties']
+    assert results[1]['message'] == 'Executable returned code 2'
+    assert results[2]['message'] == 'Skipped: Skipped by user config'
+
+
+def test_junit(pytester):
+    from yastr.merge import merge_junit
+
+    _configs(pytester)
+
+    pytester.inline_run('--yastr-results-junit=out/junit.xml', plugins=['yastr.plugin'])
+
+    suite = ET.parse(pytester.path / 'out' / 'junit.xml').getroot().find('testsuite')
+    assert (suite.get('tests'), suite.get('failures'), suite.get('skipped')) == ('3', '1', '1')
+    testcases = suite.findall('testcase')
+    assert [testcase.get('name') for testcase in testcases] == ['a.yastr.json', 'b.yastr.json', 'c.yastr.json']
+    assert testcases[1].find('failure').get('message') == 'Executable returned code 2'
+    assert testcases[1].find('system-out').text == 'bar\n'
+
+    merge_junit(pytester.path / 'merged.xml', [pytester.path / 'out' / 'junit.xml'] * 2)
+    assert ET.parse(pytester.path / 'merged.xml').getroot().find('testsuite').get('tests') == '6'
+
+
+def test_release_output(pytester):
+    _configs(pytester)
+
+    run = pytester.inline_run('--yastr-results-jsonl=results.jsonl', '--yastr-release-output', '-o',
+                              'yastr_report_output=all', plugins=['yastr.plugin'])
+    sections = {(report.nodeid, report.when): report.sections for report in run.getreports('pytest_runtest_logreport')}
+    assert sections['.::a.yastr.json', 'call'] == []
+    assert sections['.::b.yastr.json', 'call'] == [('Captured stdout call', 'bar\n')]
+
+    assert 'foo' in (pytester.path / 'results.jsonl').read_text()
@@ -0,0 +1,94 @@
+def test_manifest(pytester):
+    pytester.makefile('.py', testfile='import os, sys; print(sys.argv[1], os.environ["FOO"], os.environ["BAR"])')
+    pytester.makefile('.yastr.json',
+                      suite='''{
+                          "executable": "python",
+                          "environment": {"FOO": "foo", "BAR": "bar"},
+                          "tests": {
+                              "first": {"args": ["testfile.py", "1"]},
+                              "second": {"args": ["testfile.py", "2"], "environment": {"BAR": "baz"}},
+                              "third": {"args": ["testfile.py", "3"], "markers": ["skip"]}
+                          }
+                      }''')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+
+    assert not failed
+    assert [report.nodeid for report in passed] == ['.::suite.yastr.json::first', '.::suite.yastr.json::second']
+    assert passed[0].capstdout.strip() == '1 foo bar'
+    assert passed[1].capstdout.strip() == '2 foo baz'
+    assert skipped[0].nodeid == '.::suite.yastr.json::third'
+
+
+def test_manifest_invalid(pytester):
+    pytester.makefile('.yastr.json',
+                      suite='{"tests": {"first": {"executable": "python"}, "second": {"args": ["foo"]}}}')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    report = run.getfailures()[0]
+
+    assert report.failed
+    assert 'ConfigError: Invalid configuration values' in report.longreprtext
+    assert '{\'tests\': {\'second\': {\'executable\': [\'Missing data for required field.\']}}}' in report.longreprtext
+
+
+def test_manifest_invalid_type(pytester):
+    pytester.makefile('.yastr.json', suite='{"executable": "python", "tests": {"first": {}, "second": "foo"}}')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    report = run.getfailures()[0]
+
+    assert 'ConfigError: Invalid configuration values' in report.longreprtext
+    assert 'suite.yastr.json' in report.longreprtext
+    assert '{\'tests\': {\'second\': [\'Invalid test config type\']}}' in report.longreprtext
+
+
+def test_manifest_names(pytester):
+    pytester.makefile('.yastr.yaml',
+                      suite="""
+        executable: python
+        tests:
+            1:
+                args: ["-c", "print('number')"]
+            "[odd]":
+                args: ["-c", "print('bracket')"]
+    """)
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+
+    assert not failed
+    assert [report.nodeid for report in passed] == ['.::suite.yastr.yaml::1', '.::suite.yastr.yaml::[odd]']
+    assert [report.capstdout.strip() for report in passed] == ['number', 'bracket']
+
+
+def test_defaults(pytester):
+    pytester.makefile('.py', testfile='import os; print(os.environ["FOO"], os.environ["BAR"])')
+    pytester.makefile('.defaults.json', yastr='{"executable": "python", "environment": {"FOO": "foo"}}')
+    pytester.mkdir('sub')
+    pytester.makefile('.defaults.json', **{'sub/yastr': '{"environment": {"BAR": "bar"}, "markers": ["foo"]}'})
+    pytester.makefile('.yastr.json', **{'sub/config': '{"args": ["testfile.py"], "markers": ["bar"]}'})
+    pytester.makeini('[pytest]\nmarkers =\n    foo\n    bar')
+
+    run = pytester.inline_run('-m', 'foo and bar', plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+
+    assert not skipped
+    assert not failed
+    assert passed[0].nodeid == 'sub::config.yastr.json'
+    assert passed[0].capstdout.strip() == 'foo bar'
+
+
+def test_defaults_changed(pytester):
+    pytester.makefile('.defaults.json', yastr='{"executable": "python", "args": ["-c", "print(1)"]}')
+    pytester.makefile('.yastr.json', config='{}')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+    assert passed[0].capstdout.strip() == '1'
+
+    pytester.makefile('.defaults.json', yastr='{"executable": "python", "args": ["-c", "print(2)"]}')
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+    assert passed[0].capstdout.strip() == '2'
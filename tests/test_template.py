@@ -0,0 +1,35 @@
+import sys
+
+
+def test_context(pytester):
+    pytester.makeconftest('''
+        def pytest_yastr_template_context(config):
+            return {'interpreter': 'python'}
+    ''')
+    pytester.makefile('.yastr.json', config='{"executable": "{{ interpreter }}", "args": ["-c", "pass"]}')
+
+    pytester.inline_run(plugins=['yastr.plugin']).assertoutcome(passed=1)
+
+
+def test_include(pytester):
+    (pytester.path / 'tests').mkdir()
+    (pytester.path / 'tests' / 'args.inc').write_text('"args": ["-c", "pass"]')
+    (pytester.path / 'tests' / 'config.yastr.json').write_text('{"executable": "python", {% include "args.inc" %}}')
+
+    pytester.inline_run(plugins=['yastr.plugin']).assertoutcome(passed=1)
+
+
+def test_bytecode_cache(pytester):
+    pytester.makefile('.yastr.json', config='{"executable": "python", "args": ["-c", "{{ \'pass\' }}"]}')
+
+    pytester.inline_run('--yastr-no-config-cache', plugins=['yastr.plugin']).assertoutcome(passed=1)
+    assert list((pytester.path / '.pytest_cache' / 'd' / 'yastr' / 'templates').iterdir())
+
+
+def test_not_templated(tmp_path, monkeypatch):
+    from yastr.template import render
+
+    # Rendering configs without template syntax must not need Jinja
+    monkeypatch.setitem(sys.modules, 'jinja2', None)
+    text = '{"executable": "python"}'
+    assert render(tmp_path / 'config.yastr.json', text) is text
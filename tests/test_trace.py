@@ -0,0 +1,72 @@
+import json
+
+CONFTEST = '''
+    import pytest
+
+    @pytest.fixture
+    def foo():
+        yield
+'''
+
+
+def _events(path):
+    return [event for event in json.loads(path.read_text())['traceEvents'] if event['ph'] == 'X']
+
+
+def test_trace(pytester):
+    pytester.makeconftest(CONFTEST)
+    pytester.makefile('.yastr.json',
+                      a='{"executable": "python", "args": ["-c", "pass"], "fixtures": ["foo"], "markers": ["bar"]}',
+                      b='{"executable": "python", "args": ["-c", "pass"]}')
+
+    run = pytester.inline_run('--yastr-trace=trace.json', '--yastr-jobs=2', plugins=['yastr.plugin'])
+    run.assertoutcome(passed=2)
+
+    events = _events(pytester.path / 'trace.json')
+    assert {
+        'collection',
+        'discover config',
+        'load configs',
+        'render',
+        'parse',
+        'validate',
+        'resolve markers',
+        'execute',
+        'setup fixture',
+        'teardown fixture',
+        'teardown fixtures',
+        'spawn',
+        'wait',
+        'decode output',
+    } <= {event['name'] for event in events}
+
+    spawns = [event for event in events if event['name'] == 'spawn']
+    assert sorted(event['args']['nodeid'] for event in spawns) == ['.::a.yastr.json', '.::b.yastr.json']
+    assert all(event['args']['worker'].startswith('yastr') for event in spawns)
+
+    fixtures = [event for event in events if event['name'] in ('setup fixture', 'teardown fixture')]
+    assert [event['args']['fixture'] for event in fixtures] == ['foo', 'foo']
+
+
+def test_trace_parallel_loading(pytester):
+    pytester.makefile('.yastr.json', **{f'config{i}': '{"executable": "python"}' for i in range(40)})
+
+    result = pytester.runpytest_subprocess('-p', 'yastr.plugin', '--collect-only', '--yastr-load-workers=2',
+                                           '--yastr-trace=trace.json')
+    result.assert_outcomes()
+
+    events = _events(pytester.path / 'trace.json')
+    collection = next(event for event in events if event['name'] == 'collection')
+    parsed = [event for event in events if event['name'] == 'parse']
+    assert len(parsed) == 40
+    assert {event['pid'] for event in parsed} - {collection['pid']}
+
+
+def test_disabled(pytester):
+    from yastr import trace
+
+    pytester.makefile('.yastr.json', config='{"executable": "python", "args": ["-c", "pass"]}')
+    pytester.inline_run(plugins=['yastr.plugin']).assertoutcome(passed=1)
+
+    assert not trace.active()
+    assert trace.span('foo') is trace.span('bar', path='baz')
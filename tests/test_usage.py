@@ -0,0 +1,44 @@
+import os
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not hasattr(os, 'wait4'), reason='Resource usage requires wait4')
+
+
+def test_properties(pytester):
+    pytester.makefile('.yastr.json',
+                      config='{"executable": "python", "args": ["-c", "sum(range(1000000))"], "timeout": 10}')
+
+    run = pytester.inline_run(plugins=['yastr.plugin'])
+    passed, skipped, failed = run.listoutcomes()
+
+    properties = dict(passed[0].user_properties)
+    assert properties['wall_time'] > 0
+    assert properties['user_time'] + properties['system_time'] > 0
+    assert properties['max_rss'] > 1024 * 1024
+    assert {'voluntary_switches', 'involuntary_switches', 'block_input', 'block_output'} <= properties.keys()
+
+
+def test_junit(pytester):
+    pytester.makefile('.yastr.json', config='{"executable": "python", "args": ["-c", "pass"]}')
+
+    pytester.inline_run('--junitxml=report.xml', plugins=['yastr.plugin'])
+
+    report = (pytester.path / 'report.xml').read_text()
+    assert '<property name="wall_time"' in report
+    assert '<property name="max_rss"' in report
+
+
+def test_top(pytester):
+    pytester.makefile('.yastr.json',
+                      fast='{"executable": "python", "args": ["-c", "pass"]}',
+                      slow='{"executable": "python", "args": ["-c", "import time; time.sleep(0.5)"]}')
+
+    result = pytester.runpytest('-p', 'yastr.plugin', '--yastr-top=1')
+
+    result.stdout.fnmatch_lines([
+        '*top 1 test executables by wall time*',
+        '*wall*user*system*max rss*test',
+        '*s*s*s*  .::slow.yastr.json',
+    ])
+    result.stdout.no_fnmatch_line('*  .::fast.yastr.json')
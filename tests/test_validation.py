@@ -0,0 +1,149 @@
+import pytest
+
+VALID = {
+    'executable': 'python',
+    'args': ['-c', 'pass'],
+    'environment': {
+        'FOO': 'foo'
+    },
+    'timeout': 10,
+    'encoding': 'latin-1',
+    'skip': False,
+    'markers': ['foo', ['bar', [1, 'a']], ('baz', {
+        'key': [1]
+    })],
+    'fixtures': ['tmp_path'],
+    'inputs': ['*.bin'],
+    'resources': {
+        'cpus': 2,
+        'memory': '512M',
+        'locks': {
+            'db': 'shared'
+        }
+    },
+    'limits': {
+        'cpu_time': 60,
+        'address_space': '8G',
+        'open_files': 64,
+        'file_size': '1G'
+    },
+    'expect': {
+        'required': ['^ok$'],
+        'forbidden': ['FATAL'],
+        'ordered': ['a', 'b'],
+        'fail_fast': True,
+        'stream': 'both'
+    },
+    'parametrize': {
+        'values': {
+            'threads': [1, {
+                'value': 8,
+                'markers': ['slow']
+            }],
+            'size': ['small', 'large']
+        },
+        'mode': 'product'
+    },
+    'benchmark': {
+        'warmup': 0,
+        'repetitions': 3,
+        'concurrency': 1,
+        'thresholds': {
+            'wall_median': 0.1
+        }
+    },
+}
+
+CANDIDATES = [
+    None, True, False, 0, 1, -1, 2.5, float('nan'), float('inf'), 10**400, b'x',
+    '', 'x', '1', 'yes', '8G', 'shared', 'stdout', '(', 'zip',
+    [], ['x'], [1], ('x', ), ['x', [1]], ['x', {'a': 1}], ['('],
+    [['x', [1]]], [['x', {1: 'a'}]], [['x', 'y']], [['x', [1], 2]],
+    {}, {'a': 'b'}, {'a': 1}, {'a': 'exclusive'}, {'wall_p99': 1}, {'cpu_min': -1}, {'cpus': 1}, {'repetitions': 0},
+    {'a': [1, 'b']}, {'a': [{'value': 1, 'markers': [['x', [1]]]}]}, {'a': [None]}, {'values': {'a': [1]}},
+]  # yapf: disable
+
+
+def _paths(config, prefix=()):
+    for key, value in config.items():
+        yield prefix + (key, )
+        if isinstance(value, dict) and key in ('resources', 'limits', 'expect', 'parametrize', 'benchmark'):
+            yield from _paths(value, prefix + (key, ))
+
+
+def _replace(config, path, value):
+    config = dict(config)
+    if len(path) == 1:
+        config[path[0]] = value
+    else:
+        config[path[0]] = _replace(config[path[0]], path[1:], value)
+    return config
+
+
+def _remove(config, path):
+    config = dict(config)
+    if len(path) == 1:
+        del config[path[0]]
+    else:
+        config[path[0]] = _remove(config[path[0]], path[1:])
+    return config
+
+
+def _inputs():
+    yield VALID
+    yield {'executable': 'python'}
+    yield {}
+    yield []
+    yield 'python'
+    yield {**VALID, 'unknown': 1}
+    yield {**VALID, 'resources': {**VALID['resources'], 'unknown': 1}}
+    for path in _paths(VALID):
+        yield _remove(VALID, path)
+        for value in CANDIDATES:
+            yield _replace(VALID, path, value)
+
+
+def test_conformance():
+    from marshmallow import ValidationError
+
+    from yastr.config import _fast_values, _schema_class, validate_config
+
+    schema = _schema_class()()
+    fast = 0
+    for data in _inputs():
+        try:
+            expected = schema.load(data)
+        except ValidationError:
+            expected = None
+        try:
+            actual = validate_config(data)
+        except ValidationError:
+            actual = None
+
+        assert actual == expected, data
+        if _fast_values(data) is not None:
+            assert expected is not None, data
+            fast += 1
+        if _fast_values(data, partial=True) is not None:
+            assert schema.validate(data, partial=True) == {}, data
+
+    # Make sure the fast path is not skipped for most valid inputs
+    assert fast > 50
+
+
+@pytest.mark.parametrize('data', [VALID, {'executable': 'python'}])
+def test_fast_path(data):
+    from yastr.config import _fast_values
+
+    assert _fast_values(data) is not None
+
+
+def test_load_config(tmp_path):
+    from yastr.config import ConfigError, load_config
+
+    (tmp_path / 'config.yastr.json').write_text('{"executable": "python", "args": ["-c", "pass"]}')
+    assert load_config(tmp_path / 'config.yastr.json').args == ['-c', 'pass']
+
+    (tmp_path / 'invalid.yastr.json').write_text('{"args": ["-c", "pass"]}')
+    with pytest.raises(ConfigError, match='invalid.yastr.json'):
+        load_config(tmp_path / 'invalid.yastr.json')
@@ -17,7 +17,8 @@ def test_file_missing_config(pytester):
     report = run.getfailures()[0]
 
     assert report.failed
-    assert 'ConfigError: could not determine a constructor for the tag None' in report.longreprtext
+    assert 'ConfigError: Invalid configuration values' in report.longreprtext
+    assert "{'executable': ['Missing data for required field.']}" in report.longreprtext
 
 
 def test_file_wrong_config(pytester):